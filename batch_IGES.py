@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+""" Convert every IGES file under a directory, see convert_IGES_NURBS.py.
+
+The trimmed surfaces of in_dir/a/b.igs are written to out_dir/a/b/.  Files
+are converted by a pool of worker processes, largest first (see
+iges.batch); each is reported with its time as it finishes, and failures
+are reported without stopping the batch.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+from convert_IGES_NURBS import convert
+from iges.batch import run_batch
+from iges.reader import read
+
+extensions = ('.igs', '.iges')
+
+
+def find_files(in_dir):
+    """Paths of the IGES files under `in_dir`"""
+    paths = []
+    for root, dirs, files in os.walk(in_dir):
+        dirs.sort()
+        paths += [os.path.join(root, name) for name in sorted(files)
+                  if name.lower().endswith(extensions)]
+    return paths
+
+
+def convert_file(path, in_dir, out_dir, dtype=None, stream=False):
+    """Convert the IGES file `path`, under `in_dir`, into the directory of
+    the same name under `out_dir`; returns its number of entities
+    """
+    out_dir = os.path.join(out_dir, os.path.splitext(os.path.relpath(path, in_dir))[0])
+    # The converter reports its progress on stdout
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+            read(path, lazy=stream, mapped=stream) as model:
+        convert(model, out_dir, dtype=dtype, stream=stream)
+        return len(model)
+
+
+def main(in_dir, out_dir, workers=None, dtype=None, stream=False, report=None):
+    """Convert the files under `in_dir`; returns the number that failed"""
+    paths = find_files(in_dir)
+    failed = 0
+    size = 0
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        f = stack.enter_context(open(report, 'w')) if report else None
+        for r in run_batch(paths, convert_file, (in_dir, out_dir, dtype, stream), workers):
+            print(r, flush=True)
+            failed += not r.ok
+            size += r.size
+            if f is not None:
+                f.write(json.dumps(r.as_dict()) + '\n')
+                f.flush()
+
+    seconds = time.perf_counter() - start
+    print("{} files, {} failed, {:.1f} MB in {:.3f} s ({:.1f} MB/s)".format(
+        len(paths), failed, size / 2 ** 20, seconds, size / 2 ** 20 / seconds if seconds else 0))
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the trimmed NURBS surfaces of all IGES files in a directory')
+    parser.add_argument('in_dir')
+    parser.add_argument('out_dir')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='number of processes converting files')
+    parser.add_argument('--binary', choices=['float32', 'float64'],
+                        help='write trim_N.pat patch files with floats of this type')
+    parser.add_argument('--stream', action='store_true',
+                        help='convert with bounded memory, decoding entities as needed')
+    parser.add_argument('--report', metavar='FILE',
+                        help='write the result of each file as a JSON line to FILE')
+    args = parser.parse_args()
+
+    sys.exit(1 if main(args.in_dir, args.out_dir, args.workers, args.binary, args.stream,
+                       args.report) else 0)
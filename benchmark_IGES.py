@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+""" Benchmarks of the reader and the converter on synthetic files of
+several sizes (see generate_IGES.py).
+
+For each scale, and each reader engine, a fresh process parses the file;
+the default engine's process then times pointer resolution, nurbs2bezier,
+exportNURBSSurface and the trim curve export on the model.  Every timing
+is one JSON object per line in the output file, with its throughput and
+the peak memory of the process so far:
+
+    {"scale": 1000, "phase": "parse", "engine": "mapped", "seconds": 1.2,
+     "count": 8000, "unit": "entities", "per_s": 6600.0, "bytes": 9e6,
+     "mb_per_s": 7.5, "peak_memory": 8.1e7}
+
+The first line describes the run (Python, numpy, platform, arguments).
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from convert_IGES_NURBS import exportNURBSCurve, exportNURBSSurface, trimmedSurface
+from generate_IGES import write_iges
+from iges.reader import read
+from iges.stats import peak_memory
+from spline import nurbs2bezier
+
+# Keyword arguments of iges.reader.read for each engine
+engines = {'default': {},
+           'mapped': {'mapped': True},
+           'lazy': {'lazy': True, 'mapped': True},
+           'parallel': {'workers': max(2, os.cpu_count() or 1)}}
+
+
+def result(phase, engine, seconds, count, unit, size=None):
+    """One benchmark result, `count` `unit`s (and `size` bytes, if given)
+    in `seconds`
+    """
+    r = {'phase': phase, 'engine': engine, 'seconds': seconds,
+         'count': count, 'unit': unit, 'per_s': count / seconds if seconds else None}
+    if size is not None:
+        r['bytes'] = size
+        r['mb_per_s'] = size / 2 ** 20 / seconds if seconds else None
+    r['peak_memory'] = peak_memory()
+    return r
+
+
+def best_of(repeat, function, *args):
+    """(smallest seconds of `repeat` calls of function(*args), last result)"""
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        value = function(*args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, value
+
+
+def resolve_pointers(model):
+    n = 0
+    for e in model.entity_list:
+        for pointer in e.references():
+            if pointer:
+                model.index_of(pointer)
+                n += 1
+    return n
+
+
+def decompose(surfaces):
+    patches = 0
+    for s in surfaces:
+        knots, cpts = nurbs2bezier(s.T2[1:-1], s.control_points, s.M2)
+        knots, cpts = nurbs2bezier(s.T1[1:-1], np.swapaxes(cpts, 0, 1), s.M1)
+        patches += ((cpts.shape[0] - 1) // s.M1) * ((cpts.shape[1] - 1) // s.M2)
+    return patches
+
+
+def export_surfaces(surfaces):
+    return sum(len(exportNURBSSurface(s)) for s in surfaces)
+
+
+def export_trims(model, trimmed):
+    size = 0
+    n = 0
+    for e in trimmed:
+        job = trimmedSurface(model, e)
+        if job is None:
+            continue
+        surface, curves = job
+        bbox = [(surface.U0, surface.V0), (surface.U1, surface.V1)]
+        for c in curves:
+            size += len(exportNURBSCurve(c, bbox))
+            n += 1
+    return n, size
+
+
+def run_engine(path, engine, repeat):
+    """Results of the benchmarks of one engine on the file `path`"""
+    size = os.path.getsize(path)
+    seconds, model = best_of(repeat, lambda: read(path, **engines[engine]))
+    results = [result('parse', engine, seconds, len(model), 'entities', size)]
+    if engine != 'default':
+        return results
+
+    seconds, n = best_of(repeat, resolve_pointers, model)
+    results.append(result('pointers', engine, seconds, n, 'pointers'))
+
+    surfaces = model.entities_of_type(128)
+    seconds, patches = best_of(repeat, decompose, surfaces)
+    results.append(result('nurbs2bezier', engine, seconds, patches, 'patches'))
+
+    seconds, n = best_of(repeat, export_surfaces, surfaces)
+    results.append(result('export_surface', engine, seconds, patches, 'patches', n))
+
+    # The converter reports its progress on stdout
+    trimmed = [e for e in model.entity_list if e.d['entity_type_number'] in (143, 144)]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        seconds, (n, exported) = best_of(repeat, export_trims, model, trimmed)
+    results.append(result('export_trim', engine, seconds, n, 'curves', exported))
+    return results
+
+
+def run_scale(path, surfaces, repeat):
+    """Results for one file, each engine in a process of its own so the
+    peak memory is that of the engine
+    """
+    results = []
+    for engine in engines:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--run', path, engine,
+                                 '--repeat', str(repeat)],
+                                check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        for line in output.splitlines():
+            r = json.loads(line)
+            r['scale'] = surfaces
+            results.append(r)
+    return results
+
+
+def main(scales, degree, spans, bounded, repeat, out):
+    meta = {'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'degree': degree, 'spans': spans, 'bounded': bounded, 'repeat': repeat}
+    with open(out, 'w') as f, tempfile.TemporaryDirectory() as tmp:
+        f.write(json.dumps({'meta': meta}) + '\n')
+        for surfaces in scales:
+            path = os.path.join(tmp, 'bench_{}.igs'.format(surfaces))
+            write_iges(path, surfaces, degree, spans, bounded)
+            for r in run_scale(path, surfaces, repeat):
+                f.write(json.dumps(r) + '\n')
+                f.flush()
+                print("{:>8} {:<15} {:<9} {:9.3f} s {:>12.1f} {}/s".format(
+                    surfaces, r['phase'], r['engine'], r['seconds'], r['per_s'] or 0, r['unit']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the IGES reader and converter')
+    parser.add_argument('-s', '--scales', default='100,1000,5000',
+                        help='comma separated numbers of surfaces of the files')
+    parser.add_argument('--degree', type=int, default=3, help='degree of the surfaces')
+    parser.add_argument('--spans', type=int, default=4,
+                        help='knot spans of the surfaces in each direction')
+    parser.add_argument('--bounded', type=float, default=0.25,
+                        help='share of the surfaces that are bounded (143) ones')
+    parser.add_argument('--repeat', type=int, default=1, help='report the best of this many runs')
+    parser.add_argument('-o', '--out', default='bench_output.txt', help='file of the results')
+    parser.add_argument('--run', nargs=2, metavar=('FILE', 'ENGINE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        for r in run_engine(args.run[0], args.run[1], args.repeat):
+            print(json.dumps(r))
+    else:
+        main([int(s) for s in args.scales.split(',')], args.degree, args.spans,
+             args.bounded, args.repeat, args.out)
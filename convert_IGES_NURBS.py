@@ -1,102 +1,89 @@
 #!/usr/bin/env python
+import argparse
 import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
 
-from read_IGES import *
-from spline import nurbs2bezier
+from iges.model import PointerError
+from iges.reader import read
+from iges.stats import Stats, timed, timer
+from iges.transform import apply_transform
+from patchfile import encode_patch_file
+from spline import bezier_decompose, nurbs2bezier
 
-def exportNURBSSurface(surface):
-    file_str = io.StringIO()
-    
+fileName = 'rim2.igs'
+
+def surfacePatches(surface, matrix=None):
+    """ bicubic bezier patches of a nurbs surface, as an array of shape
+    (n, 4, 4, 6): [patch][v][u] = x, y, z, w, and u, v scaled to [0, 1].
+    matrix is the 4x4 transform to model space, if any
+    """
     degu = surface.M1
     degv = surface.M2
 
-    #print(surface)
-
     # first convert nurbs to bezier
     # TODO: assume the knot sequence has knot multiplicty degree + 1 at both end
-    #print(len(surface.control_points), len(surface.W))
-    cpts = np.array([np.array([surface.control_points[i][0],
-                      surface.control_points[i][1],
-                      surface.control_points[i][2],
-                      surface.W[i]]) for i in range(len(surface.W))])
-
-    cpts = cpts.reshape([ surface.K2 + 1, surface.K1 + 1, 4])
-
-    # 1rd direction
-    b_knot_u, b_cpts = nurbs2bezier(surface.T1[1:-1], [cpts[:,i] for i in range(surface.K1 + 1)], degu)
-    cpts = np.array(b_cpts)
-    b_knot_v, b_cpts = nurbs2bezier(surface.T2[1:-1], [cpts[:,i] for i in range(surface.K2 + 1)], degv)
-    cpts = np.array(b_cpts)
-    
-    uvbbox = [(surface.U0, surface.V0), (surface.U1, surface.V1)]
+    cpts = surface.control_points
+    if matrix is not None:
+        cpts = apply_transform(matrix, cpts)
+
+    # u direction along the rows of the net, then v
+    b_knot_u, cpts = bezier_decompose(surface.T1[1:-1], cpts, degu, axis=1)
+    b_knot_v, cpts = bezier_decompose(surface.T2[1:-1], cpts, degv, axis=0)
 
-    total_bicubic_piece = 0
-    
     # TODO: assume the nurbs curve is indeed in bezier form
-    for piece_v in range((cpts.shape[0] - 1)//degv):
-        v_base = b_knot_v[piece_v * degv]
-        v_end = b_knot_v[piece_v * degv + degv]
-        for piece_u in range((cpts.shape[1] - 1)//degu):
-            u_base = b_knot_u[piece_u * degu]
-            u_end = b_knot_u[piece_u * degu + degu]
-
-            bcpts = np.zeros([degv + 1, degu + 1, 6])
-            
-            for i in range(degv + 1):
-                for j in range(degu + 1):
-                    idx_v = i + degv * piece_v
-                    idx_u = j + degu * piece_u
-
-                    p = cpts[idx_v][idx_u]
-
-                    #file_str.write("v {} {} {} {}\n".format(p[0], p[1], p[2], p[3]))
-
-                    uv = np.array((u_base + j / degu * (u_end - u_base), v_base + i / degv * (v_end - v_base)))
-                    uv -= np.array(uvbbox[0])
-                    uv[0] /= (uvbbox[1][0] - uvbbox[0][0])
-                    uv[1] /= (uvbbox[1][1] - uvbbox[0][1])
-                    
-                    #file_str.write("vt {} {}\n".format(uv[0], uv[1]))
-
-                    bcpts[i][j] = np.array([p[0], p[1], p[2], p[3], uv[0], uv[1]])
-
-                    # print(xyz,w,uv)
-
-            # convert bezier patch to bicubic
-            vpiece = 1 if degv <= 3 else 3
-            upiece = 1 if degu <= 3 else 3
-
-            _bcpts = convert2Cubic([bcpts[:,i] for i in range(degu+1)])
-            bcpts = np.array(_bcpts)
-            _bcpts = convert2Cubic([bcpts[:,i] for i in range(degv+1)])
-            bcpts = np.array(_bcpts)
-
-            for i in range(vpiece):
-                for j in range(upiece):
-                    total_bicubic_piece += 1
-                    for k in range(4):
-                        for l in range(4):
-                            p = bcpts[i*3 + k][j*3 + l]
-                            
-                            file_str.write("v {} {} {} {}\n".format(p[0], p[1], p[2], p[3]))
-                            file_str.write("vt {} {}\n".format(p[4], p[5]))
-                    
-            
-                    
-    idx = 1
-    # for piece_v in range((cpts.shape[0] - 1)//degv):
-    #     for piece_u in range((cpts.shape[1] - 1)//degu):
-    #         file_str.write("p {} {}\n".format(degu, degv))
-    #         for i in range((degu + 1)*(degv + 1)):
-    #             file_str.write("{}/{}\n".format(idx, idx))
-    for i in  range(total_bicubic_piece):
-        file_str.write("p {} {}\n".format(3, 3))
-        for i in range(16):
-            file_str.write("{}/{}\n".format(idx, idx))
-            idx+=1
-
-    return file_str.getvalue()
+    n_v = (cpts.shape[0] - 1) // degv
+    n_u = (cpts.shape[1] - 1) // degu
+    idx_v = np.arange(n_v)[:, None] * degv + np.arange(degv + 1)
+    idx_u = np.arange(n_u)[:, None] * degu + np.arange(degu + 1)
+
+    # [piece_v][piece_u][i][j] = x, y, z, w, u, v
+    bcpts = np.empty((n_v, n_u, degv + 1, degu + 1, 6))
+    bcpts[..., :4] = cpts[idx_v[:, None, :, None], idx_u[None, :, None, :]]
+
+    v_base = b_knot_v[idx_v[:, 0]]
+    v_end = b_knot_v[idx_v[:, -1]]
+    u_base = b_knot_u[idx_u[:, 0]]
+    u_end = b_knot_u[idx_u[:, -1]]
+    u = u_base[:, None] + np.arange(degu + 1) / degu * (u_end - u_base)[:, None]
+    v = v_base[:, None] + np.arange(degv + 1) / degv * (v_end - v_base)[:, None]
+    bcpts[..., 4] = ((u - surface.U0) / (surface.U1 - surface.U0))[None, :, None, :]
+    bcpts[..., 5] = ((v - surface.V0) / (surface.V1 - surface.V0))[:, None, :, None]
+
+    # convert bezier patches to bicubic
+    bcpts = np.einsum('bi,aj,...ijc->...bac', cubicMatrix(degv), cubicMatrix(degu), bcpts,
+                      optimize=True)
+
+    # high degree patches are split in 3x3 pieces sharing their edges
+    vpiece = 1 if degv <= 3 else 3
+    upiece = 1 if degu <= 3 else 3
+    piece_v = np.arange(vpiece)[:, None] * 3 + np.arange(4)
+    piece_u = np.arange(upiece)[:, None] * 3 + np.arange(4)
+    bcpts = bcpts[:, :, piece_v[:, None, :, None], piece_u[None, :, None, :]]
+
+    return bcpts.reshape(-1, 4, 4, 6)
+
+def exportNURBSSurface(surface, matrix=None):
+    patches = surfacePatches(surface, matrix)
+    n = len(patches)
+
+    vertices = ("v %r %r %r %r\nvt %r %r\n" * (16 * n)) % tuple(patches.ravel().tolist())
+
+    idx = np.repeat(np.arange(1, 16 * n + 1), 2)
+    faces = (("p 3 3\n" + "%d/%d\n" * 16) * n) % tuple(idx.tolist())
+
+    return vertices + faces
+
+def cubicMatrix(deg):
+    """ matrix of convert2Cubic for a bezier function of degree deg, rows
+    are the cubic control points
+    """
+    return np.array(convert2Cubic(list(np.eye(deg + 1))))
 
 def convert2Cubic(cpts):
     if len(cpts) == 2:
@@ -204,6 +191,25 @@ def exportNURBSCurve(curve, bbox=[(0,0), (1,1)]):
     return  file_str.getvalue()
         
 
+def curveSegments(curve, bbox=[(0,0), (1,1)]):
+    """ cubic bezier segments of a nurbs curve, scaled to the uv square of
+    bbox, as an array of shape (n, 4, 2)
+    """
+    degree = curve.M
+    assert(curve.prop3 == 1)
+
+    b_knot, b_cpts = bezier_decompose(curve.T[1:-1], curve.control_points[:, :2], degree)
+    b_cpts = (b_cpts - np.array(bbox[0])) / (np.array(bbox[1]) - np.array(bbox[0]))
+
+    n = (len(b_cpts) - 1) // degree
+    idx = np.arange(n)[:, None] * degree + np.arange(degree + 1)
+    segments = np.einsum('ai,nic->nac', cubicMatrix(degree), b_cpts[idx])
+
+    # high degree segments are split in 3 cubic pieces
+    pieces = 1 if degree <= 3 else 3
+    piece = np.arange(pieces)[:, None] * 3 + np.arange(4)
+    return segments[:, piece].reshape(-1, 4, 2)
+
 # # test degLoer2Cubic
 # cpts = [0,1,2,3,4,5]
 
@@ -211,97 +217,241 @@ def exportNURBSCurve(curve, bbox=[(0,0), (1,1)]):
 
 # sys.exit(0)
     
-idx = 0
-for entity in entity_list:
-    # if idx >= 1:
-    #      break;
+def trimmedSurfaceFiles(idx, surface, curves, dtype=None, matrix=None):
+    """ output files of a surface and its trim curves as (name, contents):
+    trim_surface_idx.txt and trim_curve_idx.txt, or the patch file
+    trim_idx.pat with floats of dtype if it is given.  matrix maps the
+    surface to model space, if given
+    """
+    bbox = [(surface.U0, surface.V0), (surface.U1, surface.V1)]
+
+    if dtype is not None:
+        data = encode_patch_file(surfacePatches(surface, matrix),
+                                 [(curveSegments(c, bbox), c.prop2 == 1) for c in curves], dtype)
+        return [("trim_{}.pat".format(idx), data)]
+
+    curve_str = io.StringIO()
+    for c in curves:
+        curve_str.write(exportNURBSCurve(c, bbox))
+        if c.prop2 == 1:
+            curve_str.write(" z")
+        curve_str.write(" ")
+
+    return [("trim_surface_{}.txt".format(idx), exportNURBSSurface(surface, matrix)),
+            ("trim_curve_{}.txt".format(idx), curve_str.getvalue())]
+
+def trimmedSurface(model, entity):
+    """ (surface, trim curves) of a 143 or 144 entity, or None if it is not
+    exported
+    """
     if entity.d['entity_type_number'] == 143:
         print(entity)
         # print("sptr: ", entity.SPTR)
-        surface = entity_list[pointer_dict[entity.SPTR]]
+        surface = model.get(entity.SPTR)
 
         # only support nurbs surface for now
         if surface.d['entity_type_number'] != 128:
-            continue
-            
+            return None
+        
         if surface.M1 == 3 and surface.M2 == 3:
             print("export!")
             print(surface)
-            idx += 1
-            # if idx != 61:
-            #      continue
-            with open("trim_surface_{}.txt".format(idx), "w") as f:
-                # print(surface)
-                f.write(exportNURBSSurface(surface))
-            bbox = [(surface.U0, surface.V0), (surface.U1, surface.V1)]
-            
-            with open("trim_curve_{}.txt".format(idx), "w") as f:
-                for bptr in entity.BDPT:
-                    boundary = entity_list[pointer_dict[bptr]]
-                    print(boundary)
-                    for crvpt, sense, pscpts in boundary.PSCPT:
-                        for pscpt in pscpts:
-                            pcurve = entity_list[pointer_dict[pscpt]]
-                            # print(exportNURBSCurve(pcurve))
-                            f.write(exportNURBSCurve(pcurve, bbox))
-                            if pcurve.prop2 == 1:
-                                f.write(" z")
-                            f.write(" ")
-        
+            curves = []
+            for bptr in entity.BDPT:
+                boundary = model.get(bptr)
+                print(boundary)
+                for crvpt, sense, pscpts in boundary.PSCPT:
+                    for pscpt in pscpts:
+                        curves.append(model.get(pscpt))
+
+            return surface, curves
+    
     elif entity.d['entity_type_number'] == 144:
         # print(entity)
-        surface = entity_list[pointer_dict[entity.PTS]]
+        surface = model.get(entity.PTS)
         if surface.d['entity_type_number'] != 128:
-            continue
-            
+            return None
         
+    
         if True:
             print("export!")
             #print(surface)
-            
-            idx += 1
-            # if idx != 173:
-            #      continue
-            with open("trim_surface_{}.txt".format(idx), "w") as f:
-                print(surface)
-                f.write(exportNURBSSurface(surface))
-            bbox = [(surface.U0, surface.V0), (surface.U1, surface.V1)]
-            
-            with open("trim_curve_{}.txt".format(idx), "w") as f:
-                CPTS = []
-
-                flipped = False
-
-                if entity.N1 == 0:
-                    flipped = True
-                else:
-                    CPTS.append(entity.PTO)
-
-                assert(flipped == False)
-
-                CPTS.extend(entity.PTI)
-                
-                for bptr in CPTS:
-                    pcurve = entity_list[pointer_dict[bptr]]
-                    curve = entity_list[pointer_dict[pcurve.BPTR]]
-
-                    assert(curve.d['entity_type_number'] == 102)
-                    print(curve)
-                    for de in curve.DE:
-                        e = entity_list[pointer_dict[de]]
-                        assert(e.d['entity_type_number'] == 126)
-                        print(e)
-                    
-                        f.write(exportNURBSCurve(e, bbox))
-                        if e.prop2 == 1:
-                             f.write(" z")
-                        f.write(" ")
+            print(surface)
+
+            CPTS = []
+
+            flipped = False
+
+            if entity.N1 == 0:
+                flipped = True
+            else:
+                CPTS.append(entity.PTO)
+
+            assert(flipped == False)
+
+            CPTS.extend(entity.PTI)
+
+            curves = []
+            for bptr in CPTS:
+                pcurve = model.get(bptr)
+                curve = model.get(pcurve.BPTR)
+
+                assert(curve.d['entity_type_number'] == 102)
+                print(curve)
+                for de in curve.DE:
+                    e = model.get(de)
+                    assert(e.d['entity_type_number'] == 126)
+                    print(e)
+                    curves.append(e)
+
+            return surface, curves
 
         else:
             pass
             #print("not support!")
             #print(surface.M1, surface.M2)
-        
-                        
+    
+                    
     #elif entity.d['entity_type_number'] == 128:
     #     print(entity)
+
+    return None
+
+def exportPlan(model):
+    """ plan the export of a lazily read model: the index of each 143/144
+    entity with the indices of the entities it refers to, directly or not,
+    in directory order; and the number of them referring to each entity.
+    Only the small entities holding pointers get decoded, each once: they
+    stay decoded for the export, which unloads them after their last use.
+    """
+    jobs = np.flatnonzero(np.isin(model.directory['entity_type_number'], (143, 144)))
+    refcount = np.zeros(len(model), dtype=np.int64)
+    children = {}    # index -> indices of the entities it refers to
+
+    def refers_to(k):
+        if k not in children:
+            found = []
+            for pointer in model.entity_list[k].references():
+                if pointer == 0:
+                    continue
+                try:
+                    found.append(model.index_of(pointer))
+                except PointerError:
+                    continue
+            children[k] = found
+        return children[k]
+
+    plan = []
+    for i in jobs.tolist():
+        deps = {i}
+        stack = [i]
+        while stack:
+            for k in refers_to(stack.pop()):
+                if k not in deps:
+                    deps.add(k)
+                    stack.append(k)
+        deps = sorted(deps)
+        refcount[deps] += 1
+        plan.append((i, deps))
+    return plan, refcount
+
+def convert(model, out_dir='.', workers=None, dtype=None, stream=False, stats=None):
+    """ export the trimmed surfaces of model to out_dir, see
+    trimmedSurfaceFiles.  With workers > 1 the surfaces are converted in
+    that many processes; files are written in order as they come back,
+    with at most 2 * workers surfaces in flight.
+
+    With stream, model must be lazily read (see iges.reader.read).  The
+    export is planned first (see exportPlan), and the parameters of each
+    entity are unloaded once the last surface using it is written, so
+    only the surfaces in flight are held in memory.
+
+    With stats (an iges.stats.Stats), the time of the plan, of the export
+    and of each surface is recorded into it.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    if stream:
+        with timer(stats, 'plan'):
+            plan, refcount = exportPlan(model)
+    else:
+        plan = [(i, ()) for i in range(len(model))]
+
+    def finish(files, deps):
+        for name, data in files:
+            with open(os.path.join(out_dir, name), "wb" if isinstance(data, bytes) else "w") as f:
+                f.write(data)
+        for k in deps:
+            refcount[k] -= 1
+            if refcount[k] == 0:
+                model.unload(model.entity_list[k])
+
+    # with stats, jobs return (files, seconds)
+    export = trimmedSurfaceFiles if stats is None else partial(timed, trimmedSurfaceFiles)
+
+    def done(result, deps, i):
+        if stats is not None:
+            result, seconds = result
+            stats.add_export(model.entity_list[i].sequence_number, seconds)
+        finish(result, deps)
+
+    executor = ProcessPoolExecutor(workers) if workers and workers > 1 else None
+    pending = deque()
+    idx = 0
+    start = time.perf_counter()
+    try:
+        for i, deps in plan:
+            job = trimmedSurface(model, model.entity_list[i])
+            if job is None:
+                finish([], deps)
+                continue
+
+            idx += 1
+            surface, curves = job
+            matrix = model.transforms.matrix_of(surface, parent=model.entity_list[i])
+            if executor is None:
+                done(export(idx, surface, curves, dtype, matrix), deps, i)
+                continue
+
+            # decoded here, not while the job is pickled in the background
+            for e in [surface] + curves:
+                e.load_parameters()
+            pending.append((executor.submit(export, idx, surface, curves, dtype, matrix),
+                            deps, i))
+            if len(pending) >= 2 * workers:
+                future, deps, i = pending.popleft()
+                done(future.result(), deps, i)
+
+        while pending:
+            future, deps, i = pending.popleft()
+            done(future.result(), deps, i)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if stats is not None:
+            stats.add_time('export', time.perf_counter() - start)
+
+def main(fileName, out_dir='.', workers=None, dtype=None, stream=False, stats_path=None):
+    stats = Stats() if stats_path else None
+    with read(fileName, lazy=stream, mapped=stream, stats=stats) as model:
+        convert(model, out_dir, workers, dtype, stream, stats)
+    if stats is not None:
+        print(stats)
+        stats.write_json(stats_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the trimmed NURBS surfaces of an IGES file to bicubic patches')
+    parser.add_argument('fileName', nargs='?', default=fileName)
+    parser.add_argument('--binary', choices=['float32', 'float64'],
+                        help='write trim_N.pat patch files with floats of this type')
+    parser.add_argument('-o', '--out-dir', default='.', help='directory of the output files')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='number of processes converting surfaces')
+    parser.add_argument('--stream', action='store_true',
+                        help='convert with bounded memory, decoding entities as needed')
+    parser.add_argument('--stats', metavar='FILE',
+                        help='print where the time went and write it as JSON to FILE')
+    args = parser.parse_args()
+
+    main(args.fileName, args.out_dir, args.workers, args.binary, args.stream, args.stats)
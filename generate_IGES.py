@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+""" Synthetic IGES files of any size, for benchmarks (see benchmark_IGES.py).
+
+Each surface is a rational B-spline surface (128) over [0, 1] x [0, 1],
+of the given degree and number of knot spans in each direction, trimmed
+by a loop of four cubic parameter space curves (126) joined in a
+composite curve (102).  Surfaces are trimmed (144, through a 142) or,
+with `bounded`, a share of them bounded (143, through a 141).  Control
+point heights and weights are random but fixed by `seed`, so a given set
+of arguments always writes the same file.
+"""
+import argparse
+import random
+import shutil
+import tempfile
+
+# Global section of the files, with ',' and ';' separators
+global_string = ('1H,,1H;,9Hsynthetic,13Hsynthetic.igs,12Hgenerate_IGES,12Hgenerate_IGES,'
+                 '32,38,6,308,15,9Hsynthetic,1.,2,2HMM,1,1.,13H000101.000000,1E-06,100.,'
+                 '4Hnone,4Hnone,11,0;')
+
+
+def record(text, section, n):
+    """One 80 column record of `section` (S, G, D or T)"""
+    return '{:<72}{}{:07d}\n'.format(text, section, n)
+
+
+def wrap(tokens, width=64):
+    """Lines of a parameter record of `tokens`, at most `width` columns"""
+    lines = []
+    line = ''
+    for i, token in enumerate(tokens):
+        token += ';' if i == len(tokens) - 1 else ','
+        if line and len(line) + len(token) > width:
+            lines.append(line)
+            line = ''
+        line += token
+    lines.append(line)
+    return lines
+
+
+def clamped_knots(spans, degree):
+    """Clamped uniform knot vector over [0, 1]"""
+    return [0.0] * degree + [i / spans for i in range(spans + 1)] + [1.0] * degree
+
+
+def surface_tokens(rng, degree, spans, offset):
+    n = spans + degree    # control points in each direction
+    tokens = [128, n - 1, n - 1, degree, degree, 0, 0, 0, 0, 0]
+    tokens += clamped_knots(spans, degree) * 2
+    tokens += [rng.uniform(0.5, 1.5) for i in range(n * n)]
+    for j in range(n):
+        for i in range(n):
+            tokens += [offset + i / (n - 1), j / (n - 1), rng.uniform(-0.1, 0.1)]
+    return tokens + [0.0, 1.0, 0.0, 1.0]
+
+
+def trim_curve_tokens(rng, a, b):
+    """Cubic Bezier from uv point a to b, bulging a little to the left"""
+    du, dv = b[0] - a[0], b[1] - a[1]
+    bulge = rng.uniform(0.0, 0.1)
+    points = [a,
+              (a[0] + du / 3 - dv * bulge, a[1] + dv / 3 + du * bulge),
+              (a[0] + 2 * du / 3 - dv * bulge, a[1] + 2 * dv / 3 + du * bulge),
+              b]
+    tokens = [126, 3, 3, 1, 0, 1, 0] + clamped_knots(1, 3) + [1.0] * 4
+    for u, v in points:
+        tokens += [u, v, 0.0]
+    return tokens + [0.0, 1.0, 0.0, 0.0, 1.0]
+
+
+def entities(surfaces, degree=3, spans=4, bounded=0.0, seed=0):
+    """Yield (entity type, parameter tokens) of the entities of a file,
+    DE pointers in the tokens already resolved
+    """
+    rng = random.Random(seed)
+    de = lambda i: 2 * i + 1
+    n = 0
+    for s in range(surfaces):
+        surface = n
+        yield 128, surface_tokens(rng, degree, spans, 1.1 * s)
+
+        inset = rng.uniform(0.05, 0.2)
+        corners = [(inset, inset), (1 - inset, inset), (1 - inset, 1 - inset), (inset, 1 - inset)]
+        for k in range(4):
+            yield 126, trim_curve_tokens(rng, corners[k], corners[(k + 1) % 4])
+        curves = [de(surface + 1 + k) for k in range(4)]
+        composite = surface + 5
+        yield 102, [102, 4] + curves
+
+        if rng.random() < bounded:
+            yield 141, [141, 1, 1, de(surface), 1, de(composite), 1, 4] + curves
+            yield 143, [143, 1, de(surface), 1, de(composite + 1)]
+        else:
+            yield 142, [142, 1, de(surface), de(composite), 0, 1]
+            yield 144, [144, de(surface), 1, 0, de(composite + 1)]
+        n = composite + 3
+
+
+def write_iges(path, surfaces, degree=3, spans=4, bounded=0.0, seed=0):
+    """Write a synthetic IGES file of `surfaces` trimmed surfaces to `path`
+    and return its number of entities
+    """
+    directory = []
+    with tempfile.TemporaryFile('w+') as parameters:
+        n_lines = 0
+        for i, (entity_type, tokens) in enumerate(entities(surfaces, degree, spans, bounded, seed)):
+            lines = wrap([repr(t) for t in tokens])
+            for k, line in enumerate(lines):
+                parameters.write('{:<64}{:8d}P{:07d}\n'.format(line, 2 * i + 1, n_lines + k + 1))
+            directory.append('{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:>8}'.format(
+                entity_type, n_lines + 1, 0, 0, 0, 0, 0, 0, '00000000'))
+            directory.append('{:8d}{:8d}{:8d}{:8d}{:8d}{:8}{:8}{:>8}{:8d}'.format(
+                entity_type, 0, 0, len(lines), 0, '', '', 'E{}'.format(i), 0))
+            n_lines += len(lines)
+
+        global_lines = [global_string[i:i + 72] for i in range(0, len(global_string), 72)]
+        with open(path, 'w', newline='\n') as f:
+            f.write(record('synthetic IGES file', 'S', 1))
+            for i, line in enumerate(global_lines):
+                f.write(record(line, 'G', i + 1))
+            for i, line in enumerate(directory):
+                f.write(record(line, 'D', i + 1))
+            parameters.seek(0)
+            shutil.copyfileobj(parameters, f)
+            f.write(record('S{:07d}G{:07d}D{:07d}P{:07d}'.format(
+                1, len(global_lines), len(directory), n_lines), 'T', 1))
+    return len(directory) // 2
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic IGES file of trimmed NURBS surfaces')
+    parser.add_argument('fileName')
+    parser.add_argument('-n', '--surfaces', type=int, default=100, help='number of surfaces')
+    parser.add_argument('--degree', type=int, default=3, help='degree of the surfaces')
+    parser.add_argument('--spans', type=int, default=4,
+                        help='knot spans of the surfaces in each direction')
+    parser.add_argument('--bounded', type=float, default=0.0,
+                        help='share of the surfaces written as bounded (143) ones')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_iges(args.fileName, args.surfaces, args.degree, args.spans, args.bounded, args.seed)
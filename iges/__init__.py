@@ -1,2 +1,6 @@
 #!/usr/bin/env python
-
+from iges.model import IGESModel, PointerError
+from iges.reader import IGESReader, read
+from iges.writer import IGESWriter, write
+from iges.extract import extract
+from iges.stream import IncrementalParser, parse_stream
@@ -0,0 +1,10 @@
+#!/usr/bin/env python
+import numpy as np
+
+
+def spans(starts, counts):
+    """Concatenated ranges starts[i]:starts[i] + counts[i], e.g. the items
+    of some rows of a CSR array
+    """
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(counts.sum())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+""" Batches of IGES files processed by a pool of worker processes.
+
+The workers live for the whole batch: each imports the reader and numpy
+once (see warm_up()) and then takes file after file.  Files are handed
+out largest first, so the batch does not end waiting on one big file
+started last.  Results are yielded as files finish; a file that fails is
+reported with its error and the batch goes on.  A worker that dies (e.g.
+killed for lack of memory) breaks the pool: the files in flight then
+run again, each in a process of its own, so only the file that kills
+its worker fails, and a new pool takes the rest.
+
+    for r in run_batch(paths, count_entities, workers=8):
+        print(r)
+"""
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from iges.reader import read
+
+
+def warm_up():
+    """Import what reading takes, before the first file is timed"""
+    import iges.curves_surfaces
+    import iges.mapped
+    import iges.stats
+
+
+def count_entities(path, **kwargs):
+    """Number of entities of the IGES file `path`, read with `kwargs` (see
+    iges.reader.read)
+    """
+    with read(path, **kwargs) as model:
+        return len(model)
+
+
+def largest_first(paths):
+    """`paths` sorted by decreasing file size"""
+    return sorted(paths, key=os.path.getsize, reverse=True)
+
+
+class BatchResult():
+    """Outcome of one file: the job's return `value`, or the `error` (a
+    traceback) it raised; with the file size and the seconds it took
+    """
+
+    __slots__ = ('path', 'size', 'seconds', 'value', 'error')
+
+    def __init__(self, path, size, seconds=0.0, value=None, error=None):
+        self.path = path
+        self.size = size
+        self.seconds = seconds
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __str__(self):
+        if self.ok:
+            return "{:9.3f} s {:>12} B  {}".format(self.seconds, self.size, self.path)
+        return "{:9.3f} s {:>12} B  {}  FAILED: {}".format(
+            self.seconds, self.size, self.path, self.error.strip().splitlines()[-1])
+
+
+def run_file(job, path, *args):
+    """BatchResult of job(path, *args)"""
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    try:
+        value = job(path, *args)
+    except Exception:
+        return BatchResult(path, size, time.perf_counter() - start, error=traceback.format_exc())
+    return BatchResult(path, size, time.perf_counter() - start, value)
+
+
+def run_batch(paths, job=count_entities, args=(), workers=None):
+    """Yield a BatchResult of job(path, *args) for each of `paths`, in the
+    order they finish.  `job` must be picklable, i.e. a module level
+    function.  With `workers` > 1 the files are processed by that many
+    processes, else in this one.
+    """
+    paths = largest_first(paths)
+    if not workers or workers <= 1:
+        for path in paths:
+            yield run_file(job, path, *args)
+        return
+
+    pending = deque(paths)
+    while pending:
+        suspects = yield from run_pool(pending, job, args, workers)
+        yield from run_isolated(suspects, job, args, workers)
+
+
+def run_pool(pending, job, args, workers):
+    """Yield the BatchResults of the files taken from the deque `pending`,
+    by a pool of `workers` processes, until it is done or a worker dies
+    (e.g. killed for lack of memory), which breaks the pool.  Returns the
+    files in flight when it broke, one of which killed the worker.
+    """
+    in_flight = {}
+    with ProcessPoolExecutor(workers, initializer=warm_up) as executor:
+        while pending or in_flight:
+            # A few files queued beyond the running ones keep the pool busy
+            while pending and len(in_flight) < 2 * workers:
+                path = pending.popleft()
+                in_flight[executor.submit(run_file, job, path, *args)] = path
+
+            done = wait(in_flight, return_when=FIRST_COMPLETED).done
+            broken = False
+            for future in done:
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    continue
+                del in_flight[future]
+                yield result
+            if broken:
+                return list(in_flight.values())
+    return []
+
+
+def run_isolated(paths, job, args, workers):
+    """Yield the BatchResults of `paths`, each in a process of its own, up
+    to `workers` at a time, so a file that kills its worker fails alone
+    """
+    pending = deque(paths)
+    running = {}
+    try:
+        while pending or running:
+            while pending and len(running) < workers:
+                path = pending.popleft()
+                executor = ProcessPoolExecutor(1, initializer=warm_up)
+                running[executor.submit(run_file, job, path, *args)] = (path, executor)
+
+            done = wait(running, return_when=FIRST_COMPLETED).done
+            for future in done:
+                path, executor = running.pop(future)
+                executor.shutdown()
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    yield BatchResult(path, os.path.getsize(path), error=traceback.format_exc())
+    finally:
+        for path, executor in running.values():
+            executor.shutdown(cancel_futures=True)
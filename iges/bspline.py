@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+""" B-spline basis functions, evaluated for arrays of parameters at once.
+Algorithms from Piegl & Tiller, The NURBS Book, 2nd ed., chapters 2-4.
+"""
+from math import comb
+
+import numpy as np
+
+# Points evaluated per batch, to bound the size of the temporaries
+batch_size = 1 << 16
+
+
+def find_spans(degree, knots, t, n_knots=None):
+    """Knot span index of each parameter in `t` (The NURBS Book A2.1).
+    Parameters outside the knot range are clamped to the end spans.
+
+    `knots` is one knot vector, or a 2-d array with the knot vector of each
+    parameter in its rows; these are padded at the end (with inf) to a
+    common length, their actual lengths being `n_knots`.
+    """
+    if knots.ndim == 1:
+        n = len(knots) - degree - 2    # index of the last control point
+        spans = np.searchsorted(knots, t, side='right') - 1
+    else:
+        n = n_knots - degree - 2
+        spans = np.count_nonzero(knots <= t[:, None], axis=1) - 1
+    return np.clip(spans, degree, n)
+
+
+def knot_values(knots, index):
+    """knots[index], per row if `knots` holds one knot vector per row"""
+    if knots.ndim == 1:
+        return knots[index]
+    return np.take_along_axis(knots, index[:, None], axis=1)[:, 0]
+
+
+def basis_functions(degree, knots, spans, t, derivs=0):
+    """Nonzero basis functions and their derivatives (The NURBS Book A2.3).
+
+    Returns an array of shape (len(t), derivs + 1, degree + 1) where
+    [:, k, j] is the k-th derivative of the basis function of control
+    point spans - degree + j.  `knots` is as for find_spans().
+    """
+    p = degree
+    n = len(t)
+    knots = np.asarray(knots, dtype=np.float64)
+
+    ndu = np.zeros((n, p + 1, p + 1))
+    ndu[:, 0, 0] = 1.0
+    left = np.zeros((n, p + 1))
+    right = np.zeros((n, p + 1))
+    for j in range(1, p + 1):
+        left[:, j] = t - knot_values(knots, spans + 1 - j)
+        right[:, j] = knot_values(knots, spans + j) - t
+        saved = 0.0
+        for r in range(j):
+            # Lower triangle holds the knot differences
+            ndu[:, j, r] = right[:, r + 1] + left[:, j - r]
+            temp = ndu[:, r, j - 1] / ndu[:, j, r]
+            # Upper triangle holds the basis functions
+            ndu[:, r, j] = saved + right[:, r + 1] * temp
+            saved = left[:, j - r] * temp
+        ndu[:, j, j] = saved
+
+    ders = np.zeros((n, derivs + 1, p + 1))
+    ders[:, 0, :] = ndu[:, :, p]
+
+    # Derivatives above the degree are zero
+    for r in range(p + 1):
+        s1, s2 = 0, 1
+        a = np.zeros((n, 2, p + 1))
+        a[:, 0, 0] = 1.0
+        for k in range(1, min(derivs, p) + 1):
+            d = np.zeros(n)
+            rk = r - k
+            pk = p - k
+            if r >= k:
+                a[:, s2, 0] = a[:, s1, 0] / ndu[:, pk + 1, rk]
+                d = a[:, s2, 0] * ndu[:, rk, pk]
+            j1 = 1 if rk >= -1 else -rk
+            j2 = k - 1 if r - 1 <= pk else p - r
+            for j in range(j1, j2 + 1):
+                a[:, s2, j] = (a[:, s1, j] - a[:, s1, j - 1]) / ndu[:, pk + 1, rk + j]
+                d = d + a[:, s2, j] * ndu[:, rk + j, pk]
+            if r <= pk:
+                a[:, s2, k] = -a[:, s1, k - 1] / ndu[:, pk + 1, r]
+                d = d + a[:, s2, k] * ndu[:, r, pk]
+            ders[:, k, r] = d
+            s1, s2 = s2, s1
+
+    factor = p
+    for k in range(1, min(derivs, p) + 1):
+        ders[:, k, :] *= factor
+        factor *= p - k
+    return ders
+
+
+def homogeneous(control_points):
+    """(w x, w y, w z, w) from control points stored as (x, y, z, w)"""
+    pw = np.array(control_points, dtype=np.float64)
+    pw[..., :3] *= pw[..., 3:]
+    return pw
+
+
+def rational_curve_derivatives(aders):
+    """Derivatives of a rational curve from those of its homogeneous form
+    (The NURBS Book A4.2).  `aders` has shape (..., derivs + 1, 4); the
+    result has shape (..., derivs + 1, 3).
+    """
+    d = aders.shape[-2] - 1
+    ck = np.zeros(aders.shape[:-1] + (3,))
+    w = aders[..., 3]
+    for k in range(d + 1):
+        v = aders[..., k, :3].copy()
+        for i in range(1, k + 1):
+            v -= comb(k, i) * w[..., i, None] * ck[..., k - i, :]
+        ck[..., k, :] = v / w[..., 0, None]
+    return ck
+
+
+def rational_surface_derivatives(aders):
+    """Derivatives of a rational surface from those of its homogeneous form
+    (The NURBS Book A4.4).  `aders` has shape (..., d + 1, d + 1, 4) with
+    [..., k, l, :] the k-th u and l-th v derivative; the result has shape
+    (..., d + 1, d + 1, 3), zero where k + l > d.
+    """
+    d = aders.shape[-2] - 1
+    skl = np.zeros(aders.shape[:-1] + (3,))
+    w = aders[..., 3]
+    for k in range(d + 1):
+        for l in range(d - k + 1):
+            v = aders[..., k, l, :3].copy()
+            for j in range(1, l + 1):
+                v -= comb(l, j) * w[..., 0, j, None] * skl[..., k, l - j, :]
+            for i in range(1, k + 1):
+                v -= comb(k, i) * w[..., i, 0, None] * skl[..., k - i, l, :]
+                v2 = np.zeros_like(v)
+                for j in range(1, l + 1):
+                    v2 += comb(l, j) * w[..., i, j, None] * skl[..., k - i, l - j, :]
+                v -= comb(k, i) * v2
+            skl[..., k, l, :] = v / w[..., 0, 0, None]
+    return skl
+
+
+def curve_derivatives(degree, knots, pw, t, derivs=0, rows=None, n_knots=None):
+    """Derivatives of rational B-spline curves at the parameters `t`.
+
+    For one curve `knots` is its knot vector and `pw` its (n, 4)
+    homogeneous control points.  For several curves of the same degree
+    they are stacked, padded to a common length (knots with inf), with
+    `n_knots` the actual knot vector lengths; the curve of t[i] is then
+    rows[i].  Returns an array of shape (len(t), derivs + 1, 3), [:, k]
+    being the k-th derivative.
+    """
+    p = degree
+    result = np.zeros((len(t), derivs + 1, 3))
+    for start in range(0, len(t), batch_size):
+        tb = t[start:start + batch_size]
+        if rows is None:
+            point_knots, lengths, index = knots, None, ()
+        else:
+            index = (rows[start:start + batch_size, None],)
+            point_knots, lengths = knots[index[0][:, 0]], n_knots[index[0][:, 0]]
+
+        spans = find_spans(p, point_knots, tb, lengths)
+        n = basis_functions(p, point_knots, spans, tb, derivs)
+        net = pw[index + (spans[:, None] - p + np.arange(p + 1),)]    # (n, p + 1, 4)
+
+        aders = np.einsum('nki,nic->nkc', n, net)
+        result[start:start + batch_size] = rational_curve_derivatives(aders)
+    return result
+
+
+def surface_derivatives(degree_u, degree_v, knots_u, knots_v, pw, u, v, derivs=0):
+    """Derivatives of a rational B-spline surface at the points (u, v).
+
+    `pw` is the (n_v, n_u, 4) homogeneous control net and `u`, `v` are 1-d
+    arrays of the same length.  Returns an array of shape
+    (len(u), derivs + 1, derivs + 1, 3); [:, k, l] is the k-th u and l-th v
+    derivative, so [:, 0, 0] are the points.
+    """
+    p, q = degree_u, degree_v
+    result = np.zeros((len(u), derivs + 1, derivs + 1, 3))
+    for start in range(0, len(u), batch_size):
+        ub = u[start:start + batch_size]
+        vb = v[start:start + batch_size]
+
+        spans_u = find_spans(p, knots_u, ub)
+        spans_v = find_spans(q, knots_v, vb)
+        nu = basis_functions(p, knots_u, spans_u, ub, derivs)
+        nv = basis_functions(q, knots_v, spans_v, vb, derivs)
+
+        iu = spans_u[:, None] - p + np.arange(p + 1)
+        iv = spans_v[:, None] - q + np.arange(q + 1)
+        net = pw[iv[:, :, None], iu[:, None, :]]    # (n, q + 1, p + 1, 4)
+
+        aders = np.einsum('nki,nlj,njic->nklc', nu, nv, net)
+        result[start:start + batch_size] = rational_surface_derivatives(aders)
+    return result
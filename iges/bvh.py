@@ -0,0 +1,331 @@
+#!/usr/bin/env python
+import heapq
+import warnings
+
+import numpy as np
+
+from iges.arrays import spans
+from iges.entity import PointerError
+
+
+def box_distance(lo, hi, point):
+    """Distance from `point` to the boxes lo - hi (0 inside)"""
+    d = np.maximum(np.maximum(lo - point, point - hi), 0.0)
+    return np.sqrt((d * d).sum(axis=-1))
+
+
+def parameter_space_only(model, i, known):
+    """Whether entity `i` is referred to only as a curve in the parameter
+    space of a surface: the BPTR of a 142, a parameter space curve of a
+    141, or part of a composite curve (102) that is.  `known` caches the
+    answers by entity index.
+    """
+    if i in known:
+        return known[i]
+    known[i] = False    # composite curves in a cycle are not
+    de = model.entity_list[i].sequence_number
+    parents = model.graph.parents(i).tolist()
+    result = bool(parents)
+    for p in parents:
+        e = model.entity_list[p]
+        kind = e.entity_type_number
+        if kind == 142:
+            result = e.BPTR == de and de not in (e.SPTR, e.CPTR)
+        elif kind == 141:
+            result = de != e.SPTR and all(crvpt != de for crvpt, sense, curves in e.PSCPT)
+        elif kind == 102:
+            result = parameter_space_only(model, p, known)
+        else:
+            result = False
+        if not result:
+            break
+    known[i] = result
+    return result
+
+
+class BVH():
+    """Bounding volume hierarchy over axis-aligned boxes, e.g. the `bbox`
+    of the curves and surfaces of a model (see from_model()).
+
+    Nodes are stored in arrays: the box `lo`, `hi` of node i holds the
+    items order[start[i]:start[i] + count[i]]; its children are left[i]
+    and right[i], -1 for leaves.  Node 0 is the root.  Items are numbered
+    by their position in the boxes given to build(); `ids` maps them to
+    the caller's numbers, e.g. indices into model.entity_list, which is
+    what the queries return.
+
+    The tree is built in bulk, one level at a time: every node with more
+    than `leaf_size` items is split at the median of the box centres along
+    its longest axis.  Queries also go down one level at a time, testing
+    all nodes of a level in one array operation.
+    """
+
+    leaf_size = 8
+
+    def __init__(self, lo, hi, ids, order, start, count, left, right, node_lo, node_hi):
+        self.lo = lo
+        self.hi = hi
+        self.ids = ids
+        self.order = order
+        self.start = start
+        self.count = count
+        self.left = left
+        self.right = right
+        self.node_lo = node_lo
+        self.node_hi = node_hi
+
+    @classmethod
+    def build(cls, boxes, ids=None):
+        """BVH over `boxes`, an (n, 2, 3) array of (lower, upper) corners"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 2, 3)
+        lo = np.ascontiguousarray(boxes[:, 0])
+        hi = np.ascontiguousarray(boxes[:, 1])
+        n = len(boxes)
+        ids = np.arange(n) if ids is None else np.asarray(ids)
+        centres = (lo + hi) / 2
+        order = np.arange(n)
+
+        start = [np.array([0])]
+        count = [np.array([n])]
+        levels = []    # (parents, first child) of each level
+        n_nodes = 1
+        nodes = np.array([0])
+        while True:
+            split = count[-1] > cls.leaf_size
+            nodes, starts, counts = nodes[split], start[-1][split], count[-1][split]
+            if not len(nodes):
+                break
+
+            # Sort the items of each node along its longest axis
+            positions = spans(starts, counts)
+            items = order[positions]
+            c = centres[items]
+            offsets = np.cumsum(counts) - counts
+            extent = np.maximum.reduceat(c, offsets) - np.minimum.reduceat(c, offsets)
+            segment = np.repeat(np.arange(len(nodes)), counts)
+            key = c[np.arange(len(items)), extent.argmax(axis=1)[segment]]
+            order[positions] = items[np.lexsort((key, segment))]
+
+            half = counts // 2
+            first = n_nodes + 2 * np.arange(len(nodes))
+            levels.append((nodes, first))
+            n_nodes += 2 * len(nodes)
+            nodes = np.stack([first, first + 1], axis=1).ravel()
+            start.append(np.stack([starts, starts + half], axis=1).ravel())
+            count.append(np.stack([half, counts - half], axis=1).ravel())
+
+        start = np.concatenate(start)
+        count = np.concatenate(count)
+        left = np.full(n_nodes, -1)
+        right = np.full(n_nodes, -1)
+        for parents, first in levels:
+            left[parents] = first
+            right[parents] = first + 1
+
+        # Boxes of the leaves, which cover the items in order, then upwards
+        node_lo = np.empty((n_nodes, 3))
+        node_hi = np.empty((n_nodes, 3))
+        leaves = np.flatnonzero(left < 0)
+        leaves = leaves[np.argsort(start[leaves])]
+        if n:
+            node_lo[leaves] = np.minimum.reduceat(lo[order], start[leaves])
+            node_hi[leaves] = np.maximum.reduceat(hi[order], start[leaves])
+        else:
+            node_lo[:] = np.inf
+            node_hi[:] = -np.inf
+        for parents, first in reversed(levels):
+            node_lo[parents] = np.minimum(node_lo[first], node_lo[first + 1])
+            node_hi[parents] = np.maximum(node_hi[first], node_hi[first + 1])
+
+        return cls(lo, hi, ids, order, start, count, left, right, node_lo, node_hi)
+
+    @classmethod
+    def from_model(cls, model):
+        """BVH over the entities of `model` with a `bbox`, the curves and
+        surfaces, in model space: boxes of entities with a transform are
+        the boxes of their transformed corners.  A surface physically
+        dependent on trimmed (144) or bounded (143) surfaces is placed by
+        their matrices too (see TransformResolver.matrix_of()), as when it
+        is tessellated or converted; its box covers all its placements.
+        Curves only used in the parameter space of surfaces (see
+        parameter_space_only()) are left out, as are entities whose
+        placement refers to a missing entity, with a warning.
+        """
+        kinds = model.directory['entity_type_number']
+        parents = {}
+        for k in np.flatnonzero(np.isin(kinds, (143, 144))).tolist():
+            e = model.entity_list[k]
+            pointer = e.PTS if kinds[k] == 144 else e.SPTR
+            try:
+                surface = model.index_of(pointer)
+            except PointerError:
+                warnings.warn("DE {} refers to no surface at DE {}, it places none".format(
+                    e.sequence_number, pointer))
+                continue
+            parents.setdefault(surface, []).append(e)
+
+        # One (box, matrix) per placement, the identity for none
+        ids = []
+        boxes = []
+        placed = []
+        matrices = []
+        known = {}
+        for i, e in enumerate(model.entity_list):
+            bbox = getattr(e, 'bbox', None)
+            if bbox is None or (kinds[i] != 128 and parameter_space_only(model, i, known)):
+                continue
+            try:
+                placements = [model.transforms.matrix_of(e, parent)
+                              for parent in parents.get(i, [None])]
+            except PointerError as error:
+                warnings.warn("DE {} is left out of the BVH: {}".format(e.sequence_number, error))
+                continue
+            placed += [len(ids)] * len(placements)
+            matrices += placements
+            ids.append(i)
+            boxes.append(bbox)
+        ids = np.array(ids, dtype=np.int64)
+        boxes = np.array(boxes).reshape(-1, 2, 3)
+        if all(m is None for m in matrices):
+            return cls.build(boxes, ids)
+
+        placed = np.array(placed, dtype=np.int64)
+        matrices = np.array([np.eye(4) if m is None else m for m in matrices])
+        corner = np.array([[i >> 2 & 1, i >> 1 & 1, i & 1] for i in range(8)])
+        corners = boxes[placed][:, corner, np.arange(3)]    # (m, 8, 3)
+        corners = (np.einsum('mij,mkj->mki', matrices[:, :3, :3], corners) +
+                   matrices[:, None, :3, 3])
+
+        # The placements of a box are consecutive
+        first = np.flatnonzero(np.diff(placed, prepend=-1))
+        boxes = np.stack([np.minimum.reduceat(corners.min(axis=1), first),
+                          np.maximum.reduceat(corners.max(axis=1), first)], axis=1)
+        return cls.build(boxes, ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def leaf_items(self, leaves):
+        """Items of the nodes `leaves`"""
+        return self.order[spans(self.start[leaves], self.count[leaves])]
+
+    def query_box(self, lo, hi):
+        """ids of the boxes overlapping the box lo - hi"""
+        lo = np.asarray(lo, dtype=np.float64)
+        hi = np.asarray(hi, dtype=np.float64)
+        found = []
+        nodes = np.array([0])
+        while len(nodes):
+            nodes = nodes[(self.node_lo[nodes] <= hi).all(axis=1) &
+                          (self.node_hi[nodes] >= lo).all(axis=1)]
+            leaf = self.left[nodes] < 0
+            items = self.leaf_items(nodes[leaf])
+            found.append(items[(self.lo[items] <= hi).all(axis=1) &
+                               (self.hi[items] >= lo).all(axis=1)])
+            nodes = np.concatenate([self.left[nodes[~leaf]], self.right[nodes[~leaf]]])
+        return np.sort(self.ids[np.concatenate(found)])
+
+    def query_ray(self, origin, direction, t_max=np.inf):
+        """ids of the boxes hit by the ray origin + t direction, 0 <= t <=
+        t_max, and the t where the ray enters them, nearest first
+        """
+        origin = np.asarray(origin, dtype=np.float64)
+        with np.errstate(divide='ignore'):
+            inverse = 1.0 / np.asarray(direction, dtype=np.float64)
+
+        def entry(lo, hi):
+            # Slab test; nan (ray in a slab plane) counts as inside
+            with np.errstate(invalid='ignore'):
+                t1 = (lo - origin) * inverse
+                t2 = (hi - origin) * inverse
+            t_in = np.nanmax(np.fmin(t1, t2), axis=1, initial=0.0)
+            t_out = np.nanmin(np.fmax(t1, t2), axis=1, initial=t_max)
+            return t_in, t_in <= t_out
+
+        found = []
+        found_t = []
+        nodes = np.array([0])
+        while len(nodes):
+            t, hit = entry(self.node_lo[nodes], self.node_hi[nodes])
+            nodes = nodes[hit]
+            leaf = self.left[nodes] < 0
+            items = self.leaf_items(nodes[leaf])
+            t, hit = entry(self.lo[items], self.hi[items])
+            found.append(items[hit])
+            found_t.append(t[hit])
+            nodes = np.concatenate([self.left[nodes[~leaf]], self.right[nodes[~leaf]]])
+
+        found = np.concatenate(found)
+        found_t = np.concatenate(found_t)
+        by_t = np.argsort(found_t, kind='stable')
+        return self.ids[found[by_t]], found_t[by_t]
+
+    def nearest(self, point, k=1):
+        """ids of the k boxes nearest to `point` and their distances,
+        nearest first
+        """
+        point = np.asarray(point, dtype=np.float64)
+        ids = []
+        distances = []
+        # Best first: entries are (distance, is_item, node or item)
+        heap = [(0.0, 0, 0)]
+        while heap and len(ids) < k:
+            distance, is_item, i = heapq.heappop(heap)
+            if is_item:
+                ids.append(self.ids[i])
+                distances.append(distance)
+            elif self.left[i] < 0:
+                items = self.leaf_items(np.array([i]))
+                for d, item in zip(box_distance(self.lo[items], self.hi[items], point).tolist(),
+                                   items.tolist()):
+                    heapq.heappush(heap, (d, 1, item))
+            else:
+                children = np.array([self.left[i], self.right[i]])
+                for d, child in zip(box_distance(self.node_lo[children], self.node_hi[children],
+                                                 point).tolist(), children.tolist()):
+                    heapq.heappush(heap, (d, 0, child))
+        return np.array(ids, dtype=self.ids.dtype), np.array(distances)
+
+    def overlapping_pairs(self):
+        """(m, 2) array of the ids of the pairs of overlapping boxes, e.g.
+        candidates for clash detection
+        """
+        found = []
+        a = np.array([0])
+        b = np.array([0])
+        while len(a):
+            overlap = ((self.node_lo[a] <= self.node_hi[b]).all(axis=1) &
+                       (self.node_lo[b] <= self.node_hi[a]).all(axis=1))
+            a, b = a[overlap], b[overlap]
+            leaf_a = self.left[a] < 0
+            leaf_b = self.left[b] < 0
+
+            # Item pairs of two leaves, or of one leaf with itself
+            leaves = leaf_a & leaf_b
+            la, lb = a[leaves], b[leaves]
+            ca, cb = self.count[la], self.count[lb]
+            pair = np.repeat(np.arange(len(la)), ca * cb)
+            k = spans(np.zeros_like(ca), ca * cb)
+            ia = self.order[self.start[la][pair] + k // cb[pair]]
+            ib = self.order[self.start[lb][pair] + k % cb[pair]]
+            keep = ((self.lo[ia] <= self.hi[ib]).all(axis=1) &
+                    (self.lo[ib] <= self.hi[ia]).all(axis=1))
+            keep &= (la[pair] != lb[pair]) | (ia < ib)
+            found.append(np.stack([ia[keep], ib[keep]], axis=1))
+
+            # Otherwise split a node: a node with itself into its children's
+            # three pairs, else the larger one, or the one that is no leaf
+            same = ~leaves & (a == b)
+            l, r = self.left[a[same]], self.right[a[same]]
+            next_a = [l, r, l]
+            next_b = [l, r, r]
+            other = ~leaves & (a != b)
+            split_a = other & ~leaf_a & (leaf_b | (self.count[a] >= self.count[b]))
+            split_b = other & ~split_a
+            next_a += [self.left[a[split_a]], self.right[a[split_a]], a[split_b], a[split_b]]
+            next_b += [b[split_a], b[split_a], self.left[b[split_b]], self.right[b[split_b]]]
+            a = np.concatenate(next_a)
+            b = np.concatenate(next_b)
+
+        pairs = self.ids[np.concatenate(found)]
+        return np.sort(pairs, axis=1)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from iges.directory import DirectoryTable
+from iges.graph import ReferenceGraph
+from iges.mapped import MappedReader
+from iges.model import IGESModel
+from iges.parallel import ParallelReader, ParameterBlock
+from iges.reader import create_entities, parser_version
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Hex digest of the contents of the file `path`"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ModelCache():
+    """On-disk cache of parsed IGES models.
+
+    An entry holds the directory table, the reference graph and the decoded
+    parameter records (see ParameterBlock) of one file, as .npy files that
+    are memory mapped when the entry is loaded.  Entries are keyed by a hash
+    of the file contents plus `parser_version`.  When the cache grows past
+    `max_bytes`, the least recently used entries are removed.
+
+    Models are returned lazily read: entities decode their parameters from
+    the cached records on first access.
+
+        cache = ModelCache('/var/cache/iges')
+        model = cache.read('part.igs')
+    """
+
+    def __init__(self, directory, max_bytes=10 * 2**30):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, path):
+        return '{}-{}'.format(file_hash(path), parser_version)
+
+    def read(self, path, workers=None):
+        """Model of the IGES file `path`, parsed (with `workers` processes)
+        and stored if it is not in the cache yet
+        """
+        key = self.key(path)
+        model = self.load(key)
+        if model is None:
+            model = self.parse(path, workers)
+            self.store(key, model)
+        return model
+
+    def parse(self, path, workers=None):
+        model = MappedReader(path, lazy=True).read()
+        if model.parameter_section is None:
+            return model
+
+        reader = ParallelReader(path, workers or 1)
+        block = ParameterBlock.concatenate(reader.blocks(model))
+        model.close()
+        model.parameter_section = block
+        for e in model.entity_list:
+            e.set_parameter_section(block)
+        return model
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def store(self, key, model):
+        tmp = tempfile.mkdtemp(prefix='.tmp-', dir=self.directory)
+
+        def save(name, array):
+            np.save(os.path.join(tmp, name + '.npy'), array)
+
+        for name, column in model.directory.columns.items():
+            save('directory.' + name, column)
+
+        graph = model.graph
+        save('graph.forward.indptr', graph.forward[0])
+        save('graph.forward.indices', graph.forward[1])
+        save('graph.reverse.indptr', graph.reverse[0])
+        save('graph.reverse.indices', graph.reverse[1])
+        save('graph.dangling', graph.dangling)
+
+        block = model.parameter_section
+        if block is not None:
+            save('parameters.pointers', block.pointers)
+            save('parameters.des', block.des)
+            save('parameters.offsets', block.offsets)
+            save('parameters.values', block.values)
+
+        meta = {
+            'start_string': model.start_string,
+            'global_string': model.global_string,
+            'param_sep': model.param_sep,
+            'record_sep': model.record_sep,
+            'columns': list(model.directory.columns),
+            'strings': {} if block is None else
+                {str(k): tokens for k, tokens in block.strings.items()},
+        }
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        try:
+            os.replace(tmp, self.entry_path(key))
+        except OSError:    # stored meanwhile by another process
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    def load(self, key):
+        """Cached model for `key`, or None"""
+        path = self.entry_path(key)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            os.utime(path)    # mark as recently used
+        except (OSError, ValueError):
+            return None
+
+        def load(name):
+            return np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+
+        model = IGESModel()
+        model.start_string = meta['start_string']
+        model.global_string = meta['global_string']
+        model.param_sep = meta['param_sep']
+        model.record_sep = meta['record_sep']
+
+        directory = DirectoryTable({name: load('directory.' + name)
+                                    for name in meta['columns']})
+        model.set_directory(directory, create_entities(directory))
+        model.graph = ReferenceGraph(len(directory),
+                                     (load('graph.forward.indptr'), load('graph.forward.indices')),
+                                     (load('graph.reverse.indptr'), load('graph.reverse.indices')),
+                                     load('graph.dangling'))
+
+        if os.path.exists(os.path.join(path, 'parameters.values.npy')):
+            block = ParameterBlock(load('parameters.pointers'),
+                                   load('parameters.des'),
+                                   load('parameters.offsets'),
+                                   load('parameters.values'),
+                                   {int(k): tokens for k, tokens in meta['strings'].items()})
+            model.parameter_section = block
+            for e in model.entity_list:
+                e.set_parameter_section(block)
+
+        return model
+
+    def entries(self):
+        """(last use, size, path) of each cache entry, oldest first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            path = self.entry_path(name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            entries.append((os.stat(path).st_mtime, size, path))
+        return sorted(entries)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits"""
+        entries = self.entries()
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
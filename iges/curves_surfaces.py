@@ -1,7 +1,16 @@
 #!/usr/bin/env python
+from iges.bspline import curve_derivatives, homogeneous, surface_derivatives
 from iges.entity import Entity
 import os
 
+import numpy as np
+
+
+def real_array(parameters, start, stop):
+    """parameters[start:stop] as a float64 array"""
+    return np.asarray(parameters[start:stop], dtype=np.float64)
+
+
 class Line(Entity):
     """Straight line segment"""
 
@@ -13,6 +22,12 @@ class Line(Entity):
         self.y2 = float(parameters[5])
         self.z2 = float(parameters[6])
 
+        ends = np.array([[self.x1, self.y1, self.z1], [self.x2, self.y2, self.z2]])
+        self.bbox = np.array([ends.min(axis=0), ends.max(axis=0)])
+
+    def to_parameters(self, pointer):
+        return [110, self.x1, self.y1, self.z1, self.x2, self.y2, self.z2]
+
     def __str__(self):
         s = '--- Line ---' + os.linesep
         s += Entity.__str__(self) + os.linesep
@@ -20,6 +35,26 @@ class Line(Entity):
         s += "To point {0}, {1}, {2}".format(self.x2, self.y2, self.z2)
         return s
 
+class TransformationMatrix(Entity):
+    """ Transformation Matrix
+    IGES Spec v5.3 Section 4.21
+    """
+
+    def add_parameters(self, parameters):
+        # R11 R12 R13 T1 R21 R22 R23 T2 R31 R32 R33 T3, as a 4x4 matrix
+        # acting on (x, y, z, 1) columns
+        self.matrix = np.eye(4)
+        self.matrix[:3] = real_array(parameters, 1, 13).reshape(3, 4)
+
+    def to_parameters(self, pointer):
+        return [124] + self.matrix[:3].ravel().tolist()
+
+    def __str__(self):
+        s = '--- Transformation Matrix ---' + os.linesep
+        s += Entity.__str__(self) + os.linesep
+        s += str(self.matrix)
+        return s
+
 class CompositeCurveEntity(Entity):
     """ Composite Curve
     iges spec v5.3 p. 69 section 4.4
@@ -33,6 +68,12 @@ class CompositeCurveEntity(Entity):
         for i in range(self.N):
             self.DE.append(int(parameters[i + 2]))
             
+    def references(self):
+        return list(self.DE)
+
+    def to_parameters(self, pointer):
+        return [102, self.N] + [pointer(de) for de in self.DE]
+
     def __str__(self):
         s = '--- Composite Curve ---' + os.linesep
         # s += Entity.__str__(self) + os.linesep
@@ -60,25 +101,26 @@ class RationalBSplineCurve(Entity):
         self.N = 1 + self.K - self.M
         self.A = self.N + 2 * self.M
 
-        # Knot sequence
-        self.T = []
-        for i in range(7, 7 + self.A + 1):
-            self.T.append(float(parameters[i]))
+        # Knot sequence, weights, control points and parameter values,
+        # decoded in one go
+        values = real_array(parameters, 7, 14 + self.A + 4 * self.K)
+
+        self.T = values[:self.A + 1]
 
-        # Weights
-        self.W = []
-        for i in range(self.A + 8, self.A + self.K + 8 + 1):
-            self.W.append(float(parameters[i]))
+        # Control points as rows (x, y, z, w); W is a view of the weights
+        self.control_points = np.empty((self.K + 1, 4))
+        self.control_points[:, 3] = values[self.A + 1:self.A + self.K + 2]
+        self.control_points[:, :3] = values[self.A + self.K + 2:self.A + 4 * self.K + 5].reshape(-1, 3)
+        self.W = self.control_points[:, 3]
 
-        # Control points
-        self.control_points = []
-        for i in range(9 + self.A + self.K, 9 + self.A + 4*self.K + 1, 3):
-            point = (float(parameters[i]), float(parameters[i+1]), float(parameters[i+2]))
-            self.control_points.append(point)
+        # Bounding box (lower, upper corner) of the control points, which
+        # holds the curve for positive weights
+        self.bbox = np.array([self.control_points[:, :3].min(axis=0),
+                              self.control_points[:, :3].max(axis=0)])
 
         # Parameter values
-        self.V0 = float(parameters[12 + self.A + 4 * self.K])
-        self.V1 = float(parameters[13 + self.A + 4 * self.K])
+        self.V0 = float(values[self.A + 4 * self.K + 5])
+        self.V1 = float(values[self.A + 4 * self.K + 6])
 
         # Unit normal (only for planar curves)
         if len(parameters) > 14 + self.A + 4 * self.K + 1:
@@ -89,6 +131,26 @@ class RationalBSplineCurve(Entity):
         else:
             self.planar_curve = False
 
+    def to_parameters(self, pointer):
+        tokens = [126, self.K, self.M, self.prop1, self.prop2, self.prop3, self.prop4]
+        tokens += np.concatenate([self.T, self.control_points[:, 3],
+                                  self.control_points[:, :3].ravel(),
+                                  [self.V0, self.V1]]).tolist()
+        if self.planar_curve:
+            tokens += [self.XNORM, self.YNORM, self.ZNORM]
+        return tokens
+
+    def evaluate(self, t, derivs=0):
+        """Points and derivatives at the parameters `t`, which are clamped
+        to [V0, V1].  Returns an array of shape t.shape + (derivs + 1, 3)
+        whose [..., k, :] is the k-th derivative; so [..., 0, :] are the
+        points.
+        """
+        t = np.clip(np.asarray(t, dtype=np.float64), self.V0, self.V1)
+        ck = curve_derivatives(self.M, self.T, homogeneous(self.control_points),
+                               t.ravel(), derivs)
+        return ck.reshape(t.shape + ck.shape[1:])
+
     def __str__(self):
         s = '--- Rational B-Spline Curve ---' + os.linesep
         s += Entity.__str__(self) + os.linesep
@@ -105,6 +167,35 @@ class RationalBSplineCurve(Entity):
         return s
 
 
+def evaluate_curves(curves, t, derivs=0):
+    """Evaluate rational B-spline curves of the same degree in one go.
+
+    `t` are normalized parameters, 0 and 1 being V0 and V1 of each curve:
+    either one array for all curves or one row per curve.  Returns an
+    array of shape (len(curves), n, derivs + 1, 3); derivatives are with
+    respect to the curves' own parameters.
+    """
+    degree = curves[0].M
+    if any(c.M != degree for c in curves):
+        raise ValueError("curves of different degrees")
+
+    n_knots = np.array([len(c.T) for c in curves])
+    knots = np.full((len(curves), n_knots.max()), np.inf)
+    pw = np.zeros((len(curves), max(len(c.control_points) for c in curves), 4))
+    for i, c in enumerate(curves):
+        knots[i, :len(c.T)] = c.T
+        pw[i, :len(c.control_points)] = homogeneous(c.control_points)
+
+    v0 = np.array([c.V0 for c in curves])[:, None]
+    v1 = np.array([c.V1 for c in curves])[:, None]
+    t = np.asarray(t, dtype=np.float64)
+    t = v0 + np.clip(np.broadcast_to(t, (len(curves), t.shape[-1])), 0.0, 1.0) * (v1 - v0)
+    rows = np.repeat(np.arange(len(curves)), t.shape[1])
+
+    ck = curve_derivatives(degree, knots, pw, t.ravel(), derivs, rows, n_knots)
+    return ck.reshape(t.shape + ck.shape[1:])
+
+
 class RationalBSplineSurface(Entity):
     """Rational B-Spline Surface
     IGES Spec v5.3 p. 126 Section 4.24
@@ -129,34 +220,33 @@ class RationalBSplineSurface(Entity):
         self.B = self.N2 + 2 * self.M2
         self.C = (1 + self.K1) * (1 + self.K2)
 
-        # Knot sequence
-        self.T1 = []
-        for i in range(10, 10 + self.A + 1):
-            self.T1.append(float(parameters[i]))
-            
-        self.T2 = []
-        for i in range(11 + self.A, 11 + self.A + self.B + 1):
-            self.T2.append(float(parameters[i]))
-
-        # Weights
-        # 1+K1 * 1+K2
-        self.W = []
-        for i in range(self.A + self.B + 12, 11 + self.A + self.B + self.C + 1):
-            self.W.append(float(parameters[i]))
-
-        # Control points
-        self.control_points = []
-        for i in range(12 + self.A + self.B + self.C, 9 + self.A + self.B + 4*self.C + 1, 3):
-            point = (float(parameters[i]), float(parameters[i+1]), float(parameters[i+2]))
-            self.control_points.append(point)
+        # Knot sequences, weights, control points and parameter values,
+        # decoded in one go
+        values = real_array(parameters, 10, 16 + self.A + self.B + 4 * self.C)
+
+        self.T1 = values[:self.A + 1]
+        self.T2 = values[self.A + 1:self.A + self.B + 2]
+
+        # Control points as a (K2+1, K1+1, 4) array of (x, y, z, w), the
+        # u index running fastest as in the file.  W keeps the weights in
+        # file order
+        self.control_points = np.empty((self.K2 + 1, self.K1 + 1, 4))
+        self.control_points[..., 3] = values[self.A + self.B + 2:self.A + self.B + self.C + 2].reshape(self.K2 + 1, self.K1 + 1)
+        self.control_points[..., :3] = values[self.A + self.B + self.C + 2:self.A + self.B + 4 * self.C + 2].reshape(self.K2 + 1, self.K1 + 1, 3)
+        self.W = self.control_points[..., 3].reshape(-1)
+
+        # Bounding box (lower, upper corner) of the control points, which
+        # holds the surface for positive weights
+        points = self.control_points[..., :3].reshape(-1, 3)
+        self.bbox = np.array([points.min(axis=0), points.max(axis=0)])
 
         # Parameter values
-        self.U0 = float(parameters[12 + self.A + self.B + 4 * self.C])
-        self.U1 = float(parameters[13 + self.A + self.B + 4 * self.C])
-                        
-        self.V0 = float(parameters[14 + self.A + self.B + 4 * self.C])
-        self.V1 = float(parameters[15 + self.A + self.B + 4 * self.C])
-                        
+        self.U0 = float(values[self.A + self.B + 4 * self.C + 2])
+        self.U1 = float(values[self.A + self.B + 4 * self.C + 3])
+
+        self.V0 = float(values[self.A + self.B + 4 * self.C + 4])
+        self.V1 = float(values[self.A + self.B + 4 * self.C + 5])
+
         # # Unit normal (only for planar curves)
         # if len(parameters) > 14 + self.A + 4 * self.K + 1:
         #     sf.planar_curve = True
@@ -166,6 +256,35 @@ class RationalBSplineSurface(Entity):
         # else:
         #     self.planar_curve = False
 
+    def to_parameters(self, pointer):
+        tokens = [128, self.K1, self.K2, self.M1, self.M2,
+                  self.prop1, self.prop2, self.prop3, self.prop4, self.prop5]
+        tokens += np.concatenate([self.T1, self.T2, self.control_points[..., 3].ravel(),
+                                  self.control_points[..., :3].ravel(),
+                                  [self.U0, self.U1, self.V0, self.V1]]).tolist()
+        return tokens
+
+    def evaluate(self, u, v, derivs=0):
+        """Points and partial derivatives at the parameters (u, v).
+
+        `u` and `v` are arrays (or scalars) of the same shape.  Returns an
+        array of shape u.shape + (derivs + 1, derivs + 1, 3) whose
+        [..., k, l, :] is the k-th derivative in u and l-th in v; so
+        [..., 0, 0, :] are the points.
+        """
+        u, v = np.broadcast_arrays(np.asarray(u, dtype=np.float64),
+                                   np.asarray(v, dtype=np.float64))
+        skl = surface_derivatives(self.M1, self.M2, self.T1, self.T2,
+                                  homogeneous(self.control_points),
+                                  u.ravel(), v.ravel(), derivs)
+        return skl.reshape(u.shape + skl.shape[1:])
+
+    def normal(self, u, v):
+        """Unit normals (Su x Sv) at the parameters (u, v)"""
+        skl = self.evaluate(u, v, 1)
+        n = np.cross(skl[..., 1, 0, :], skl[..., 0, 1, :])
+        return n / np.linalg.norm(n, axis=-1, keepdims=True)
+
     def __str__(self):
         s = '--- Rational B-Spline Surface ---' + os.linesep
         s += Entity.__str__(self) + os.linesep
@@ -213,6 +332,19 @@ class BoundaryEntity(Entity):
             self.PSCPT.append((CRVPT, SENSE, curves))
 
         
+    def references(self):
+        refs = [self.SPTR]
+        for crvpt, sense, curves in self.PSCPT:
+            refs.append(crvpt)
+            refs.extend(curves)
+        return refs
+
+    def to_parameters(self, pointer):
+        tokens = [141, self.TYPE, self.PREF, pointer(self.SPTR), self.N]
+        for crvpt, sense, curves in self.PSCPT:
+            tokens += [pointer(crvpt), sense, len(curves)] + [pointer(c) for c in curves]
+        return tokens
+
     def __str__(self):
         s = '--- Boundary ---' + os.linesep
         # s += Entity.__str__(self) + os.linesep
@@ -238,6 +370,12 @@ class BoundedSurfaceEntity(Entity):
             self.BDPT.append(int(parameters[i]))
             
 
+    def references(self):
+        return [self.SPTR] + self.BDPT
+
+    def to_parameters(self, pointer):
+        return [143, self.TYPE, pointer(self.SPTR), self.N] + [pointer(p) for p in self.BDPT]
+
     def __str__(self):
         s = '--- Bounded Surface ---' + os.linesep
         # s += Entity.__str__(self) + os.linesep
@@ -259,6 +397,13 @@ class ParametericCurveEntity(Entity):
         self.PREF = int(parameters[5])
 
 
+    def references(self):
+        return [self.SPTR, self.BPTR, self.CPTR]
+
+    def to_parameters(self, pointer):
+        return [142, self.CRTN, pointer(self.SPTR), pointer(self.BPTR), pointer(self.CPTR),
+                self.PREF]
+
     def __str__(self):
         s = '--- Parameteric Curve ---' + os.linesep
         # s += Entity.__str__(self) + os.linesep
@@ -286,6 +431,13 @@ class TrimmedSurfaceEntity(Entity):
             self.PTI.append(int(parameters[i+5]))
 
 
+    def references(self):
+        return [self.PTS, self.PTO] + self.PTI
+
+    def to_parameters(self, pointer):
+        return [144, pointer(self.PTS), self.N1, self.N2, pointer(self.PTO)] + \
+            [pointer(p) for p in self.PTI]
+
     def __str__(self):
         s = '--- Trimmed Surface ---' + os.linesep
         # s += Entity.__str__(self) + os.linesep
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+import numpy as np
+
+# Integer fields of a directory entry: (key, line, first column, end column),
+# columns counted from 0.  See IGES spec v5.3, p. 24, Section 2.2.4.4
+directory_fields = [
+    ('entity_type_number', 0, 0, 8),
+    ('parameter_pointer', 0, 8, 16),
+    ('structure', 0, 16, 24),
+    ('line_font_pattern', 0, 24, 32),
+    ('level', 0, 32, 40),
+    ('view', 0, 40, 48),
+    ('transform', 0, 48, 56),
+    ('label_assoc', 0, 56, 64),
+    ('status_number', 0, 64, 72),
+    ('sequence_number', 0, 73, 80),
+    ('line_weight_number', 1, 8, 16),
+    ('color_number', 1, 16, 24),
+    ('param_line_count', 1, 24, 32),
+    ('form_number', 1, 32, 40),
+    ('entity_subs_num', 1, 64, 72),
+]
+
+# Directory fields that hold DE pointers, with the sign a pointer has there
+# (negative structure, line font, level, and color values point to
+# definitions, e.g. a color definition entity, 314)
+directory_pointer_fields = [
+    ('structure', -1),
+    ('line_font_pattern', -1),
+    ('level', -1),
+    ('color_number', -1),
+    ('view', 1),
+    ('transform', 1),
+    ('label_assoc', 1),
+]
+
+
+def decode_int_fields(chars):
+    """Decode right justified integer fields.
+
+    `chars` is an (n, width) uint8 array holding one field per row.  Blank
+    fields decode to 0.
+    """
+    isdigit = (chars >= ord('0')) & (chars <= ord('9'))
+    # The power of ten of a digit is the number of digits to its right
+    place = np.cumsum(isdigit[:, ::-1], axis=1)[:, ::-1] - 1
+    digits = np.where(isdigit, chars.astype(np.int64) - ord('0'), 0)
+    values = (digits * 10 ** np.maximum(place, 0)).sum(axis=1)
+    negative = (chars == ord('-')).any(axis=1)
+    return np.where(negative, -values, values)
+
+
+def encode_int_fields(values, width, zeros=False):
+    """Right justified integer fields of `values`, as an (n, width) uint8
+    array; the inverse of decode_int_fields().  With `zeros` the fields are
+    padded with zeros instead of blanks.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    magnitude = np.abs(values)
+    chars = np.full((len(values), width), ord('0' if zeros else ' '), dtype=np.uint8)
+    sign = np.full(len(values), width - 1)    # column of the '-' of negatives
+
+    # Digits from the right, while any are left
+    for column in range(width - 1, -1, -1):
+        digit = (magnitude > 0) | (column == width - 1)
+        chars[digit, column] = magnitude[digit] % 10 + ord('0')
+        sign[digit] = column - 1
+        magnitude //= 10
+    negative = values < 0
+    if (magnitude > 0).any() or (sign[negative] < 0).any():
+        raise ValueError("integers do not fit in fields of width {}".format(width))
+    chars[negative, sign[negative]] = ord('-')
+    return chars
+
+
+class DirectoryTable():
+    """Directory entry section stored column-wise.
+
+    `columns` maps each key of `directory_fields` to an int64 array with one
+    element per entity; 'entity_label' holds the labels as an 'S8' array.
+    Defaulted (blank) integer fields are 0.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+
+    @classmethod
+    def from_records(cls, records):
+        """Decode an (n, 2, record_length) uint8 array of D line pairs"""
+        columns = {}
+        for key, line, start, end in directory_fields:
+            columns[key] = decode_int_fields(records[:, line, start:end])
+        labels = np.ascontiguousarray(records[:, 1, 56:64]).view('S8')[:, 0]
+        columns['entity_label'] = np.char.strip(labels)
+        return cls(columns)
+
+    def to_records(self):
+        """Encode the table as an (n, 2, 80) uint8 array of D line pairs,
+        the inverse of from_records()
+        """
+        n = len(self)
+        records = np.full((n, 2, 80), ord(' '), dtype=np.uint8)
+        for key, line, start, end in directory_fields + [('entity_type_number', 1, 0, 8)]:
+            zeros = key in ('status_number', 'sequence_number')
+            records[:, line, start:end] = encode_int_fields(self.columns[key], end - start, zeros)
+        records[:, 1, 73:80] = encode_int_fields(self.columns['sequence_number'] + 1, 7, True)
+        records[:, :, 72] = ord('D')
+        if n:
+            labels = np.char.rjust(self.columns['entity_label'].astype('S8'), 8)
+            records[:, 1, 56:64] = np.frombuffer(labels.tobytes(), np.uint8).reshape(n, 8)
+        return records
+
+    @classmethod
+    def from_lines(cls, lines):
+        """Decode a list of D lines (str, columns 1-80), in pairs"""
+        data = ''.join(line[:80].ljust(80) for line in lines).encode('latin-1')
+        return cls.from_records(np.frombuffer(data, np.uint8).reshape(-1, 2, 80))
+
+    def __len__(self):
+        return len(self.columns['entity_type_number'])
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    def keys(self):
+        """Keys of Entity.d"""
+        return [key for key, line, start, end in directory_fields
+                if key != 'sequence_number'] + ['entity_label']
+
+    def value(self, i, key):
+        value = self.columns[key][i]
+        if key == 'entity_label':
+            return value.decode('latin-1')
+        return int(value)
+
+    def row(self, i):
+        """Fields of entity `i` as a dict, keyed as in Entity.d"""
+        return {key: self.value(i, key) for key in self.keys()}
+
+    def take(self, indices):
+        """DirectoryTable of the rows `indices`"""
+        return DirectoryTable({key: column[indices] for key, column in self.columns.items()})
+
+    def select(self, **fields):
+        """Row indices of the entities whose fields equal the given values,
+        e.g. select(entity_type_number=128, level=5)
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in fields.items():
+            mask &= self.columns[key] == value
+        return np.flatnonzero(mask)
@@ -1,24 +1,143 @@
 #!/usr/bin/env python
 import os
+import time
+from collections.abc import Mapping
+
+import numpy as np
+
 from iges.constants import line_font_pattern
 
 def process_global_section(global_string):
     print(global_string)
 
 
+# Types without a class whose parameter data holds no DE pointers: null,
+# circular arc, conic arc, copious data, parametric spline curve and
+# surface, direction, color definition
+pointer_free_types = frozenset((0, 100, 104, 106, 112, 114, 123, 314))
+
+
+class PointerError(KeyError):
+    """A DE pointer that does not refer to an entity"""
+
+    def __str__(self):
+        return "DE pointer {} does not refer to an entity".format(self.args[0])
+
+
+class DirectoryRow(Mapping):
+    """The directory entry fields of one entity, read from its DirectoryTable"""
+
+    __slots__ = ('directory', 'index')
+
+    def __init__(self, directory, index):
+        self.directory = directory
+        self.index = index
+
+    def __getitem__(self, key):
+        return self.directory.value(self.index, key)
+
+    def __iter__(self):
+        return iter(self.directory.keys())
+
+    def __len__(self):
+        return len(self.directory.keys())
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class Entity():
-    def __init__(self):
-        self.d = dict()
-
-    def add_section(self, string, key, type='int'):
-        string = string.strip()
-        if type == 'string':
-            self.d[key] = string
-        else:
-            if len(string) > 0:
-                self.d[key] = int(string)
-            else:
-                self.d[key] = None
+    """Base of all entities.
+
+    An entity holds no directory data itself: it is a view on row `index`
+    of a DirectoryTable, read through `d`.  Parameters are set as
+    attributes by add_parameters() in subclasses.
+    """
+
+    __slots__ = ('directory', 'index', '_parameter_section', 'parameters')
+
+    def __init__(self, directory=None, index=None):
+        self.directory = directory
+        self.index = index
+        self._parameter_section = None
+        self.parameters = None    # tokens of entities without a class
+
+    @property
+    def d(self):
+        return DirectoryRow(self.directory, self.index)
+
+    @property
+    def sequence_number(self):
+        return self.directory.value(self.index, 'sequence_number')
+
+    @property
+    def entity_type_number(self):
+        return self.directory.value(self.index, 'entity_type_number')
+
+    @property
+    def decoded(self):
+        """Whether the parameters are decoded, see set_parameter_section()"""
+        return self._parameter_section is None
+
+    def set_parameter_section(self, section):
+        """Defer add_parameters() until a parameter attribute is first read.
+        `section` is the ParameterSection the data is read back from.
+        """
+        self._parameter_section = section
+
+    def load_parameters(self):
+        """Decode the parameters of a lazily read entity now"""
+        section = self._parameter_section
+        if section is None:
+            return
+        # Cleared while decoding, so what add_parameters() reads back of
+        # what it sets does not start another decode
+        self._parameter_section = None
+        try:
+            stats = section.stats
+            if stats is None:
+                self.add_parameters(section.parameters(self.d['parameter_pointer']))
+                return
+
+            start = time.perf_counter()
+            self.add_parameters(section.parameters(self.d['parameter_pointer']))
+            seconds = time.perf_counter() - start
+            stats.add_decode(self.entity_type_number, seconds)
+            stats.add_time('parameters', seconds)
+        except BaseException:
+            # Still not decoded: the next access raises the error again
+            self.unload_parameters(section)
+            raise
+
+    def unload_parameters(self, section):
+        """Drop the decoded parameters, to be decoded again from `section`
+        when next read
+        """
+        if self._parameter_section is not None:
+            return    # not decoded
+        if hasattr(self, '__dict__'):
+            self.__dict__.clear()
+        self.parameters = None
+        self._parameter_section = section
+
+    def __getattr__(self, name):
+        # Only called for attributes that are not set yet
+        if name.startswith('__') or name == '_parameter_section':
+            raise AttributeError(name)
+        if self._parameter_section is None:
+            raise AttributeError(name)
+        self.load_parameters()
+        return getattr(self, name)
+
+    def __getstate__(self):
+        # Pickled on its own, e.g. to be sent to a worker process: with its
+        # parameters decoded and a copy of its directory row only
+        self.load_parameters()
+        slots = {'directory': self.directory.take([self.index]),
+                 'index': 0,
+                 '_parameter_section': None,
+                 'parameters': self.parameters}
+        return getattr(self, '__dict__', None), slots
 
     def __str__(self):
         s = "----- Entity -----" + os.linesep
@@ -40,6 +159,30 @@ class Entity():
 
         return s
     def add_parameters(self, parameters):
-        pass
+        self.parameters = parameters
+
+    def references(self):
+        """DE pointers held in the parameter data (0 meaning none)"""
+        return []
+
+    def pointers_known(self):
+        """Whether references() and to_parameters() know all the DE
+        pointers of the parameter data.  Not so for types without a class,
+        other than those in `pointer_free_types`.
+        """
+        return type(self) is not Entity or self.entity_type_number in pointer_free_types
+
+    def to_parameters(self, pointer):
+        """Tokens of the parameter data, the entity type number first, DE
+        pointers mapped through the function `pointer` (see iges.writer).
+        Entities of types without a class return their tokens as read,
+        pointers unmapped as they are not known.
+        """
+        self.load_parameters()
+        tokens = self.parameters
+        if isinstance(tokens, np.ndarray):
+            # Decoded as floats by iges.parallel; integers are written as such
+            tokens = [int(t) if t.is_integer() else t for t in tokens.tolist()]
+        return list(tokens)
 
 
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+""" Extraction of some entities of an IGES file, with every entity they
+depend on, into a new file.
+
+The file is read lazily (see iges.reader.read), so only the directory is
+decoded up front.  The dependency closure is found one level at a time:
+the pointer fields of the directory entries, and the parameter data of
+the entities whose class has pointers in it (Entity.references()).
+Other records, such as those of B-spline curves and surfaces, are not
+decoded, and are copied line by line by the writer (see IGESWriter).
+Entities of types whose pointers are not known (see
+Entity.pointers_known()) can not be renumbered, so extracting them
+raises a ValueError.
+"""
+import numpy as np
+
+from iges.directory import directory_pointer_fields
+from iges.entity import Entity, PointerError
+from iges.graph import ReferenceGraph
+from iges.reader import read
+from iges.writer import write
+
+
+def select(model, selector):
+    """Row indices of the entities of `selector`: either a dict of
+    directory field values, e.g. {'entity_type_number': 144, 'level': 5},
+    a value being a single one or a list of them, and labels str or
+    bytes; or the DE pointers of the entities
+    """
+    if isinstance(selector, dict):
+        mask = np.ones(len(model.directory), dtype=bool)
+        for key, values in selector.items():
+            if isinstance(values, (str, bytes, int)):
+                values = [values]
+            if key == 'entity_label':
+                values = [v.encode('latin-1') if isinstance(v, str) else v for v in values]
+            mask &= np.isin(model.directory[key], values)
+        return np.flatnonzero(mask)
+
+    des = np.asarray(list(selector), dtype=np.int64)
+    rows = ReferenceGraph.resolve(model, des)
+    if (rows < 0).any():
+        raise PointerError(int(des[rows < 0][0]))
+    return np.unique(rows)
+
+
+def closure(model, rows):
+    """Sorted row indices of the entities `rows` and of every entity they
+    refer to, directly or not
+    """
+    directory = model.directory
+    seen = np.zeros(len(directory), dtype=bool)
+    frontier = np.unique(np.asarray(rows, dtype=np.int64))
+    seen[frontier] = True
+    while len(frontier):
+        des = []
+        for key, sign in directory_pointer_fields:
+            values = directory[key][frontier] * sign
+            des.append(values[values > 0])
+        for i in frontier.tolist():
+            e = model.entity_list[i]
+            if type(e).references is not Entity.references:
+                des.append(np.asarray(e.references(), dtype=np.int64))
+        des = np.concatenate(des)
+        des = des[des != 0]
+
+        found = ReferenceGraph.resolve(model, des)
+        if (found < 0).any():
+            raise PointerError(int(des[found < 0][0]))
+        frontier = np.unique(found)
+        frontier = frontier[~seen[frontier]]
+        seen[frontier] = True
+    return np.flatnonzero(seen)
+
+
+def extract(path, selector, out_path):
+    """Write the entities of the IGES file `path` picked by `selector` (see
+    select()), and those they depend on, to `out_path`, in the order of
+    `path`.  Returns the number of entities written.
+    """
+    with read(path, lazy=True, mapped=True) as model:
+        rows = closure(model, select(model, selector))
+        write(model, out_path, [model.entity_list[i] for i in rows.tolist()])
+    return len(rows)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+import numpy as np
+
+from iges.arrays import spans
+from iges.directory import directory_pointer_fields
+
+
+def gather(indptr, indices, rows):
+    """Concatenate the CSR rows `rows` of (indptr, indices)"""
+    starts = indptr[rows]
+    return indices[spans(starts, indptr[rows + 1] - starts)]
+
+
+def csr(src, dst, n):
+    """(indptr, indices) of the edges src -> dst between n nodes"""
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst[order]
+
+
+class ReferenceGraph():
+    """DE pointer references between the entities of a model.
+
+    Nodes are indices into model.entity_list.  Edges come from the pointers
+    in each entity's parameter data (Entity.references()) and from the
+    pointer fields of its directory entry, such as `transform`.  All DE
+    pointers are resolved to indices in one array operation; those that do
+    not refer to an entity are kept in `dangling` as (index, DE pointer)
+    rows instead of raising.
+
+    `forward` and `reverse` are the edges as (indptr, indices) CSR arrays.
+    """
+
+    def __init__(self, n, forward, reverse, dangling):
+        self.n = n
+        self.forward = forward
+        self.reverse = reverse
+        self.dangling = dangling
+
+    @classmethod
+    def from_model(cls, model):
+        n = len(model.entity_list)
+        directory = model.directory
+
+        src = []
+        des = []
+        for i, e in enumerate(model.entity_list):
+            refs = e.references()
+            src.extend([i] * len(refs))
+            des.extend(refs)
+        src = [np.array(src, dtype=np.int64)]
+        des = [np.array(des, dtype=np.int64)]
+
+        for key, sign in directory_pointer_fields:
+            values = directory[key] * sign
+            rows = np.flatnonzero(values > 0)
+            src.append(rows)
+            des.append(values[rows])
+
+        src = np.concatenate(src)
+        des = np.concatenate(des)
+        keep = des != 0
+        src, des = src[keep], des[keep]
+
+        dst = cls.resolve(model, des)
+        found = dst >= 0
+        dangling = np.stack([src[~found], des[~found]], axis=1)
+        src, dst = src[found], dst[found]
+
+        return cls(n, csr(src, dst, n), csr(dst, src, n), dangling)
+
+    @staticmethod
+    def resolve(model, des):
+        """Indices of the entities at DE pointers `des`, -1 where none is"""
+        sequence_numbers = model.directory['sequence_number']
+        if not len(sequence_numbers):
+            return np.full(len(des), -1, dtype=np.int64)
+        # Directory entries take two lines each, so DE pointers are 2 * i + 1;
+        # a row out of range wraps to one that does not hold the pointer
+        rows = (des - 1) // 2 % len(sequence_numbers)
+        ok = sequence_numbers[rows] == des
+        if ok.all():
+            return rows
+
+        # Files with irregular numbering
+        rows[~ok] = -1
+        for k in np.flatnonzero(~ok):
+            rows[k] = model.pointer_dict.get(int(des[k]), -1)
+        return rows
+
+    def children(self, i):
+        """Indices of the entities entity `i` refers to"""
+        indptr, indices = self.forward
+        return indices[indptr[i]:indptr[i + 1]]
+
+    def parents(self, i):
+        """Indices of the entities that refer to entity `i`"""
+        indptr, indices = self.reverse
+        return indices[indptr[i]:indptr[i + 1]]
+
+    def closure(self, indices, reverse=False):
+        """Sorted indices of `indices` and every entity they refer to,
+        directly or not (or that refer to them, if `reverse`)
+        """
+        indptr, targets = self.reverse if reverse else self.forward
+        seen = np.zeros(self.n, dtype=bool)
+        frontier = np.unique(np.asarray(indices, dtype=np.int64))
+        seen[frontier] = True
+        while len(frontier):
+            frontier = np.unique(gather(indptr, targets, frontier))
+            frontier = frontier[~seen[frontier]]
+            seen[frontier] = True
+        return np.flatnonzero(seen)
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+import mmap
+
+import numpy as np
+
+from iges.directory import DirectoryTable
+from iges.model import IGESModel
+from iges.reader import IGESReader, ParameterSection, create_entities, global_separators
+from iges.stats import timer
+
+section_letters = 'SGDPT'
+
+
+def record_length(buf):
+    """Byte length of the fixed width records of `buf`, line end included,
+    or None if the records are not fixed width
+    """
+    newline = buf.find(b'\n', 0, 83)
+    if newline == -1:
+        length = 80    # records without line ends
+    elif newline >= 80:
+        length = newline + 1
+    else:
+        return None
+
+    # The last line may lack its line end
+    if len(buf) % length and (len(buf) + length - 80) % length:
+        return None
+    return length
+
+
+def section_counts_from_terminate(buf, length, n_records):
+    """Record counts of the S, G, D and P sections from the T record"""
+    last = buf[(n_records - 1) * length:(n_records - 1) * length + 80]
+    if last[72:73] != b'T':
+        return None
+    counts = []
+    for i, letter in enumerate(section_letters[:4]):
+        field = last[8 * i:8 * i + 8]
+        if field[0:1] != letter.encode() or not field[1:].strip().isdigit():
+            return None
+        counts.append(int(field[1:]))
+    return counts
+
+
+def section_counts_from_letters(letters):
+    """Record counts of the S, G, D and P sections from column 73 of
+    every record, checking the sections come in order
+    """
+    counts = [int(np.count_nonzero(letters == ord(c))) for c in section_letters]
+    expected = np.repeat(np.frombuffer(section_letters.encode(), np.uint8), counts)
+    if len(expected) != len(letters) or (expected != letters).any():
+        raise ValueError("IGES sections are out of order")
+    return counts[:4]
+
+
+class MappedReader():
+    """IGES reader that memory maps the file.
+
+    Section boundaries are found by arithmetic on the fixed record length
+    and the counts in the terminate record (column 73 of each record is
+    only scanned if those do not check out).  The directory section is
+    decoded straight from the mapped buffer into the model's DirectoryTable.
+
+    Files whose records are not fixed width are read with IGESReader.
+    Timings are recorded into `stats`, an iges.stats.Stats, if given.
+    """
+
+    def __init__(self, path, lazy=False, stats=None):
+        self.path = path
+        self.lazy = lazy
+        self.stats = stats
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            try:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:    # empty file
+                return IGESReader(self.path, lazy=self.lazy, stats=self.stats).read()
+
+        length = record_length(buf)
+        if length is None:
+            buf.close()
+            return IGESReader(self.path, lazy=self.lazy, stats=self.stats).read()
+
+        model = None
+        try:
+            model = self.read_sections(buf, length)
+        finally:
+            if model is None:
+                buf.close()
+
+        if not self.lazy:
+            model.close()
+        return model
+
+    def section_starts(self, buf, length):
+        """Return the first record and record count of each section"""
+        n_records = (len(buf) + length - 80) // length
+        counts = section_counts_from_terminate(buf, length, n_records)
+
+        starts = np.cumsum([0] + (counts or []))
+        if (counts is None or starts[-1] + 1 != n_records or
+                any(buf[starts[i] * length + 72] != ord(c)
+                    for i, c in enumerate(section_letters[:4]) if counts[i])):
+            letters = np.ndarray((n_records,), np.uint8, buffer=buf,
+                                 offset=72, strides=(length,))
+            counts = section_counts_from_letters(letters)
+            del letters
+            starts = np.cumsum([0] + counts)
+
+        return {c: (int(starts[i]), counts[i])
+                for i, c in enumerate(section_letters[:4])}
+
+    def section_text(self, buf, length, start, count):
+        """Columns 1-72 of `count` records from record `start`, joined"""
+        data = buf[start * length:(start + count) * length].decode('latin-1')
+        return ''.join(data[i:i + 72] for i in range(0, len(data), length))
+
+    def read_sections(self, buf, length):
+        model = IGESModel()
+        with timer(self.stats, 'scan'):
+            sections = self.section_starts(buf, length)
+
+        with timer(self.stats, 'global'):
+            model.start_string = self.section_text(buf, length, *sections['S'])
+            model.global_string = self.section_text(buf, length, *sections['G'])
+            model.param_sep, model.record_sep = global_separators(model.global_string)
+
+        with timer(self.stats, 'directory'):
+            start, count = sections['D']
+            records = np.frombuffer(buf, np.uint8, count=count * length,
+                                    offset=start * length)
+            directory = DirectoryTable.from_records(records.reshape(count // 2, 2, length))
+            del records
+            model.set_directory(directory, create_entities(directory))
+        if self.stats is not None:
+            self.stats.count_entities(directory, length)
+
+        start, count = sections['P']
+        section = ParameterSection(buf, start * length, length,
+                                   model.param_sep, model.record_sep)
+        section.end = (start + count) * length
+        section.stats = self.stats
+        model.parameter_section = section
+        for e in model.entity_list:
+            # Decoded now unless lazy, timed by load_parameters() with stats
+            e.set_parameter_section(section)
+            if not self.lazy:
+                e.load_parameters()
+
+        return model
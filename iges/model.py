@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+import os
+
+import numpy as np
+
+from iges.bvh import BVH
+from iges.directory import DirectoryTable
+from iges.entity import PointerError
+from iges.graph import ReferenceGraph
+from iges.transform import TransformResolver
+
+
+class IGESModel():
+    """Entities and section data of one IGES file.
+
+    The directory entries are held in `directory`, a DirectoryTable; the
+    entities in `entity_list` are views on its rows, in the same order.
+    """
+
+    def __init__(self):
+        self.start_string = ''
+        self.global_string = ''
+        self.param_sep = ','
+        self.record_sep = ';'
+
+        self.directory = DirectoryTable.from_lines([])
+        self.entity_list = []
+        self._pointer_dict = None
+        self._graph = None
+        self._bvh = None
+        self._transforms = None
+
+        # Set for lazily read models, see IGESReader
+        self.parameter_section = None
+
+    def set_directory(self, directory, entity_list):
+        self.directory = directory
+        self.entity_list = entity_list
+        self._pointer_dict = None
+        self._graph = None
+        self._bvh = None
+        self._transforms = None
+
+    @property
+    def pointer_dict(self):
+        """DE sequence number -> index into entity_list"""
+        if self._pointer_dict is None:
+            sequence_numbers = self.directory['sequence_number'].tolist()
+            self._pointer_dict = dict(zip(sequence_numbers, range(len(sequence_numbers))))
+        return self._pointer_dict
+
+    def index_of(self, pointer):
+        """Index into entity_list of the entity at DE pointer `pointer`"""
+        i = int(ReferenceGraph.resolve(self, np.array([pointer], dtype=np.int64))[0])
+        if i < 0:
+            raise PointerError(pointer)
+        return i
+
+    def get(self, pointer):
+        """Entity referenced by the DE pointer `pointer`"""
+        return self.entity_list[self.index_of(pointer)]
+
+    @property
+    def graph(self):
+        """ReferenceGraph of the model, built on first use"""
+        if self._graph is None:
+            self._graph = ReferenceGraph.from_model(self)
+        return self._graph
+
+    @graph.setter
+    def graph(self, graph):
+        self._graph = graph
+
+    @property
+    def transforms(self):
+        """TransformResolver of the model, made on first use"""
+        if self._transforms is None:
+            self._transforms = TransformResolver(self)
+        return self._transforms
+
+    @property
+    def bvh(self):
+        """BVH over the bounding boxes of the curves and surfaces in model
+        space, built on first use; its queries return indices into
+        entity_list
+        """
+        if self._bvh is None:
+            self._bvh = BVH.from_model(self)
+        return self._bvh
+
+    def in_box(self, lo, hi):
+        """Curves and surfaces whose bounding boxes overlap the box lo - hi"""
+        return [self.entity_list[i] for i in self.bvh.query_box(lo, hi)]
+
+    def children(self, e):
+        """Entities `e` refers to"""
+        return [self.entity_list[i] for i in self.graph.children(e.index)]
+
+    def parents(self, e):
+        """Entities that refer to `e`, e.g. the trimmed surfaces of a surface"""
+        return [self.entity_list[i] for i in self.graph.parents(e.index)]
+
+    def select(self, **fields):
+        """Entities whose directory fields equal the given values, e.g.
+        select(entity_type_number=128, level=5)
+        """
+        return [self.entity_list[i] for i in self.directory.select(**fields)]
+
+    def entities_of_type(self, entity_type_number):
+        return self.select(entity_type_number=entity_type_number)
+
+    def unload(self, e):
+        """Drop the decoded parameters of `e` if the model is lazily read;
+        they are decoded again when next used
+        """
+        if self.parameter_section is not None:
+            e.unload_parameters(self.parameter_section)
+
+    def close(self):
+        """Close the file a lazily read model decodes its parameters from"""
+        if self.parameter_section is not None:
+            self.parameter_section.close()
+            self.parameter_section = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.entity_list)
+
+    def __iter__(self):
+        return iter(self.entity_list)
+
+    def __str__(self):
+        s = '--- IGES Model ---' + os.linesep
+        s += self.global_string.strip() + os.linesep
+        s += "entities: {}".format(len(self.entity_list))
+        return s
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from iges.mapped import MappedReader
+from iges.reader import split_parameters
+
+
+class ParameterBlock():
+    """Decoded parameter records of one range of the P section.
+
+    Record k starts at P line `pointers[k]` and belongs to the entity at DE
+    pointer `des[k]`.  Its tokens are `values[offsets[k]:offsets[k + 1]]`
+    as float64, unless the record has tokens that are not numbers, in which
+    case they are in `strings[k]`.
+
+    A block can stand in for a model's ParameterSection: lazily read
+    entities decode from it by P pointer.
+    """
+
+    stats = None    # Stats recording lazy decoding, if any
+
+    def __init__(self, pointers, des, offsets, values, strings):
+        self.pointers = pointers
+        self.des = des
+        self.offsets = offsets
+        self.values = values
+        self.strings = strings
+
+    @classmethod
+    def concatenate(cls, blocks):
+        blocks = list(blocks)
+        strings = {}
+        n = 0
+        for block in blocks:
+            strings.update((k + n, tokens) for k, tokens in block.strings.items())
+            n += len(block)
+        offsets = [np.zeros(1, dtype=np.int64)]
+        end = 0
+        for block in blocks:
+            offsets.append(block.offsets[1:] + end)
+            end += block.offsets[-1]
+        return cls(np.concatenate([np.empty(0, dtype=np.int64)] + [b.pointers for b in blocks]),
+                   np.concatenate([np.empty(0, dtype=np.int64)] + [b.des for b in blocks]),
+                   np.concatenate(offsets),
+                   np.concatenate([np.empty(0)] + [b.values for b in blocks]),
+                   strings)
+
+    def __len__(self):
+        return len(self.des)
+
+    def record(self, k):
+        """Tokens of record k"""
+        if k in self.strings:
+            return self.strings[k]
+        return self.values[self.offsets[k]:self.offsets[k + 1]]
+
+    def parameters(self, pointer):
+        """Tokens of the record starting at P line `pointer`"""
+        k = int(np.searchsorted(self.pointers, pointer))
+        if k == len(self.pointers) or self.pointers[k] != pointer:
+            raise ValueError("no parameter record at P{}".format(pointer))
+        return self.record(k)
+
+    def close(self):
+        pass
+
+
+def decode_parameter_range(path, offset, size, record_length, param_sep, record_sep):
+    """Decode the P records in `size` bytes from `offset` into a
+    ParameterBlock.  Records are `record_length` bytes, or lines if None.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(size).decode('latin-1')
+
+    if record_length is None:
+        lines = data.splitlines()
+    else:
+        lines = [data[i:i + record_length] for i in range(0, len(data), record_length)]
+
+    pointers = []
+    des = []
+    offsets = [0]
+    values = []
+    strings = {}
+
+    param_string = ''
+    for line in lines:
+        if line[72:73] != 'P':
+            continue
+        if not param_string:
+            pointers.append(int(line[73:80]))
+            des.append(int(line[64:72]))
+        param_string += line[:64]
+        if param_string.rstrip()[-1:] != record_sep:
+            continue
+
+        tokens = split_parameters(param_string, param_sep, record_sep)
+        param_string = ''
+        try:
+            values.append(np.array(tokens, dtype=np.float64))
+        except ValueError:
+            strings[len(des) - 1] = tokens
+            values.append(np.empty(0))
+        offsets.append(offsets[-1] + len(values[-1]))
+
+    return ParameterBlock(np.array(pointers, dtype=np.int64),
+                          np.array(des, dtype=np.int64),
+                          np.array(offsets, dtype=np.int64),
+                          np.concatenate(values) if values else np.empty(0),
+                          strings)
+
+
+class ParallelReader():
+    """IGES reader that decodes the parameter data section in worker
+    processes.
+
+    The directory is read first (see MappedReader).  The P section is then
+    cut into byte ranges that start at entity boundaries and hold about the
+    same number of lines; each range is decoded by a worker into a compact
+    ParameterBlock, and the blocks are handed to the entities'
+    add_parameters() in the parent.
+    """
+
+    # Ranges per worker, to even out the load
+    chunks_per_worker = 4
+
+    def __init__(self, path, workers, stats=None):
+        self.path = path
+        self.workers = workers
+        self.stats = stats
+
+    def ranges(self, model):
+        """(offset, size) of the byte ranges of the P section to decode"""
+        directory = model.directory
+        section = model.parameter_section
+
+        if section.end is None:
+            # Records are not fixed width, see MappedReader
+            return [(section.offset, os.path.getsize(self.path) - section.offset)]
+
+        pointers = np.unique(directory['parameter_pointer'])
+        pointers = pointers[pointers > 0]
+        if len(pointers) == 0:
+            return []
+
+        # Cut at the record starts nearest to equal line counts
+        n = min(len(pointers), self.workers * self.chunks_per_worker)
+        targets = np.linspace(pointers[0], pointers[-1], n + 1)[1:-1]
+        cuts = np.minimum(np.searchsorted(pointers, targets), len(pointers) - 1)
+        starts = np.unique(np.append(pointers[cuts], pointers[0])).tolist()
+
+        if any(section.read_record(p) is None for p in starts):
+            section.build_index()
+
+        offsets = [section.line_offset(p) for p in starts] + [section.end]
+        return [(a, b - a) for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def blocks(self, model):
+        """Decode the P section of the lazily read `model` into a
+        ParameterBlock per range, in file order
+        """
+        section = model.parameter_section
+        ranges = self.ranges(model)
+        record_length = section.record_length
+        if section.end is None or section.index is not None:
+            record_length = None
+
+        args = ([self.path] * len(ranges),
+                [offset for offset, size in ranges],
+                [size for offset, size in ranges],
+                [record_length] * len(ranges),
+                [model.param_sep] * len(ranges),
+                [model.record_sep] * len(ranges))
+
+        if self.workers > 1 and len(ranges) > 1:
+            with ProcessPoolExecutor(self.workers) as executor:
+                yield from executor.map(decode_parameter_range, *args)
+        else:
+            yield from map(decode_parameter_range, *args)
+
+    def read(self):
+        model = MappedReader(self.path, lazy=True, stats=self.stats).read()
+        if model.parameter_section is None:
+            return model
+
+        start = time.perf_counter()
+        for block in self.blocks(model):
+            for k, de in enumerate(block.des.tolist()):
+                e = model.get(de)
+                e.set_parameter_section(None)
+                e.add_parameters(block.record(k))
+        if self.stats is not None:
+            # Decoded in the workers: wall time only, not per type
+            self.stats.add_time('parameters', time.perf_counter() - start)
+
+        model.close()
+        return model
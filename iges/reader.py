@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+import io
+import os
+import re
+import time
+
+from iges.curves_surfaces import *
+from iges.directory import DirectoryTable
+from iges.entity import Entity
+from iges.model import IGESModel
+from iges.stats import timer
+from iges.structure import (AssociativityInstance, Property, SingularSubfigureInstance,
+                            SubfigureDefinition)
+
+# http://ts.nist.gov/Standards/IGES/specfigures/index.cfm
+
+# Bump when a change to parsing changes what is decoded (see iges.cache)
+parser_version = 2
+
+# Entity type number -> class.  Types not listed are read as a plain Entity.
+entity_classes = {
+    # Curve and surface entities.  See IGES spec v5.3, p. 38, Table 3
+    102: CompositeCurveEntity,      # Composite curve
+    110: Line,                      # Line
+    126: RationalBSplineCurve,      # Rational B-spline curve
+    124: TransformationMatrix,      # Transformation matrix
+    128: RationalBSplineSurface,    # Rational B-spline surface
+    141: BoundaryEntity,            # Boundary Entity
+    142: ParametericCurveEntity,    # Parametric Curve
+    143: BoundedSurfaceEntity,      # Bounded Surface
+    144: TrimmedSurfaceEntity,      # Trimmed Surface
+    # Structure entities, classed for the DE pointers in their parameters
+    308: SubfigureDefinition,       # Subfigure definition
+    402: AssociativityInstance,     # Associativity instance
+    406: Property,                  # Property
+    408: SingularSubfigureInstance, # Singular subfigure instance
+    # Need to add more ...
+}
+
+
+def global_separators(global_string):
+    """Return (param_sep, record_sep) from the head of the global section.
+    Either may be defaulted, in which case ',' and ';' are used.
+    """
+    param_sep = ','
+    if global_string.startswith('1H'):
+        param_sep = global_string[2]
+        rest = global_string[4:]
+    else:
+        rest = global_string[1:]
+
+    record_sep = ';'
+    if rest.startswith('1H'):
+        record_sep = rest[2]
+
+    return param_sep, record_sep
+
+
+def create_entities(directory):
+    """One entity per row of the DirectoryTable `directory`"""
+    return [entity_classes.get(entity_type_number, Entity)(directory, i)
+            for i, entity_type_number in
+            enumerate(directory['entity_type_number'].tolist())]
+
+
+def set_directory(model, dict_lines):
+    """Decode the D lines `dict_lines` into the model's directory"""
+    directory = DirectoryTable.from_lines(dict_lines)
+    model.set_directory(directory, create_entities(directory))
+
+
+# Fortran style exponents, 1.0D3, are read as 1.0E3
+exponent_table = str.maketrans('Dd', 'Ee')
+
+# A Hollerith string token, e.g. 5HDodge
+hollerith = re.compile(r'\s*\d+H')
+
+
+def split_parameters(param_string, param_sep, record_sep):
+    """Split one parameter record (P lines, columns 1-64) into tokens"""
+    param_string = param_string.strip()[:-1]
+    if 'H' not in param_string:
+        return param_string.translate(exponent_table).split(param_sep)
+    # Hollerith strings are kept as they are
+    return [token if hollerith.match(token) else token.translate(exponent_table)
+            for token in param_string.split(param_sep)]
+
+
+def check_structure(model, terminated):
+    """Raise a ValueError if neither entities nor a terminate record were
+    found, i.e. the data is not IGES
+    """
+    if not model.entity_list and not terminated:
+        raise ValueError("no IGES directory, parameter or terminate records found")
+
+
+class ParameterSection():
+    """Random access to the parameter data section of an open file or mmap.
+
+    Records are located by arithmetic on the (fixed) record length from the
+    first P line; if a record is not where it should be, the section is
+    scanned once and an index of line offsets is used instead.
+    """
+
+    def __init__(self, f, offset, record_length, param_sep, record_sep):
+        self.f = f
+        self.offset = offset
+        self.record_length = record_length
+        self.param_sep = param_sep
+        self.record_sep = record_sep
+        self.index = None   # P sequence number -> byte offset, if needed
+        self.end = None     # byte offset of the T section, if known
+        self.owns_file = True
+        self.stats = None   # Stats recording lazy decoding, if any
+
+    def line_offset(self, pointer):
+        if self.index is not None:
+            return self.index.get(pointer)
+        return self.offset + (pointer - 1) * self.record_length
+
+    def build_index(self):
+        self.index = {}
+        self.f.seek(self.offset)
+        offset = self.offset
+        for line in iter(self.f.readline, b''):
+            if line[72:73] == b'P':
+                self.index[int(line[73:80])] = offset
+            elif line[72:73] == b'T':
+                break
+            offset += len(line)
+
+    def read_lines(self, pointer):
+        """Yield the lines from the start of P line `pointer` on, as str"""
+        offset = self.line_offset(pointer)
+        if offset is None:
+            return
+        self.f.seek(offset)
+        if self.index is None:
+            read_line = lambda: self.f.read(self.record_length)
+        else:
+            read_line = self.f.readline
+        for line in iter(read_line, b''):
+            yield line.decode('latin-1')
+
+    def read_record(self, pointer):
+        """Columns 1-64 of the lines of the record at P line `pointer`,
+        joined, or None if the lines found there are not that record
+        """
+        param_string = ''
+        for n, line in enumerate(self.read_lines(pointer)):
+            if line[72:73] != 'P':
+                return None
+            if n == 0:
+                sequence_number = line[73:80].strip()
+                if not sequence_number.isdigit() or int(sequence_number) != pointer:
+                    return None
+
+            param_string += line[:64]
+            if param_string.rstrip()[-1:] == self.record_sep:
+                return param_string
+        return None
+
+    def record_lines(self, pointer, count):
+        """Columns 1-64 of the `count` lines of the record at P line
+        `pointer`, undecoded, e.g. to copy the record to another file
+        """
+        for attempt in range(2):
+            lines = []
+            for line in self.read_lines(pointer):
+                sequence_number = line[73:80].strip()
+                if line[72:73] != 'P' or not sequence_number.isdigit() or \
+                        int(sequence_number) != pointer + len(lines):
+                    break
+                lines.append(line[:64])
+                if len(lines) == count:
+                    return lines
+            if self.index is not None:
+                break
+            self.build_index()
+        raise ValueError("no parameter record of {} lines at P{}".format(count, pointer))
+
+    def parameters(self, pointer):
+        """Tokens of the parameter record starting at P line `pointer`"""
+        param_string = self.read_record(pointer)
+        if param_string is None and self.index is None:
+            self.build_index()
+            param_string = self.read_record(pointer)
+        if param_string is None:
+            raise ValueError("no parameter record at P{}".format(pointer))
+
+        return split_parameters(param_string, self.param_sep, self.record_sep)
+
+    def close(self):
+        if self.owns_file:
+            self.f.close()
+
+
+class IGESReader():
+    """Streaming reader for IGES files.
+
+    `source` is a file name or an open file object (text or binary).  The
+    file is consumed one record at a time, so it is never held in memory as
+    a whole; only the resulting model is.
+
+    With `lazy=True` reading stops at the start of the parameter data
+    section.  Each entity decodes its parameters the first time one of them
+    is accessed, so opening a file costs a directory scan.  The model then
+    keeps the file open; close it with `model.close()`.  A lazy source must
+    be a file name or a seekable binary file.
+
+    Timings are recorded into `stats`, an iges.stats.Stats, if given.
+    """
+
+    def __init__(self, source, lazy=False, stats=None):
+        self.source = source
+        self.lazy = lazy
+        self.stats = stats
+
+    def open(self):
+        if isinstance(self.source, str):
+            return open(self.source, 'rb')
+        if self.lazy and isinstance(self.source, io.TextIOBase):
+            raise ValueError("lazy reading needs a binary file")
+        return self.source
+
+    def lines(self, f):
+        """Yield (byte offset, line) for the lines of `f`, lines as str.
+        Records without line ends are split into 80 column lines.
+        """
+        offset = 0
+        for line in f:
+            length = len(line)
+            if isinstance(line, bytes):
+                line = line.decode('latin-1')
+            if length >= 160:
+                data = line.rstrip('\r\n')
+                if len(data) % 80 == 0:
+                    for k in range(0, len(data), 80):
+                        yield offset + k, data[k:k + 80]
+                    offset += length
+                    continue
+            yield offset, line
+            offset += length
+
+    def records(self, f):
+        """Yield (offset, id_code, data, length) for each record, data
+        being columns 1-80 and length the byte length of the line
+        """
+        for offset, line in self.lines(f):
+            if len(line) < 73:
+                continue    # blank or truncated line
+            yield offset, line[72], line[:80], len(line)
+
+    def read(self):
+        f = self.open()
+        model = None
+        start = time.perf_counter()
+        try:
+            model = self.read_sections(f)
+            if self.stats is not None:
+                # Whatever is not decoding is reading and splitting records
+                self.stats.add_time('scan', time.perf_counter() - start -
+                                    sum(self.stats.sections.get(s, 0.0)
+                                        for s in ('global', 'directory', 'parameters')))
+                self.stats.count_entities(model.directory)
+        finally:
+            # A lazy model keeps reading from the file, see index_parameters()
+            if f is not self.source and (model is None or
+                                         model.parameter_section is None):
+                f.close()
+        return model
+
+    def read_sections(self, f):
+        model = IGESModel()
+
+        dict_lines = []
+        global_lines = []
+        param_string = ''
+        directory_pointer = None
+        terminated = False
+
+        for offset, id_code, data, length in self.records(f):
+            if id_code == 'S':     # Start
+                model.start_string += data[:72]
+
+            elif id_code == 'G':   # Global
+                global_lines.append(data[:72])    # Consolidate all global lines
+
+            elif id_code == 'D':   # Directory entry
+                if global_lines:
+                    self.read_global(model, ''.join(global_lines))
+                    global_lines = []
+
+                dict_lines.append(data)
+
+            elif id_code == 'P':   # Parameter data
+                if dict_lines:
+                    self.set_directory(model, dict_lines)
+                    dict_lines = []
+
+                if self.lazy:
+                    self.index_parameters(model, f, offset, length)
+                    break
+
+                # Concatenate multiple lines into one string
+                if directory_pointer is None:
+                    param_string = data[:64]
+                    directory_pointer = int(data[64:72])
+                else:
+                    param_string += data[:64]
+
+                if param_string.rstrip()[-1:] == model.record_sep:
+                    self.read_parameters(model, directory_pointer, param_string)
+                    directory_pointer = None
+
+            elif id_code == 'T':   # Terminate
+                terminated = True
+
+        if global_lines:
+            self.read_global(model, ''.join(global_lines))
+        if dict_lines:
+            self.set_directory(model, dict_lines)
+        check_structure(model, terminated)
+
+        return model
+
+    def read_global(self, model, global_string):
+        with timer(self.stats, 'global'):
+            model.global_string = global_string
+            model.param_sep, model.record_sep = global_separators(global_string)
+
+    def set_directory(self, model, dict_lines):
+        with timer(self.stats, 'directory'):
+            set_directory(model, dict_lines)
+
+    def read_parameters(self, model, directory_pointer, param_string):
+        if self.stats is None:
+            parameters = split_parameters(param_string, model.param_sep, model.record_sep)
+            model.get(directory_pointer).add_parameters(parameters)
+            return
+
+        start = time.perf_counter()
+        parameters = split_parameters(param_string, model.param_sep, model.record_sep)
+        e = model.get(directory_pointer)
+        e.add_parameters(parameters)
+        seconds = time.perf_counter() - start
+        self.stats.add_decode(e.entity_type_number, seconds)
+        self.stats.add_time('parameters', seconds)
+
+    def index_parameters(self, model, f, offset, record_length):
+        section = ParameterSection(f, offset, record_length,
+                                   model.param_sep, model.record_sep)
+        section.owns_file = f is not self.source
+        section.stats = self.stats
+        model.parameter_section = section
+        for e in model.entity_list:
+            e.set_parameter_section(section)
+
+
+def read(source, lazy=False, mapped=False, workers=None, stats=None):
+    """Read an IGES file (name or file object) and return an IGESModel.
+    With `mapped=True` the file (which must then be a file name) is memory
+    mapped, see iges.mapped.MappedReader.  With `workers` > 1 the parameter
+    data is decoded by that many processes, which open the file themselves,
+    so `source` must then be a file name too; see
+    iges.parallel.ParallelReader.  Timings are recorded into `stats`, an
+    iges.stats.Stats, if given.
+    """
+    if workers is not None and workers > 1 and not lazy:
+        if not isinstance(source, (str, bytes, os.PathLike)):
+            raise ValueError("reading with workers > 1 takes a file name, not a file object")
+        from iges.parallel import ParallelReader
+        return ParallelReader(source, workers, stats=stats).read()
+    if mapped:
+        from iges.mapped import MappedReader
+        return MappedReader(source, lazy=lazy, stats=stats).read()
+    return IGESReader(source, lazy=lazy, stats=stats).read()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+""" Instrumentation of reading and converting IGES files.
+
+Readers and the converter take an optional Stats object and record into
+it where the time goes: per section, per entity type, per exported
+surface.  Without one (the default) they only test for None, once per
+record at most.
+
+    stats = Stats()
+    model = read('part.igs', stats=stats)
+    print(stats)
+    stats.write_json('part.stats.json')
+"""
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:    # not on Windows
+    resource = None
+
+
+def peak_memory(who='self'):
+    """Peak resident set size in bytes of this process ('self') or of its
+    finished child processes ('children'), or None where unknown
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == 'self' else resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in bytes on macOS, in KiB elsewhere
+    return usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+
+
+def timer(stats, section):
+    """stats.timer(section), or nothing if `stats` is None"""
+    return nullcontext() if stats is None else stats.timer(section)
+
+
+def timed(function, *args):
+    """(function(*args), seconds it took), e.g. to time a job in a worker
+    process
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+class TypeStats():
+    """Counts of one entity type: entities in the directory, bytes of
+    parameter data, and records decoded and the seconds that took
+    """
+
+    __slots__ = ('count', 'bytes', 'decoded', 'decode_seconds')
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.decoded = 0
+        self.decode_seconds = 0.0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Stats():
+    """Where the time of reading (and converting) a file went.
+
+    `sections` maps a phase (e.g. 'directory', 'parameters', 'export') to
+    seconds, `types` an entity type number to its TypeStats, and `exports`
+    lists (DE pointer, seconds) of each exported surface.
+    """
+
+    def __init__(self):
+        self.sections = {}
+        self.types = {}
+        self.exports = []
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def timer(self, section):
+        """Add the time spent in the with block to `section`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(section, time.perf_counter() - start)
+
+    def add_time(self, section, seconds):
+        self.sections[section] = self.sections.get(section, 0.0) + seconds
+
+    def type_stats(self, entity_type_number):
+        entity_type_number = int(entity_type_number)
+        if entity_type_number not in self.types:
+            self.types[entity_type_number] = TypeStats()
+        return self.types[entity_type_number]
+
+    def count_entities(self, directory, line_length=80):
+        """Count the entities and parameter bytes (P lines of
+        `line_length`) of each type in the DirectoryTable `directory`
+        """
+        types, inverse = np.unique(directory['entity_type_number'], return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(types))
+        lines = np.bincount(inverse, weights=directory['param_line_count'], minlength=len(types))
+        for t, count, n in zip(types.tolist(), counts.tolist(), lines.tolist()):
+            type_stats = self.type_stats(t)
+            type_stats.count += count
+            type_stats.bytes += int(n) * line_length
+
+    def add_decode(self, entity_type_number, seconds):
+        """Record one parameter record of `entity_type_number` decoded in
+        `seconds`
+        """
+        type_stats = self.type_stats(entity_type_number)
+        type_stats.decoded += 1
+        type_stats.decode_seconds += seconds
+
+    def add_export(self, pointer, seconds):
+        """Record the export of the surface at DE pointer `pointer`"""
+        self.exports.append((int(pointer), seconds))
+
+    def as_dict(self):
+        """The stats as plain data, as written by write_json()"""
+        export_seconds = [seconds for pointer, seconds in self.exports]
+        return {'elapsed': time.perf_counter() - self.started,
+                'sections': dict(self.sections),
+                'types': {str(t): s.as_dict() for t, s in sorted(self.types.items())},
+                'exports': {'count': len(export_seconds),
+                            'seconds': sum(export_seconds),
+                            'slowest': [{'pointer': pointer, 'seconds': seconds}
+                                        for pointer, seconds in
+                                        sorted(self.exports, key=lambda x: -x[1])[:10]],
+                            'surfaces': [{'pointer': pointer, 'seconds': seconds}
+                                         for pointer, seconds in self.exports]},
+                'peak_memory': {'self': peak_memory('self'),
+                                'children': peak_memory('children')}}
+
+    def write_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def __str__(self):
+        report = self.as_dict()
+        lines = ["elapsed {:10.3f} s".format(report['elapsed'])]
+        for section, seconds in self.sections.items():
+            lines.append("  {:<12} {:10.3f} s".format(section, seconds))
+        if self.types:
+            lines.append("{:>6} {:>9} {:>12} {:>9} {:>10}".format(
+                'type', 'count', 'bytes', 'decoded', 'decode s'))
+            for t, s in sorted(self.types.items(), key=lambda x: -x[1].decode_seconds):
+                lines.append("{:>6} {:>9} {:>12} {:>9} {:>10.3f}".format(
+                    t, s.count, s.bytes, s.decoded, s.decode_seconds))
+        exports = report['exports']
+        if exports['count']:
+            lines.append("exports {} in {:.3f} s, slowest DE {} ({:.3f} s)".format(
+                exports['count'], exports['seconds'],
+                exports['slowest'][0]['pointer'], exports['slowest'][0]['seconds']))
+        for who, size in report['peak_memory'].items():
+            if size:
+                lines.append("peak memory ({}) {:.1f} MiB".format(who, size / 2 ** 20))
+        return '\n'.join(lines)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+""" Parsing of IGES data as it arrives, e.g. from a socket or an HTTP
+download, without spooling it to a file first.
+
+    parser = IncrementalParser()
+    for chunk in chunks:
+        for e in parser.feed(chunk):
+            ...     # e has its parameters
+    parser.close()
+    model = parser.model
+
+or, from an asyncio stream,
+
+    async for e in parse_stream(reader):
+        ...
+"""
+from iges.model import IGESModel
+from iges.reader import IGESReader, check_structure
+
+
+class IncrementalParser(IGESReader):
+    """Push parser of IGES data in chunks of any size.
+
+    Records are split out of the chunks as their lines complete, or every
+    80 bytes if the data has no line ends; the part of a record at the end
+    of a chunk is kept until the rest arrives.  The directory is decoded,
+    and the entities created, as soon as the D section is complete (the
+    first P line), and feed() returns each entity once its parameter
+    record is complete, with its parameters.
+
+    Timings are recorded into `stats`, an iges.stats.Stats, if given.
+    """
+
+    def __init__(self, stats=None):
+        super().__init__(None, stats=stats)
+        self.model = IGESModel()
+        self.rest = b''
+        self.global_lines = []
+        self.dict_lines = []
+        self.param_string = ''
+        self.directory_pointer = None
+        self.line_ends = None    # whether records end in newlines, once known
+        self.terminated = False
+        self.closed = False
+
+    def feed(self, chunk):
+        """Parse the bytes `chunk`; returns the entities it completes"""
+        if self.closed:
+            raise ValueError("data fed to a closed parser")
+        data = self.rest + chunk
+        if self.line_ends is None and len(data) >= 83:
+            self.line_ends = b'\n' in data[:83]
+        if self.line_ends is False:
+            n = len(data) // 80 * 80
+            lines = [data[k:k + 80] for k in range(0, n, 80)]
+            self.rest = data[n:]
+        else:
+            lines = data.split(b'\n')
+            self.rest = lines.pop()
+        return self.parse_lines(lines)
+
+    def close(self):
+        """Parse what is left after the last chunk; returns the entities it
+        completes.  Data ending within a parameter record, or that is not
+        IGES (no entities nor terminate record), raises a ValueError.
+        """
+        if self.closed:
+            return []
+        entities = self.parse_lines([self.rest] if self.rest else [])
+        self.rest = b''
+        self.closed = True
+
+        if self.global_lines:
+            self.read_global(self.model, ''.join(self.global_lines))
+        if self.dict_lines:
+            self.set_directory(self.model, self.dict_lines)
+        if self.directory_pointer is not None:
+            raise ValueError("data ends within the parameter record of DE {}".format(
+                self.directory_pointer))
+        check_structure(self.model, self.terminated)
+        if self.stats is not None:
+            self.stats.count_entities(self.model.directory)
+        return entities
+
+    def parse_lines(self, lines):
+        """Parse whole lines (bytes); returns the entities they complete"""
+        model = self.model
+        entities = []
+        for offset, id_code, data, length in self.records(lines):
+            if id_code == 'S':     # Start
+                model.start_string += data[:72]
+
+            elif id_code == 'G':   # Global
+                self.global_lines.append(data[:72])
+
+            elif id_code == 'D':   # Directory entry
+                if self.global_lines:
+                    self.read_global(model, ''.join(self.global_lines))
+                    self.global_lines = []
+
+                self.dict_lines.append(data)
+
+            elif id_code == 'P':   # Parameter data
+                if self.dict_lines:
+                    self.set_directory(model, self.dict_lines)
+                    self.dict_lines = []
+
+                if self.directory_pointer is None:
+                    self.param_string = data[:64]
+                    self.directory_pointer = int(data[64:72])
+                else:
+                    self.param_string += data[:64]
+
+                if self.param_string.rstrip()[-1:] == model.record_sep:
+                    self.read_parameters(model, self.directory_pointer, self.param_string)
+                    entities.append(model.get(self.directory_pointer))
+                    self.directory_pointer = None
+
+            elif id_code == 'T':   # Terminate
+                self.terminated = True
+        return entities
+
+
+async def parse_stream(reader, parser=None, chunk_size=1 << 16):
+    """Yield the entities of the IGES data of `reader` as they complete,
+    see IncrementalParser.  `reader` is an asyncio.StreamReader, or
+    anything with an awaitable read(n), or an async iterable of bytes
+    chunks.  Pass an IncrementalParser as `parser` to get the model
+    (parser.model) afterwards.
+    """
+    if parser is None:
+        parser = IncrementalParser()
+
+    if hasattr(reader, 'read'):
+        while True:
+            chunk = await reader.read(chunk_size)
+            if not chunk:
+                break
+            for e in parser.feed(chunk):
+                yield e
+    else:
+        async for chunk in reader:
+            for e in parser.feed(chunk):
+                yield e
+
+    for e in parser.close():
+        yield e
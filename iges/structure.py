@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+import os
+
+from iges.entity import Entity
+
+
+class SubfigureDefinition(Entity):
+    """ Subfigure Definition
+    IGES Spec v5.3, entity type 308
+    """
+
+    def add_parameters(self, parameters):
+        self.DEPTH = int(parameters[1])
+        self.NAME = parameters[2]
+        self.N = int(parameters[3])
+        self.DE = [int(p) for p in parameters[4:4 + self.N]]
+
+    def references(self):
+        return list(self.DE)
+
+    def to_parameters(self, pointer):
+        return [308, self.DEPTH, self.NAME, self.N] + [pointer(de) for de in self.DE]
+
+    def __str__(self):
+        s = '--- Subfigure Definition ---' + os.linesep
+        s += "NAME: {}".format(self.NAME) + os.linesep
+        s += str(self.DE)
+        return s
+
+
+class AssociativityInstance(Entity):
+    """ Associativity Instance
+    IGES Spec v5.3, entity type 402.  Only the group forms (1, 7, 14 and
+    15: N, then N DE pointers) are decoded; the layout of the others is
+    given by a definition (302) entity, so their pointers are not known.
+    """
+
+    group_forms = (1, 7, 14, 15)
+
+    def pointers_known(self):
+        return self.d['form_number'] in self.group_forms
+
+    def add_parameters(self, parameters):
+        if self.d['form_number'] not in self.group_forms:
+            self.parameters = parameters
+            return
+        self.N = int(parameters[1])
+        self.DE = [int(p) for p in parameters[2:2 + self.N]]
+
+    def references(self):
+        if self.d['form_number'] not in self.group_forms:
+            return []
+        return list(self.DE)
+
+    def to_parameters(self, pointer):
+        if self.d['form_number'] not in self.group_forms:
+            return Entity.to_parameters(self, pointer)
+        return [402, self.N] + [pointer(de) for de in self.DE]
+
+    def __str__(self):
+        s = '--- Associativity Instance ---' + os.linesep
+        s += "form: {}".format(self.d['form_number']) + os.linesep
+        s += str(self.DE if self.d['form_number'] in self.group_forms else self.parameters)
+        return s
+
+
+class Property(Entity):
+    """ Property
+    IGES Spec v5.3, entity type 406.  The forms in `pointer_free_forms`
+    hold numbers and strings only; the others may hold DE pointers.
+    """
+
+    # Definition levels, region restriction, level function, line
+    # widening, reference designator, name, drawing size and units,
+    # intercharacter spacing, dimension units
+    pointer_free_forms = (1, 2, 3, 5, 7, 15, 16, 17, 18, 28)
+
+    def pointers_known(self):
+        return self.d['form_number'] in self.pointer_free_forms
+
+
+class SingularSubfigureInstance(Entity):
+    """ Singular Subfigure Instance
+    IGES Spec v5.3, entity type 408
+    """
+
+    def add_parameters(self, parameters):
+        self.DE = int(parameters[1])
+        self.X = float(parameters[2])
+        self.Y = float(parameters[3])
+        self.Z = float(parameters[4])
+
+        # Scale factor, 1 if defaulted
+        self.S = 1.0
+        if len(parameters) > 5 and str(parameters[5]).strip():
+            self.S = float(parameters[5])
+
+    def references(self):
+        return [self.DE]
+
+    def to_parameters(self, pointer):
+        return [408, pointer(self.DE), self.X, self.Y, self.Z, self.S]
+
+    def __str__(self):
+        s = '--- Singular Subfigure Instance ---' + os.linesep
+        s += "Subfigure: {}".format(self.DE) + os.linesep
+        s += "Translation: {0}, {1}, {2}".format(self.X, self.Y, self.Z) + os.linesep
+        s += "Scale: {}".format(self.S)
+        return s
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+""" Tessellation of (trimmed) rational B-spline surfaces into indexed
+triangle meshes.
+
+The parameter domain is sampled on one grid over the whole surface, with
+the number of samples in each knot span chosen from the control net so the
+chordal deviation and the turning angle between samples stay within the
+tolerances.  Vertices are thus shared across knot span (patch) boundaries.
+Triangles wholly outside the trim region (see iges.trim) are dropped, and
+the vertices of the remaining ones that lie outside are moved onto the
+nearest trim curve.
+"""
+import numpy as np
+
+from iges.transform import apply_transform
+from iges.trim import TrimRegion, parameter_samples, span_segments
+
+
+class Mesh():
+    """Indexed triangle mesh: `vertices` and `normals` are (n, 3) arrays and
+    `uv` the (n, 2) surface parameters of the vertices; `triangles` is an
+    (m, 3) array of vertex indices, counter-clockwise in (u, v).
+    """
+
+    def __init__(self, vertices, normals, uv, triangles):
+        self.vertices = vertices
+        self.normals = normals
+        self.uv = uv
+        self.triangles = triangles
+
+    def __len__(self):
+        return len(self.triangles)
+
+
+def drop_unused(triangles, *arrays):
+    """`triangles` renumbered to the vertices they use, and `arrays` of
+    vertex data reduced to those
+    """
+    used, triangles = np.unique(triangles, return_inverse=True)
+    return (triangles.reshape(-1, 3),) + tuple(a[used] for a in arrays)
+
+
+def base_surface(model, entity):
+    """The rational B-spline surface of a 144, 143 or 128 entity"""
+    kind = entity.d['entity_type_number']
+    if kind == 128:
+        return entity
+    if kind == 144:
+        return model.get(entity.PTS)
+    if kind == 143:
+        return model.get(entity.SPTR)
+    raise ValueError("entity type {} is not a surface".format(kind))
+
+
+def tessellate(model, entity, chord=None, angle=np.radians(20)):
+    """Mesh of a trimmed (144) or bounded (143) surface, or of a
+    rational B-spline surface (128), in model space.
+
+    `chord` is the largest distance allowed between the surface and the
+    mesh, by default 1/1000 of the size of the control net; `angle` the
+    largest turning angle (radians) between neighbouring samples.
+    """
+    surface = base_surface(model, entity)
+    matrix = model.transforms.matrix_of(surface, None if surface is entity else entity)
+    points = surface.control_points[..., :3]
+    if matrix is not None:
+        points = apply_transform(matrix, points)
+    size = np.linalg.norm(np.ptp(points.reshape(-1, 3), axis=0))
+    if chord is None:
+        chord = 1e-3 * size
+
+    # Trim curves in parameter space, to the tolerance scaled to it
+    uv_size = np.hypot(surface.U1 - surface.U0, surface.V1 - surface.V0)
+    region = TrimRegion.from_entity(model, entity, chord * uv_size / max(size, 1e-300), angle)
+
+    u = parameter_samples(surface.M1, surface.T1,
+                          span_segments(np.moveaxis(points, 1, 0), surface.M1, chord, angle),
+                          surface.U0, surface.U1)
+    v = parameter_samples(surface.M2, surface.T2,
+                          span_segments(points, surface.M2, chord, angle),
+                          surface.V0, surface.V1)
+
+    # Grid vertex (i, j) is v[i], u[j]; two triangles per grid cell
+    nu, nv = len(u), len(v)
+    uv = np.stack(np.broadcast_arrays(u, v[:, None]), axis=-1).reshape(-1, 2)
+    corner = (np.arange(nv - 1)[:, None] * nu + np.arange(nu - 1)).ravel()
+    triangles = np.concatenate([np.stack([corner, corner + 1, corner + nu + 1], axis=1),
+                                np.stack([corner, corner + nu + 1, corner + nu], axis=1)])
+
+    if region is not None:
+        # Keep the triangles reaching into the trimmed region and pull
+        # their outer vertices onto its boundary
+        vertex_inside = region.contains(uv)
+        keep = vertex_inside[triangles].any(axis=1)
+        keep |= region.contains(uv[triangles].mean(axis=1))
+        triangles = triangles[keep]
+        outside = np.unique(triangles[~vertex_inside[triangles]])
+        uv[outside] = region.nearest(uv[outside])
+
+        # Drop the triangles this collapsed
+        t = uv[triangles]
+        d1 = t[:, 1] - t[:, 0]
+        d2 = t[:, 2] - t[:, 0]
+        area = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+        triangles = triangles[area > 1e-12 * uv_size ** 2]
+
+    triangles, uv = drop_unused(triangles, uv)
+
+    skl = surface.evaluate(uv[:, 0], uv[:, 1], 1)
+    vertices = skl[:, 0, 0]
+    su, sv = skl[:, 1, 0], skl[:, 0, 1]
+    if matrix is not None:
+        vertices = apply_transform(matrix, vertices)
+        su = su @ matrix[:3, :3].T
+        sv = sv @ matrix[:3, :3].T
+    normals = np.cross(su, sv)
+    length = np.linalg.norm(normals, axis=-1, keepdims=True)
+    normals = np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+
+    # Slivers left along the trim curves may fold over on the surface
+    p = vertices[triangles]
+    facets = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    facing = np.einsum('nc,nc->n', facets, normals[triangles].sum(axis=1)) > 0
+    if not facing.all():
+        triangles, vertices, normals, uv = drop_unused(triangles[facing], vertices, normals, uv)
+
+    return Mesh(vertices, normals, uv, triangles)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+import warnings
+
+import numpy as np
+
+from iges.entity import PointerError
+
+
+def apply_transform(matrix, points):
+    """`points`, an (..., 3) array or (..., 4) of (x, y, z, w) rows, mapped
+    by the 4x4 `matrix`; weights are kept
+    """
+    points = np.asarray(points, dtype=np.float64)
+    result = points.copy()
+    result[..., :3] = points[..., :3] @ matrix[:3, :3].T + matrix[:3, 3]
+    return result
+
+
+def physically_dependent(e):
+    """Whether the subordinate entity switch of `e` says it is physically
+    dependent on its parents (status digits 3-4 of the directory entry)
+    """
+    return (e.d['status_number'] // 10000) % 100 in (1, 3)
+
+
+class TransformResolver():
+    """Composed transformation matrices of a model.
+
+    The directory `transform` field of an entity points to a 124 entity,
+    whose own field may point to another, and so on; the entity's matrix
+    is the product along that chain.  All chains are composed once, in
+    one batched matrix product per chain length, when the resolver is
+    made; after that a transform is a dict lookup however many entities
+    share it.  A matrix whose chain refers to a missing entity is left out,
+    with a warning, so matrix() raises a PointerError for it alone.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+        rows = model.directory.select(entity_type_number=124)
+        n = len(rows)
+        own = np.array([model.entity_list[i].matrix for i in rows.tolist()]).reshape(n, 4, 4)
+        pointers = model.directory['sequence_number'][rows]
+        position = dict(zip(pointers.tolist(), range(n)))
+
+        parents = model.directory['transform'][rows].tolist()
+        parent = np.array([position.get(p, -1) for p in parents], dtype=np.int64)
+
+        # Matrices whose chain refers to a missing entity are left out, as
+        # if they were not there
+        bad = np.array([p != 0 and p not in position for p in parents], dtype=bool)
+        for k in np.flatnonzero(bad).tolist():
+            warnings.warn("transformation matrix DE {} refers to no matrix at DE {}, "
+                          "it is ignored".format(pointers[k], parents[k]))
+        while True:
+            worse = bad | ((parent >= 0) & bad[parent])
+            if (worse == bad).all():
+                break
+            bad = worse
+        parent[bad] = -1
+        depth = self.chain_depths(parent)
+
+        composed = own.copy()
+        for d in range(1, int(depth.max(initial=0)) + 1):
+            k = np.flatnonzero(depth == d)
+            composed[k] = composed[parent[k]] @ own[k]
+
+        keep = np.flatnonzero(~bad)
+        self.matrices = dict(zip(pointers[keep].tolist(), composed[keep]))
+
+    @staticmethod
+    def chain_depths(parent):
+        """Number of matrices above each one in its chain"""
+        n = len(parent)
+        depth = np.zeros(n, dtype=np.int64)
+        top = parent.copy()
+        while (top >= 0).any():
+            if depth.max() >= n:
+                raise ValueError("transformation matrices refer to each other in a cycle")
+            more = top >= 0
+            depth[more] += 1
+            top[more] = parent[top[more]]
+        return depth
+
+    def matrix(self, pointer):
+        """Composed matrix of the 124 entity at DE pointer `pointer`, or
+        None for 0 (no transform)
+        """
+        if pointer == 0:
+            return None
+        if pointer not in self.matrices:
+            raise PointerError(pointer)
+        return self.matrices[pointer]
+
+    def matrix_of(self, e, parent=None):
+        """Matrix from the definition space of `e` to model space, or None
+        if there is none.  If `e` is physically dependent on `parent`, the
+        parent's matrix applies as well.
+        """
+        m = self.matrix(e.d['transform'])
+        if parent is not None and physically_dependent(e):
+            p = self.matrix_of(parent)
+            if p is not None:
+                m = p if m is None else p @ m
+        return m
+
+    def transform_points(self, entities, arrays):
+        """Each of `arrays` (control points of shape (..., 3) or (..., 4))
+        mapped to model space by the matrix of the matching entity.
+        Arrays of entities sharing a transform are mapped with one product.
+        """
+        arrays = [np.asarray(a, dtype=np.float64) for a in arrays]
+        groups = {}
+        for k, (e, a) in enumerate(zip(entities, arrays)):
+            groups.setdefault((e.d['transform'], a.shape[-1]), []).append(k)
+
+        result = list(arrays)
+        for (pointer, width), members in groups.items():
+            matrix = self.matrix(pointer)
+            if matrix is None:
+                continue
+            points = apply_transform(matrix, np.concatenate([arrays[k].reshape(-1, width)
+                                                             for k in members]))
+            sizes = [arrays[k].size // width for k in members]
+            for k, part in zip(members, np.split(points, np.cumsum(sizes)[:-1])):
+                result[k] = part.reshape(arrays[k].shape)
+        return result
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+""" Trim regions of trimmed (144) and bounded (143) surfaces.
+
+The trim curves are flattened to closed polylines in the parameter space
+of the surface, at a tolerance, and the region they bound (by the even-odd
+rule: the outer loop less its holes) is a TrimRegion, which classifies
+large batches of (u, v) points at once.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from iges.arrays import spans
+
+# Bound on the samples per knot span and the size of point x edge temporaries
+max_span_segments = 256
+batch_size = 1 << 22
+
+
+def span_segments(points, degree, chord, angle):
+    """Segments needed per control point window along axis 0 of `points`,
+    an (n, ..., 3) array: window i covers points i to i + degree, the
+    control points of one knot span.
+
+    The chordal bound is the one of a Bezier segment, whose second
+    derivative is at most degree (degree - 1) times its largest second
+    difference of control points; the angular one is the turning of the
+    control polygon.
+    """
+    n = len(points) - degree
+    segments = np.ones(n, dtype=np.int64)
+    if degree < 2:
+        return segments
+    axes = tuple(range(1, points.ndim - 1))
+
+    d2 = np.linalg.norm(points[2:] - 2 * points[1:-1] + points[:-2], axis=-1)
+    d2 = d2.max(axis=axes) if axes else d2
+    bound = degree * (degree - 1) * sliding_window_view(d2, degree - 1).max(axis=-1)
+    segments = np.maximum(segments, np.ceil(np.sqrt(bound / (8 * chord))))
+
+    d1 = points[1:] - points[:-1]
+    d1 /= np.maximum(np.linalg.norm(d1, axis=-1, keepdims=True), 1e-300)
+    turn = np.arccos(np.clip((d1[1:] * d1[:-1]).sum(axis=-1), -1.0, 1.0))
+    turn = turn.max(axis=axes) if axes else turn
+    total = sliding_window_view(turn, degree - 1).sum(axis=-1)
+    segments = np.maximum(segments, np.ceil(total / angle))
+
+    return np.minimum(segments, max_span_segments).astype(np.int64)
+
+
+def parameter_samples(degree, knots, segments, t0, t1):
+    """Parameters sampling [t0, t1], `segments[i]` intervals in knot span
+    degree + i
+    """
+    samples = [np.array([t0, t1])]
+    for i, n in enumerate(segments.tolist()):
+        a, b = knots[degree + i], knots[degree + i + 1]
+        if b > a:
+            samples.append(np.linspace(a, b, n + 1))
+    samples = np.unique(np.concatenate(samples))
+    return samples[(samples >= t0) & (samples <= t1)]
+
+
+def curve_polyline(model, e, chord, angle):
+    """Points along the parameter space curve `e` as an (n, 2) array"""
+    kind = e.d['entity_type_number']
+    if kind == 102:
+        parts = [curve_polyline(model, model.get(de), chord, angle) for de in e.DE]
+        return np.concatenate(parts) if parts else np.empty((0, 2))
+    if kind == 110:
+        return np.array([[e.x1, e.y1], [e.x2, e.y2]])
+    if kind == 126:
+        points = e.control_points[:, :3]
+        t = parameter_samples(e.M, e.T, span_segments(points, e.M, chord, angle), e.V0, e.V1)
+        return e.evaluate(t)[:, 0, :2]
+    if kind == 142:
+        if e.BPTR == 0:
+            raise ValueError("curve on surface {} has no parameter space curve".format(e.sequence_number))
+        return curve_polyline(model, model.get(e.BPTR), chord, angle)
+    raise ValueError("entity type {} is not supported as a trim curve".format(kind))
+
+
+def trim_loops(model, entity, chord, angle):
+    """Trim loops, as (n, 2) arrays in the parameter space of the surface,
+    of a trimmed (144) or bounded (143) surface; none for a bare surface
+    """
+    kind = entity.d['entity_type_number']
+
+    if kind == 144:
+        pointers = ([entity.PTO] if entity.N1 != 0 else []) + list(entity.PTI)
+        loops = [curve_polyline(model, model.get(p), chord, angle) for p in pointers]
+        if entity.N1 == 0:
+            # Outer boundary is the boundary of the surface
+            surface = model.get(entity.PTS)
+            u0, u1, v0, v1 = surface.U0, surface.U1, surface.V0, surface.V1
+            loops.insert(0, np.array([[u0, v0], [u1, v0], [u1, v1], [u0, v1]]))
+        return loops
+
+    if kind == 143:
+        loops = []
+        for pointer in entity.BDPT:
+            boundary = model.get(pointer)
+            loop = []
+            for crvpt, sense, pscpts in boundary.PSCPT:
+                if not pscpts:
+                    raise ValueError("boundary {} has no parameter space curves".format(
+                        boundary.sequence_number))
+                points = np.concatenate([curve_polyline(model, model.get(p), chord, angle)
+                                         for p in pscpts])
+                loop.append(points[::-1] if sense == 2 else points)
+            loops.append(np.concatenate(loop))
+        return loops
+
+    return []
+
+
+def loop_edges(loops):
+    """Start and end points of the edges of the closed `loops`"""
+    if not loops:
+        return np.empty((0, 2)), np.empty((0, 2))
+    a = np.concatenate(loops)
+    b = np.concatenate([np.roll(loop, -1, axis=0) for loop in loops])
+    return a, b
+
+
+class TrimRegion():
+    """Region of the parameter plane bounded by closed polylines `loops`,
+    (n, 2) arrays of (u, v) points, by the even-odd rule.
+
+    The edges are indexed by v: the range of v they cover is cut into
+    bins, and bin k lists the edges crossing it, edge_index[bin_start[k]:
+    bin_start[k + 1]].  A point is then tested only against the edges of
+    its bin, all points of a batch in one array operation, so a query
+    costs about the number of edges per bin rather than all of them.
+    """
+
+    max_bins = 1 << 16
+
+    def __init__(self, loops):
+        self.loops = [np.asarray(loop, dtype=np.float64).reshape(-1, 2) for loop in loops]
+        self.a, self.b = loop_edges(self.loops)
+
+        # Edges along u never cross a line of constant v
+        crossing = np.flatnonzero(self.a[:, 1] != self.b[:, 1])
+        lo = np.minimum(self.a[crossing, 1], self.b[crossing, 1])
+        hi = np.maximum(self.a[crossing, 1], self.b[crossing, 1])
+        self.v0 = lo.min(initial=0.0)
+        self.v1 = hi.max(initial=0.0)
+        self.bins = max(1, min(len(crossing), self.max_bins))
+        self.scale = self.bins / max(self.v1 - self.v0, 1e-300)
+
+        first = self.bin_of(lo)
+        counts = self.bin_of(hi) - first + 1
+        bin_ids = spans(first, counts)
+        order = np.argsort(bin_ids, kind='stable')
+        self.edge_index = np.repeat(crossing, counts)[order]
+        self.bin_start = np.concatenate([[0], np.cumsum(np.bincount(bin_ids, minlength=self.bins))])
+
+    @classmethod
+    def from_entity(cls, model, entity, tolerance, angle=np.radians(20)):
+        """Trim region of the trimmed (144) or bounded (143) surface
+        `entity`, its curves flattened to within `tolerance` and `angle`
+        (radians) in parameter space; None for other entities
+        """
+        loops = trim_loops(model, entity, tolerance, angle)
+        return cls(loops) if loops else None
+
+    def bin_of(self, v):
+        """Bin of the parameters `v`, clipped to the index"""
+        k = np.floor((v - self.v0) * self.scale).astype(np.int64)
+        return np.clip(k, 0, self.bins - 1)
+
+    def contains(self, points):
+        """Whether each of `points`, an (n, 2) array of (u, v), is inside
+        the region
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = np.zeros(len(points), dtype=bool)
+
+        # Only points within the v range of the edges may cross any
+        candidates = np.flatnonzero((points[:, 1] >= self.v0) & (points[:, 1] < self.v1))
+        k = self.bin_of(points[candidates, 1])
+        counts = self.bin_start[k + 1] - self.bin_start[k]
+        total = np.cumsum(counts)
+
+        start = 0
+        while start < len(candidates):
+            done = total[start - 1] if start else 0
+            stop = max(start + 1, int(np.searchsorted(total, done + batch_size, side='right')))
+            c = counts[start:stop]
+            point = np.repeat(np.arange(stop - start), c)
+            edge = self.edge_index[spans(self.bin_start[k[start:stop]], c)]
+            p = points[candidates[start:stop]][point]
+            a, b = self.a[edge], self.b[edge]
+
+            # Crossings of the ray from p towards +u
+            straddle = (a[:, 1] > p[:, 1]) != (b[:, 1] > p[:, 1])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x = a[:, 0] + (p[:, 1] - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+            crossings = np.bincount(point[straddle & (p[:, 0] < x)], minlength=stop - start)
+            result[candidates[start:stop]] = crossings % 2 == 1
+            start = stop
+        return result
+
+    def nearest(self, points):
+        """Nearest point on the boundary to each of `points`"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        result = np.empty_like(points)
+        a = self.a
+        ab = self.b - a
+        length2 = np.maximum((ab * ab).sum(axis=-1), 1e-300)
+        step = max(1, batch_size // max(len(a), 1))
+        for start in range(0, len(points), step):
+            p = points[start:start + step, None, :]
+            s = np.clip(((p - a) * ab).sum(axis=-1) / length2, 0.0, 1.0)
+            q = a + s[..., None] * ab
+            k = ((q - p) ** 2).sum(axis=-1).argmin(axis=1)
+            result[start:start + step] = q[np.arange(len(k)), k]
+        return result
+
+    def area(self):
+        """Area of the region, taking the first loop as the outer one and
+        the others as holes in it
+        """
+        areas = []
+        for loop in self.loops:
+            u, v = loop.T
+            areas.append(abs((u * np.roll(v, -1) - np.roll(u, -1) * v).sum()) / 2)
+        return areas[0] - sum(areas[1:]) if areas else 0.0
+
+    def bounds(self):
+        """Corners (lower, upper) of the box around the region"""
+        points = np.concatenate(self.loops) if self.loops else np.zeros((1, 2))
+        return points.min(axis=0), points.max(axis=0)
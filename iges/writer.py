@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+import re
+
+import numpy as np
+
+from iges.arrays import spans
+from iges.directory import DirectoryTable, directory_pointer_fields, encode_int_fields
+from iges.entity import Entity, PointerError
+
+
+class IGESWriter():
+    """Writer of IGES files from a model, or from some of its entities.
+
+    The entities are written in the given order and renumbered: the k-th
+    gets DE pointer 2 k + 1, and the pointers in their parameter data
+    (Entity.to_parameters()) and directory entries are mapped to the new
+    numbers.  A pointer to an entity that is not written raises a
+    PointerError.  Entities whose parameter data may hold pointers that
+    are not known (see Entity.pointers_known()) can only be written where
+    they keep their DE pointers: renumbering them raises a ValueError.
+
+    Output is formatted in bulk, `chunk_size` entities at a time: the
+    tokens of all their parameter records are formatted by one string
+    operation, the records are cut into 64 column lines at separators one
+    line of every record at a time, and the fixed width records are
+    assembled as a byte array, as is the D section (see
+    DirectoryTable.to_records()).  The D section, whose size is known in
+    advance, is written last, so the file is written in one pass.
+
+    Entities of a lazily read model that are not decoded and whose records
+    hold no DE pointers (their class has no references(), or they have no
+    class) are copied from the source file line by line, without decoding
+    them.  Other entities of such a model are unloaded again after they
+    are written.
+    """
+
+    chunk_size = 10000
+    width = 64    # columns of parameter data in a P line
+
+    def __init__(self, model, entities=None):
+        self.model = model
+        self.entities = model.entity_list if entities is None else list(entities)
+        self.formats = {}
+        self.old, self.new = self.renumbering()
+        self.pointer_dict = dict(zip(self.old.tolist(), self.new.tolist()))
+
+        if not np.array_equal(self.old, self.new):
+            for e in self.entities:
+                if not e.pointers_known():
+                    raise ValueError("DE {} (type {}, form {}) may hold DE pointers that are "
+                                     "not known, it can not be renumbered".format(
+                                         e.sequence_number, e.entity_type_number,
+                                         e.d['form_number']))
+
+        seps = re.escape(model.param_sep + model.record_sep)
+        # Reals with an exponent but without a decimal point, e.g. 1e-06
+        self.exponent = re.compile(r'(?<![^\n{0}])(-?\d+(?:\.\d*)?)e(?=[-+]?\d+[{0}])'.format(seps))
+
+    def renumbering(self):
+        """(old DE pointers, new DE pointers), sorted by the old ones"""
+        old = np.array([e.sequence_number for e in self.entities], dtype=np.int64)
+        order = np.argsort(old, kind='stable')
+        if (old[order][1:] == old[order][:-1]).any():
+            raise ValueError("an entity is written more than once")
+        return old[order], 2 * order + 1
+
+    def map_pointers(self, pointers):
+        """New DE pointers of the array `pointers`, 0 staying 0"""
+        pointers = np.asarray(pointers, dtype=np.int64)
+        k = np.clip(np.searchsorted(self.old, pointers), 0, max(len(self.old) - 1, 0))
+        found = self.old[k] == pointers if len(self.old) else np.zeros(pointers.shape, bool)
+        missing = (pointers != 0) & ~found
+        if missing.any():
+            raise PointerError(int(pointers[missing][0]))
+        return np.where(found, self.new[k] if len(self.new) else 0, 0)
+
+    def pointer(self, pointer):
+        """New DE pointer of `pointer`, for Entity.to_parameters()"""
+        if pointer == 0:
+            return 0
+        if pointer not in self.pointer_dict:
+            raise PointerError(pointer)
+        return self.pointer_dict[pointer]
+
+    def record_format(self, n):
+        """Format of a parameter record of `n` tokens"""
+        if n not in self.formats:
+            self.formats[n] = self.model.param_sep.join(['%s'] * n) + self.model.record_sep
+        return self.formats[n]
+
+    def copied(self, e):
+        """Whether the record of `e` is copied from the source file"""
+        return (not e.decoded and type(e).references is Entity.references and
+                hasattr(self.model.parameter_section, 'record_lines'))
+
+    def parameter_text(self, entities):
+        """Parameter records of `entities`, one per line"""
+        formats = []
+        tokens = []
+        for e in entities:
+            decoded = e.decoded
+            t = e.to_parameters(self.pointer)
+            if not decoded:
+                self.model.unload(e)
+            formats.append(self.record_format(len(t)))
+            tokens += t
+        formats.append('')
+        text = '\n'.join(formats) % tuple(tokens)
+        if 'e' in text:
+            text = self.exponent.sub(lambda m: m.group(1) + ('E' if '.' in m.group(1) else '.E'),
+                                     text)
+        return text
+
+    def parameter_lines(self, text):
+        """P lines, columns 1-64, of the parameter records `text` (as made
+        by parameter_text()), and the record of each line
+        """
+        buf = np.frombuffer(text.encode('latin-1'), np.uint8)
+        ends = np.flatnonzero(buf == ord('\n'))
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        seps = np.flatnonzero(buf == ord(self.model.param_sep))
+
+        # Cut every record that is still too long after its last separator
+        # within the width, or at the width if it has none there
+        line_starts, line_ends, line_records = [], [], []
+        records = np.arange(len(ends))
+        start = starts
+        while len(records):
+            last = ends[records] - start <= self.width
+            line_starts.append(start[last])
+            line_ends.append(ends[records[last]])
+            line_records.append(records[last])
+            records, start = records[~last], start[~last]
+
+            k = np.searchsorted(seps, start + self.width) - 1
+            sep = seps[np.maximum(k, 0)] if len(seps) else start
+            cut = np.where((k >= 0) & (sep >= start), sep + 1, start + self.width)
+            line_starts.append(start)
+            line_ends.append(cut)
+            line_records.append(records)
+            start = cut
+
+        line_starts = np.concatenate(line_starts)
+        order = np.argsort(line_starts, kind='stable')
+        line_starts = line_starts[order]
+        lengths = np.concatenate(line_ends)[order] - line_starts
+        line_records = np.concatenate(line_records)[order]
+        n_lines = len(line_starts)
+
+        lines = np.full((n_lines, 64), ord(' '), dtype=np.uint8)
+        rows = np.repeat(np.arange(n_lines), lengths)
+        positions = spans(line_starts, lengths)
+        lines[rows, positions - line_starts[rows]] = buf[positions]
+        return lines, line_records
+
+    def copied_lines(self, entities):
+        """P lines, columns 1-64, of `entities` as they are in the source
+        file, and the entity of each line
+        """
+        section = self.model.parameter_section
+        text = []
+        counts = []
+        for e in entities:
+            d = e.d
+            text += section.record_lines(d['parameter_pointer'], d['param_line_count'])
+            counts.append(d['param_line_count'])
+        data = ''.join(line.ljust(64) for line in text).encode('latin-1')
+        return (np.frombuffer(data, np.uint8).reshape(-1, 64),
+                np.repeat(np.arange(len(counts)), counts))
+
+    def chunk_lines(self, entities, first_de, first_line):
+        """P section records of `entities`, the first at DE pointer
+        `first_de` and P line `first_line`, and the number of lines of each
+        """
+        copied = np.array([self.copied(e) for e in entities], dtype=bool)
+        parts = []
+        records = []
+        for mask, make_lines in ((~copied, lambda es: self.parameter_lines(self.parameter_text(es))),
+                                 (copied, self.copied_lines)):
+            k = np.flatnonzero(mask)
+            if len(k):
+                lines, line_records = make_lines([entities[i] for i in k.tolist()])
+                parts.append(lines)
+                records.append(k[line_records])
+        records = np.concatenate(records) if records else np.zeros(0, dtype=np.int64)
+        order = np.argsort(records, kind='stable')
+        records = records[order]
+        n_lines = len(records)
+
+        lines = np.empty((n_lines, 81), dtype=np.uint8)
+        if parts:
+            lines[:, :64] = np.concatenate(parts)[order]
+        lines[:, 64:72] = encode_int_fields(first_de + 2 * records, 8)
+        lines[:, 72] = ord('P')
+        lines[:, 73:80] = encode_int_fields(first_line + np.arange(n_lines), 7, zeros=True)
+        lines[:, 80] = ord('\n')
+        return lines, np.bincount(records, minlength=len(entities))
+
+    def directory_records(self, parameter_pointers, line_counts):
+        """D section records of the entities"""
+        directory = self.model.directory.take([e.index for e in self.entities])
+        columns = dict(directory.columns)
+        for key, sign in directory_pointer_fields:
+            values = columns[key] * sign
+            points = values > 0
+            values[points] = self.map_pointers(values[points])
+            columns[key] = values * sign
+        columns['parameter_pointer'] = parameter_pointers
+        columns['param_line_count'] = line_counts
+        columns['sequence_number'] = 2 * np.arange(len(self.entities)) + 1
+
+        records = np.empty((len(self.entities), 2, 81), dtype=np.uint8)
+        records[..., :80] = DirectoryTable(columns).to_records()
+        records[..., 80] = ord('\n')
+        return records
+
+    def section_lines(self, text, letter):
+        """Records of `text` wrapped at 72 columns, as section `letter`"""
+        chunks = [text[i:i + 72] for i in range(0, len(text), 72)] or ['']
+        return ''.join('%-72s%s%07d\n' % (chunk, letter, i + 1) for i, chunk in enumerate(chunks))
+
+    def write(self, f):
+        """Write the file to `f`, a seekable binary file"""
+        n = len(self.entities)
+
+        start = self.section_lines(self.model.start_string.rstrip(), 'S')
+        global_ = self.section_lines(self.model.global_string.rstrip(), 'G')
+        f.write((start + global_).encode('latin-1'))
+        directory_offset = f.tell()
+        f.write(b' ' * (2 * 81 * n))    # filled in below
+
+        line_counts = [np.zeros(0, dtype=np.int64)]
+        p_line = 1
+        for chunk in range(0, n, self.chunk_size):
+            lines, counts = self.chunk_lines(self.entities[chunk:chunk + self.chunk_size],
+                                             2 * chunk + 1, p_line)
+            f.write(lines.tobytes())
+            line_counts.append(counts)
+            p_line += len(lines)
+
+        f.write(('S%07dG%07dD%07dP%07d%40sT0000001\n' % (
+            start.count('\n'), global_.count('\n'), 2 * n, p_line - 1, '')).encode('latin-1'))
+
+        line_counts = np.concatenate(line_counts)
+        parameter_pointers = np.cumsum(line_counts) - line_counts + 1
+        f.seek(directory_offset)
+        f.write(self.directory_records(parameter_pointers, line_counts).tobytes())
+        f.seek(0, 2)
+
+
+def write(model, path, entities=None):
+    """Write `model`, or only `entities` of it, to the IGES file `path`.
+    See IGESWriter.
+    """
+    writer = IGESWriter(model, entities)
+    with open(path, 'wb') as f:
+        writer.write(f)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+""" Binary file of bicubic patches and trim curves, the binary form of the
+trim_surface_N.txt / trim_curve_N.txt files of convert_IGES_NURBS.py.
+
+Layout, little endian: a 40 byte header (header_dtype), then contiguous
+blocks of
+
+    points        (patches, 4, 4, 4)  float   x, y, z, w of [patch][v][u]
+    uv            (patches, 4, 4, 2)  float   u, v scaled to [0, 1]
+    segments      (segments, 4, 2)    float   cubic bezier trim segments, uv
+    curve_starts  (curves + 1,)       int64   first segment of each curve
+    closed        (curves,)           uint8   1 if the curve is closed
+
+with float the float32 or float64 given by the header's itemsize.
+"""
+import numpy as np
+
+magic = b'IGESPTCH'
+version = 1
+
+header_dtype = np.dtype([('magic', 'S8'),
+                         ('version', '<u4'),
+                         ('itemsize', '<u4'),
+                         ('patches', '<u8'),
+                         ('segments', '<u8'),
+                         ('curves', '<u8')])
+
+
+def block_layout(header):
+    """(name, dtype, shape) of the blocks following `header`"""
+    float_type = np.dtype('<f{}'.format(header['itemsize']))
+    n, s, c = int(header['patches']), int(header['segments']), int(header['curves'])
+    return [('points', float_type, (n, 4, 4, 4)),
+            ('uv', float_type, (n, 4, 4, 2)),
+            ('segments', float_type, (s, 4, 2)),
+            ('curve_starts', np.dtype('<i8'), (c + 1,)),
+            ('closed', np.dtype('u1'), (c,))]
+
+
+def encode_patch_file(patches, curves=(), dtype=np.float64):
+    """Contents of the patch file of `patches`, an array of shape
+    (n, 4, 4, 6) as returned by convert_IGES_NURBS.surfacePatches, and the
+    trim `curves`, a list of (segments, closed) with segments of shape
+    (m, 4, 2), with floats of `dtype` (float32 or float64)
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError("patch files hold float32 or float64, not {}".format(dtype))
+    patches = np.asarray(patches).reshape(-1, 4, 4, 6)
+
+    segments = [np.asarray(s).reshape(-1, 4, 2) for s, closed in curves]
+    curve_starts = np.cumsum([0] + [len(s) for s in segments])
+
+    header = np.zeros((), header_dtype)
+    header['magic'] = magic
+    header['version'] = version
+    header['itemsize'] = dtype.itemsize
+    header['patches'] = len(patches)
+    header['segments'] = curve_starts[-1]
+    header['curves'] = len(segments)
+
+    blocks = {'points': patches[..., :4],
+              'uv': patches[..., 4:],
+              'segments': np.concatenate(segments) if segments else np.empty((0, 4, 2)),
+              'curve_starts': curve_starts,
+              'closed': [closed for s, closed in curves]}
+
+    return header.tobytes() + b''.join(
+        np.ascontiguousarray(blocks[name], dtype=block_dtype).tobytes()
+        for name, block_dtype, shape in block_layout(header))
+
+
+def write_patch_file(path, patches, curves=(), dtype=np.float64):
+    """Write the patch file of `patches` and `curves` (see
+    encode_patch_file) to `path`
+    """
+    with open(path, 'wb') as f:
+        f.write(encode_patch_file(patches, curves, dtype))
+
+
+class PatchFile():
+    """Patch file memory mapped for reading.  The blocks are read-only array
+    views on the file, e.g. `points` and `uv`; the file stays mapped while
+    any of them is referenced.
+
+        patches = PatchFile('trim_1.pat')
+        draw(patches.points, patches.uv)
+    """
+
+    def __init__(self, path):
+        buf = np.memmap(path, dtype=np.uint8, mode='r')
+        if len(buf) < header_dtype.itemsize:
+            raise ValueError("{} is not a patch file".format(path))
+        self.header = buf[:header_dtype.itemsize].view(header_dtype)[0]
+        if self.header['magic'] != magic or self.header['version'] != version:
+            raise ValueError("{} is not a version {} patch file".format(path, version))
+
+        offset = header_dtype.itemsize
+        for name, dtype, shape in block_layout(self.header):
+            size = int(np.prod(shape)) * dtype.itemsize
+            if offset + size > len(buf):
+                raise ValueError("{} is truncated".format(path))
+            setattr(self, name, buf[offset:offset + size].view(dtype).reshape(shape))
+            offset += size
+
+    def __len__(self):
+        return len(self.points)
+
+    def curve(self, i):
+        """(segments, closed) of trim curve i"""
+        segments = self.segments[self.curve_starts[i]:self.curve_starts[i + 1]]
+        return segments, bool(self.closed[i])
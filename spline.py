@@ -1,12 +1,12 @@
 import numpy as np
-from collections import Counter
+from bisect import bisect_right
 
 def knot_insert(knots, coeffs, d, new_knot):
     """
     Return: new_knots, new_coeff
     """
 
-    j = next( (idx for idx,knot in enumerate(knots) if knot > new_knot), len(knots))
+    j = bisect_right(knots, new_knot)
     #print(j)
 
     new_coeff = []
@@ -28,27 +28,87 @@ def knot_insert(knots, coeffs, d, new_knot):
     new_knots.insert(j, new_knot)
     return new_knots, new_coeff
 
-def nurbs2bezier(knots, coeffs, d):
+def extraction_operators(knots, d):
     """
-    Return: bezier coeffs, no duplicated coeffs
+    Bezier extraction of a clamped B-spline of degree d, knots given
+    without the outermost two as in nurbs2bezier (The NURBS Book A5.6, run
+    on coefficient vectors).
+
+    Return: starts, ops -- the Bezier coeffs of segment e are
+    ops[e] @ coeffs[starts[e]:starts[e] + d + 1]
+    """
+    U = np.concatenate(([knots[0]], knots, [knots[-1]]))
+    m = len(U) - 1
+    a = d
+    b = d + 1
+
+    starts = []
+    ops = []
+    op = np.eye(d + 1)   # coeffs of this segment over coeffs[a-d:a+1]
+
+    while b < m:
+        i = b
+        while b < m and U[b+1] == U[b]:
+            b += 1
+        mult = b - i + 1
+
+        next_op = np.zeros((d + 1, d + 1))
+        if mult < d:
+            numer = U[b] - U[a]
+            alphas = numer / (U[a + mult + 1:a + d + 1] - U[a])
+            r = d - mult
+            for j in range(1, r + 1):
+                save = r - j
+                s = mult + j
+                for k in range(d, s - 1, -1):
+                    alpha = alphas[k-s]
+                    op[k] = alpha * op[k] + (1 - alpha) * op[k-1]
+                if b < m:
+                    # over the next segment's coeffs, b - a further on
+                    next_op[save, :d + 1 - (b - a)] = op[d, b - a:]
+
+        starts.append(a - d)
+        ops.append(op)
+
+        if b < m:
+            next_op[d - mult:, d - mult:] = np.eye(mult + 1)
+            op = next_op
+            a = b
+            b += 1
+
+    return np.array(starts), np.array(ops)
+
+def bezier_decompose(knots, coeffs, d, axis=0):
+    """
+    Bezier decomposition of a clamped B-spline along `axis` of the array
+    coeffs, all knots inserted at once.
+
+    Return: new knots (each distinct knot d times), bezier coeffs with
+    segments sharing their end coeffs (n_segments * d + 1 along `axis`)
     """
+    knots = np.asarray(knots, dtype=np.float64)
+    coeffs = np.moveaxis(np.asarray(coeffs, dtype=np.float64), axis, 0)
 
     # check knots multiplicity
-    multi = Counter()
-    for i in knots:
-        multi[i] += 1
-    # print(multi)
+    distinct, multi = np.unique(knots, return_counts=True)
+    if multi.max(initial=0) > d:
+        raise ValueError("knot {} has multiplicity {}, above the degree {}".format(
+            distinct[multi.argmax()], multi.max(), d))
 
-    assert(multi.most_common(1)[0][1] <= d)
+    starts, ops = extraction_operators(knots, d)
+    local = coeffs[starts[:, None] + np.arange(d + 1)]
+    segments = np.einsum('eik,ek...->ei...', ops, local)
 
-    new_knots = list(knots)
-    new_coeff = list(coeffs)
-    
-    for knot, m in multi.items():
-        for i in range(d - m):
-            new_knots, new_coeff = knot_insert(new_knots, new_coeff, d , knot)
+    new_coeff = np.concatenate((segments[:, :d].reshape((-1,) + coeffs.shape[1:]),
+                                segments[-1:, d]))
+    new_knots = np.repeat(distinct, d)
+    return new_knots, np.moveaxis(new_coeff, 0, axis)
 
-    return new_knots, new_coeff
+def nurbs2bezier(knots, coeffs, d):
+    """
+    Return: bezier coeffs, no duplicated coeffs
+    """
+    return bezier_decompose(knots, coeffs, d)
     
     
     
@@ -0,0 +1,68 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_IGES import global_string, record, surface_tokens, wrap, write_iges
+
+
+def write_entities(path, entities):
+    """Write an IGES file of `entities`, (type, tokens, directory fields)
+    tuples, the k-th at DE pointer 2 k + 1; tokens are str
+    """
+    directory = []
+    parameters = []
+    for i, (entity_type, tokens, fields) in enumerate(entities):
+        lines = wrap(tokens)
+        f = dict(structure=0, line_font_pattern=0, level=0, view=0, transform=0,
+                 label_assoc=0, status='00000000', color_number=0, form_number=0,
+                 entity_label='E{}'.format(i))
+        f.update(fields)
+        directory.append('{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:>8}'.format(
+            entity_type, len(parameters) + 1, f['structure'], f['line_font_pattern'],
+            f['level'], f['view'], f['transform'], f['label_assoc'], f['status']))
+        directory.append('{:8d}{:8d}{:8d}{:8d}{:8d}{:8}{:8}{:>8}{:8d}'.format(
+            entity_type, 0, f['color_number'], len(lines), f['form_number'], '', '',
+            f['entity_label'], 0))
+        parameters += ['{:<64}{:8d}P{:07d}\n'.format(line, 2 * i + 1, len(parameters) + k + 1)
+                       for k, line in enumerate(lines)]
+
+    global_lines = [global_string[i:i + 72] for i in range(0, len(global_string), 72)]
+    with open(path, 'w', newline='\n') as f:
+        f.write(record('test file', 'S', 1))
+        f.writelines(record(line, 'G', i + 1) for i, line in enumerate(global_lines))
+        f.writelines(record(line, 'D', i + 1) for i, line in enumerate(directory))
+        f.writelines(parameters)
+        f.write(record('S{:07d}G{:07d}D{:07d}P{:07d}'.format(
+            1, len(global_lines), len(directory), len(parameters)), 'T', 1))
+
+
+def translation(x, y, z):
+    return ['124'] + [repr(float(t)) for t in (1, 0, 0, x, 0, 1, 0, y, 0, 0, 1, z)]
+
+
+@pytest.fixture
+def colored_file(tmp_path):
+    """A color definition (314, DE 1), two chained transforms (124, DE 3
+    and 5) and a surface (128, DE 7) using both
+    """
+    path = str(tmp_path / 'colored.igs')
+    surface = [repr(t) for t in surface_tokens(random.Random(0), 3, 2, 0.0)]
+    write_entities(path, [
+        (314, ['314', '100.', '50.', '0.', '5HDodge'], {}),
+        (124, translation(1, 2, 3), {}),
+        (124, translation(10, 0, 0), {'transform': 3}),
+        (128, surface, {'transform': 5, 'color_number': -1}),
+    ])
+    return path
+
+
+@pytest.fixture
+def generated_file(tmp_path):
+    """A synthetic file of 12 trimmed and bounded surfaces"""
+    path = str(tmp_path / 'generated.igs')
+    write_iges(path, 12, bounded=0.5)
+    return path
@@ -0,0 +1,46 @@
+import os
+
+import pytest
+
+from iges.batch import run_batch
+
+
+def job(path, crash):
+    """Size of the file `path`; on the file named `crash` the worker dies,
+    as if killed for lack of memory, and on raise.igs the job raises
+    """
+    name = os.path.basename(path)
+    if name == crash:
+        os._exit(1)
+    if name == 'raise.igs':
+        raise ValueError("bad file")
+    return os.path.getsize(path)
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i, name in enumerate(['f0.igs', 'f1.igs', 'crash.igs', 'f3.igs', 'raise.igs', 'f5.igs']):
+        path = tmp_path / name
+        path.write_bytes(b' ' * (100 * (i + 1)))
+        paths.append(str(path))
+    return paths
+
+
+def failures(results):
+    return sorted(os.path.basename(r.path) for r in results if not r.ok)
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_a_dead_worker_fails_only_its_file(files, workers):
+    results = list(run_batch(files, job, ('crash.igs',), workers))
+    assert sorted(r.path for r in results) == sorted(files)
+    assert failures(results) == ['crash.igs', 'raise.igs']
+    assert all(r.value == r.size for r in results if r.ok)
+
+
+def test_in_process_largest_first(files):
+    results = list(run_batch(files, job, (None,)))
+    assert failures(results) == ['raise.igs']
+    assert [r.size for r in results] == sorted((r.size for r in results), reverse=True)
+    assert 'ValueError: bad file' in str(results[1])
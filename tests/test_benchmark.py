@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import benchmark_IGES
+from benchmark_IGES import engines, run_engine
+from iges.reader import read
+
+
+@pytest.mark.parametrize('engine', sorted(engines))
+def test_run_engine(generated_file, engine):
+    results = run_engine(generated_file, engine, 2)
+    assert results[0]['phase'] == 'parse' and results[0]['count'] == len(read(generated_file))
+    assert results[0]['bytes'] > 0
+    for r in results:
+        assert r['engine'] == engine
+        assert r['seconds'] >= 0
+    if engine == 'default':
+        phases = {r['phase']: r for r in results}
+        assert list(phases) == ['parse', 'pointers', 'nurbs2bezier', 'export_surface', 'export_trim']
+        assert phases['nurbs2bezier']['count'] == 12 * 16
+        assert phases['export_trim']['count'] == 12 * 4
+    else:
+        assert len(results) == 1
+
+
+def test_main(tmp_path, monkeypatch):
+    # The engines run in this process
+    monkeypatch.setattr(benchmark_IGES, 'engines', {'default': {}, 'lazy': {'lazy': True}})
+    ran = []
+
+    def run_scale(path, surfaces, repeat):
+        results = []
+        for engine in benchmark_IGES.engines:
+            ran.append(engine)
+            for r in run_engine(path, engine, repeat):
+                r['scale'] = surfaces
+                results.append(r)
+        return results
+
+    monkeypatch.setattr(benchmark_IGES, 'run_scale', run_scale)
+    out = str(tmp_path / 'bench.txt')
+    benchmark_IGES.main([2, 3], 3, 2, 0.5, 1, out)
+    with open(out) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]['meta']['repeat'] == 1
+    assert ran == ['default', 'lazy'] * 2
+    assert [(r['scale'], r['engine']) for r in lines[1:] if r['phase'] == 'parse'] == \
+        [(2, 'default'), (2, 'lazy'), (3, 'default'), (3, 'lazy')]
+
+
+def test_run_scale(generated_file, monkeypatch):
+    monkeypatch.setattr(benchmark_IGES, 'engines', {'mapped': {'mapped': True}})
+    # benchmark_IGES.py --run FILE mapped, in a process of its own
+    results = benchmark_IGES.run_scale(generated_file, 12, 1)
+    assert [(r['scale'], r['engine'], r['phase']) for r in results] == [(12, 'mapped', 'parse')]
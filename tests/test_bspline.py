@@ -0,0 +1,172 @@
+import random
+
+import numpy as np
+import pytest
+
+from iges.curves_surfaces import RationalBSplineCurve, RationalBSplineSurface, evaluate_curves
+
+
+def basis(i, p, knots, t):
+    """Cox-de Boor recursion, for t < knots[-1]"""
+    if p == 0:
+        return 1.0 if knots[i] <= t < knots[i + 1] else 0.0
+    value = 0.0
+    if knots[i + p] > knots[i]:
+        value += (t - knots[i]) / (knots[i + p] - knots[i]) * basis(i, p - 1, knots, t)
+    if knots[i + p + 1] > knots[i + 1]:
+        value += (knots[i + p + 1] - t) / (knots[i + p + 1] - knots[i + 1]) * \
+            basis(i + 1, p - 1, knots, t)
+    return value
+
+
+def curve_point(c, t):
+    n = np.array([basis(i, c.M, c.T, t) for i in range(c.K + 1)])
+    w = n * c.W
+    return w @ c.control_points[:, :3] / w.sum()
+
+
+def surface_point(s, u, v):
+    nu = np.array([basis(i, s.M1, s.T1, u) for i in range(s.K1 + 1)])
+    nv = np.array([basis(j, s.M2, s.T2, v) for j in range(s.K2 + 1)])
+    w = nv[:, None] * nu[None, :] * s.control_points[..., 3]
+    return np.einsum('ji,jic->c', w, s.control_points[..., :3]) / w.sum()
+
+
+def random_knots(rng, degree, count, lo, hi):
+    """Clamped knots on [lo, hi] for `count` control points, interior ones
+    repeated up to the degree
+    """
+    interior = []
+    while len(interior) < count - degree - 1:
+        knot = rng.uniform(lo, hi)
+        interior += [knot] * min(rng.randint(1, degree), count - degree - 1 - len(interior))
+    return [lo] * (degree + 1) + sorted(interior) + [hi] * (degree + 1)
+
+
+def random_curve(rng, degree, count):
+    lo, hi = rng.uniform(-2, 0), rng.uniform(1, 3)
+    tokens = [126, count - 1, degree, 0, 0, 0, 0] + random_knots(rng, degree, count, lo, hi)
+    tokens += [rng.uniform(0.3, 2.0) for i in range(count)]
+    tokens += [rng.uniform(-1, 1) for i in range(3 * count)]
+    tokens += [lo + 0.1, hi - 0.2]
+    c = RationalBSplineCurve()
+    c.add_parameters(tokens)
+    return c
+
+
+def random_surface(rng, degree_u, degree_v, count_u, count_v):
+    tokens = [128, count_u - 1, count_v - 1, degree_u, degree_v, 0, 0, 0, 0, 0]
+    tokens += random_knots(rng, degree_u, count_u, 0.0, 2.0)
+    tokens += random_knots(rng, degree_v, count_v, -1.0, 1.0)
+    tokens += [rng.uniform(0.3, 2.0) for i in range(count_u * count_v)]
+    tokens += [rng.uniform(-1, 1) for i in range(3 * count_u * count_v)]
+    tokens += [0.0, 2.0, -1.0, 1.0]
+    s = RationalBSplineSurface()
+    s.add_parameters(tokens)
+    return s
+
+
+def away_from_knots(rng, knots, lo, hi, n, margin=1e-2):
+    """`n` random parameters in (lo, hi), not within `margin` of a knot,
+    where derivatives may jump
+    """
+    t = []
+    while len(t) < n:
+        x = rng.uniform(lo, hi)
+        if np.abs(np.asarray(knots) - x).min() > margin:
+            t.append(x)
+    return np.array(t)
+
+
+# Steps of the finite differences of the reference
+h = 1e-4
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_curve(seed):
+    rng = random.Random(seed)
+    c = random_curve(rng, rng.randint(1, 4), rng.randint(5, 9))
+    t = away_from_knots(rng, c.T, c.V0, c.V1, 20)
+    ck = c.evaluate(t, 2)
+    assert ck.shape == (20, 3, 3)
+    for x, d in zip(t, ck):
+        points = [curve_point(c, x + k * h) for k in (-1, 0, 1)]
+        assert np.allclose(d[0], points[1], atol=1e-12)
+        assert np.allclose(d[1], (points[2] - points[0]) / (2 * h), atol=1e-5)
+        if c.M > 1:
+            assert np.allclose(d[2], (points[2] - 2 * points[1] + points[0]) / h ** 2,
+                               atol=1e-3 * max(1, np.abs(d[2]).max()))
+
+    # Parameters are clamped to [V0, V1]
+    assert np.allclose(c.evaluate([c.V0 - 1, c.V1 + 1]),
+                       c.evaluate([c.V0, c.V1]))
+
+
+def test_curve_ends():
+    c = random_curve(random.Random(1), 3, 6)
+    c.V0, c.V1 = c.T[0], c.T[-1]
+    ends = c.evaluate([c.V0, c.V1])[:, 0]
+    assert np.allclose(ends, c.control_points[[0, -1], :3])
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_evaluate_curves(seed):
+    rng = random.Random(seed)
+    degree = rng.randint(1, 3)
+    curves = [random_curve(rng, degree, rng.randint(degree + 1, 9)) for i in range(4)]
+    t = np.linspace(0.01, 0.99, 7)
+    ck = evaluate_curves(curves, t, 1)
+    assert ck.shape == (4, 7, 2, 3)
+    for c, d in zip(curves, ck):
+        own = c.V0 + t * (c.V1 - c.V0)
+        assert np.allclose(d, c.evaluate(own, 1), atol=1e-12)
+        assert np.allclose(d[:, 0], [curve_point(c, x) for x in own], atol=1e-12)
+
+    # One row of parameters per curve
+    rows = np.array([rng.uniform(0, 1) for i in range(4 * 3)]).reshape(4, 3)
+    ck = evaluate_curves(curves, rows)
+    for c, r, d in zip(curves, rows, ck):
+        assert np.allclose(d[:, 0], [curve_point(c, c.V0 + x * (c.V1 - c.V0)) for x in r],
+                           atol=1e-12)
+
+
+def test_evaluate_curves_degrees():
+    rng = random.Random(0)
+    with pytest.raises(ValueError):
+        evaluate_curves([random_curve(rng, 2, 5), random_curve(rng, 3, 5)], [0.5])
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_surface(seed):
+    rng = random.Random(seed)
+    s = random_surface(rng, rng.randint(1, 3), rng.randint(1, 3), rng.randint(4, 7), rng.randint(4, 7))
+    u = away_from_knots(rng, s.T1, s.U0, s.U1, 12)
+    v = away_from_knots(rng, s.T2, s.V0, s.V1, 12)
+    skl = s.evaluate(u, v, 2)
+    assert skl.shape == (12, 3, 3, 3)
+    for x, y, d in zip(u, v, skl):
+        p = {(i, j): surface_point(s, x + i * h, y + j * h)
+             for i in (-1, 0, 1) for j in (-1, 0, 1)}
+        assert np.allclose(d[0, 0], p[0, 0], atol=1e-12)
+        assert np.allclose(d[1, 0], (p[1, 0] - p[-1, 0]) / (2 * h), atol=1e-5)
+        assert np.allclose(d[0, 1], (p[0, 1] - p[0, -1]) / (2 * h), atol=1e-5)
+        scale = 1e-3 * max(1, np.abs(d).max())
+        assert np.allclose(d[1, 1], (p[1, 1] - p[1, -1] - p[-1, 1] + p[-1, -1]) / (4 * h * h),
+                           atol=scale)
+        if s.M1 > 1:
+            assert np.allclose(d[2, 0], (p[1, 0] - 2 * p[0, 0] + p[-1, 0]) / h ** 2, atol=scale)
+        if s.M2 > 1:
+            assert np.allclose(d[0, 2], (p[0, 1] - 2 * p[0, 0] + p[0, -1]) / h ** 2, atol=scale)
+
+    normals = s.normal(u, v)
+    assert np.allclose(np.linalg.norm(normals, axis=-1), 1)
+    assert np.allclose(np.einsum('nc,nc->n', normals, skl[:, 1, 0]), 0, atol=1e-9)
+
+
+def test_surface_grid():
+    s = random_surface(random.Random(3), 3, 2, 6, 5)
+    u, v = np.meshgrid(np.linspace(0.05, 1.95, 4), np.linspace(-0.95, 0.95, 3))
+    points = s.evaluate(u, v)[..., 0, 0, :]
+    assert points.shape == (3, 4, 3)
+    for index in np.ndindex(u.shape):
+        assert np.allclose(points[index], surface_point(s, u[index], v[index]), atol=1e-12)
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from conftest import translation, write_entities
+from generate_IGES import surface_tokens, trim_curve_tokens
+from iges.reader import read
+from iges.tessellate import tessellate
+
+
+def test_boxes_use_the_trimmed_surface_transform(tmp_path):
+    """A surface physically dependent on a 144 is placed by the 144's
+    transform, as tessellate() places it
+    """
+    path = str(tmp_path / 'placed.igs')
+    surface = [repr(t) for t in surface_tokens(random.Random(0), 3, 2, 0.0)]
+    write_entities(path, [
+        (124, translation(10, 0, 0), {}),
+        (128, surface, {'status': '00010000'}),
+        (144, ['144', '3', '0', '0', '0'], {'transform': 1}),
+        (128, surface, {}),
+    ])
+    model = read(path)
+
+    points = tessellate(model, model.entity_list[2]).vertices
+    lo, hi = model.bvh.lo[0], model.bvh.hi[0]
+    assert model.bvh.ids[0] == 1
+    assert (points >= lo - 1e-9).all() and (points <= hi + 1e-9).all()
+    assert lo[0] >= 10 - 1e-9
+
+    # the surface not used by the 144 stays where it is
+    assert model.bvh.hi[1][0] <= 1 + 1e-9
+    assert [e.sequence_number for e in model.in_box([9, -1, -1], [12, 2, 2])] == [3]
+
+
+def curve(a, b):
+    return [repr(t) for t in trim_curve_tokens(random.Random(0), a, b)]
+
+
+def test_parameter_space_curves_left_out(tmp_path):
+    path = str(tmp_path / 'curves.igs')
+    surface = [repr(t) for t in surface_tokens(random.Random(0), 3, 2, 0.0)]
+    write_entities(path, [
+        (128, surface, {}),                                   # DE 1
+        (126, curve((0, 0), (1, 1)), {}),                     # DE 3, in 102 DE 5
+        (102, ['102', '1', '3'], {}),
+        (142, ['142', '1', '1', '5', '0', '1'], {}),          # DE 7
+        (144, ['144', '1', '1', '0', '7'], {}),
+        (126, curve((2, 0), (3, 1)), {}),                     # DE 11, on its own
+        (126, curve((4, 0), (5, 1)), {}),                     # DE 13, also in model space
+        (142, ['142', '1', '1', '13', '13', '1'], {}),
+        (126, curve((6, 0), (7, 1)), {}),                     # DE 17, of a 141
+        (141, ['141', '1', '1', '1', '1', '0', '1', '1', '17'], {}),
+    ])
+    model = read(path)
+    assert sorted(model.entity_list[i].sequence_number for i in model.bvh.ids) == [1, 11, 13]
+    assert [e.sequence_number for e in model.in_box([-1, -1, -1], [9, 2, 1])] == [1, 11, 13]
+
+
+def test_dangling_pointers_skipped(tmp_path):
+    path = str(tmp_path / 'dangling.igs')
+    surface = [repr(t) for t in surface_tokens(random.Random(0), 3, 2, 0.0)]
+    write_entities(path, [
+        (128, surface, {}),                                   # DE 1
+        (144, ['144', '99', '0', '0', '0'], {}),              # no surface at DE 99
+        (128, surface, {'transform': 77}),                    # DE 5, no matrix at DE 77
+        (126, curve((2, 0), (3, 1)), {}),                     # DE 7
+    ])
+    model = read(path)
+    with pytest.warns(UserWarning) as record:
+        ids = model.bvh.ids
+    assert sorted(model.entity_list[i].sequence_number for i in ids) == [1, 7]
+    messages = ' '.join(str(w.message) for w in record)
+    assert 'DE 99' in messages and 'pointer 77' in messages
@@ -0,0 +1,63 @@
+import os
+
+import iges.cache
+from generate_IGES import write_iges
+from iges.cache import ModelCache
+from iges.reader import read
+
+
+def counting(monkeypatch):
+    """List of the paths ModelCache parses from now on"""
+    parsed = []
+    parse = ModelCache.parse
+
+    def spy(self, path, workers=None):
+        parsed.append(path)
+        return parse(self, path, workers)
+
+    monkeypatch.setattr(ModelCache, 'parse', spy)
+    return parsed
+
+
+def same_entities(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a.entity_list, b.entity_list):
+        assert x.to_parameters(int) == y.to_parameters(int), x.sequence_number
+
+
+def test_hit(generated_file, tmp_path, monkeypatch):
+    parsed = counting(monkeypatch)
+    cache = ModelCache(str(tmp_path / 'cache'))
+    same_entities(cache.read(generated_file), read(generated_file))
+    model = cache.read(generated_file)
+    assert parsed == [generated_file]
+    same_entities(model, read(generated_file))
+    assert model.graph.forward[1].tolist() == read(generated_file).graph.forward[1].tolist()
+
+
+def test_miss_after_change(generated_file, tmp_path, monkeypatch):
+    parsed = counting(monkeypatch)
+    cache = ModelCache(str(tmp_path / 'cache'))
+    cache.read(generated_file)
+    write_iges(generated_file, 5)
+    model = cache.read(generated_file)
+    assert parsed == [generated_file] * 2
+    same_entities(model, read(generated_file))
+    assert len(cache.entries()) == 2
+
+
+def test_miss_after_parser_version(generated_file, tmp_path, monkeypatch):
+    parsed = counting(monkeypatch)
+    cache = ModelCache(str(tmp_path / 'cache'))
+    cache.read(generated_file)
+    monkeypatch.setattr(iges.cache, 'parser_version', iges.cache.parser_version + 1)
+    cache.read(generated_file)
+    cache.read(generated_file)
+    assert parsed == [generated_file] * 2
+
+
+def test_evict(generated_file, tmp_path):
+    cache = ModelCache(str(tmp_path / 'cache'), max_bytes=0)
+    cache.read(generated_file)
+    assert cache.entries() == []
+    assert os.listdir(cache.directory) == []
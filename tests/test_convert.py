@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from convert_IGES_NURBS import convert, exportPlan
+from iges.reader import read
+from iges.stats import Stats
+
+
+def outputs(path, out_dir, workers=None, dtype=None, stream=False):
+    """{name: contents} of the files converted from `path`"""
+    with read(path, lazy=stream, mapped=stream) as model:
+        convert(model, out_dir, workers, dtype, stream)
+    files = {}
+    for name in sorted(os.listdir(out_dir)):
+        with open(os.path.join(out_dir, name), 'rb') as f:
+            files[name] = f.read()
+    return files
+
+
+@pytest.mark.parametrize('dtype', [None, 'float32'])
+def test_parallel_and_stream_match_serial(generated_file, tmp_path, capsys, dtype):
+    serial = outputs(generated_file, str(tmp_path / 'serial'), dtype=dtype)
+    assert len(serial) == (24 if dtype is None else 12)
+    for workers, stream in [(2, False), (None, True), (2, True)]:
+        out_dir = str(tmp_path / 'out-{}-{}'.format(workers, stream))
+        assert outputs(generated_file, out_dir, workers, dtype, stream) == serial
+
+
+def test_plan_decodes_once(generated_file, tmp_path, capsys):
+    stats = Stats()
+    with read(generated_file, lazy=True, mapped=True, stats=stats) as model:
+        plan, refcount = exportPlan(model)
+        assert len(plan) == 12
+        assert {model.entity_list[i].entity_type_number for i, deps in plan} == {143, 144}
+        for i, deps in plan:
+            assert i in deps
+        assert refcount.min() == 1
+
+        convert(model, str(tmp_path), stream=True)
+        # every entity decoded once, and unloaded after its last use
+        assert not any(e.decoded for e in model.entity_list)
+    for entity_type, counts in stats.as_dict()['types'].items():
+        assert counts['decoded'] == counts['count'], entity_type
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from conftest import write_entities
+from iges.reader import read, split_parameters
+
+
+def test_split_parameters():
+    assert split_parameters('126,1.0D0,-2.5d-1,3D2,4;', ',', ';') == \
+        ['126', '1.0E0', '-2.5e-1', '3E2', '4']
+    assert split_parameters('  314,1.D0,2.,5H1.0D0,7HDodge D ;  ', ',', ';') == \
+        ['314', '1.E0', '2.', '5H1.0D0', '7HDodge D ']
+    assert split_parameters('110/0.0D0/1/', '/', '/') == ['110', '0.0E0', '1']
+
+
+def curve_tokens(exponent):
+    knots = ['0', '0', '0', '5' + exponent + '-1', '1', '1', '1']
+    weights = ['1', '.5' + exponent + '0', '1.' + exponent + '+0', '1']
+    points = ['0', '0', '0', '1.' + exponent + '0', '2', '0',
+              '2.5' + exponent + '0', '-3.' + exponent + '-2', '1.25' + exponent + '1',
+              '3', '0', '0']
+    return ['126', '3', '2', '0', '0', '0', '0'] + knots + weights + points + ['0', '1']
+
+
+@pytest.mark.parametrize('engine', [{}, {'lazy': True}, {'mapped': True}, {'workers': 2}])
+def test_d_exponents(tmp_path, engine):
+    path = str(tmp_path / 'exponents.igs')
+    write_entities(path, [(126, curve_tokens('D'), {}),
+                          (126, curve_tokens('d'), {}),
+                          (126, curve_tokens('E'), {}),
+                          (314, ['314', '1.D0', '2.D0', '3.D0', '7HDodge D'], {})])
+
+    with read(path, **engine) as model:
+        d, lower, e, color = model.entity_list
+        assert e.T.dtype == np.float64
+        assert e.T.tolist() == [0, 0, 0, 0.5, 1, 1, 1]
+        assert e.W.tolist() == [1, 0.5, 1, 1]
+        assert e.control_points[2, :3].tolist() == [2.5, -0.03, 12.5]
+        for c in (d, lower):
+            assert np.array_equal(c.T, e.T)
+            assert np.array_equal(c.control_points, e.control_points)
+            assert (c.V0, c.V1) == (0, 1)
+        color.load_parameters()
+        assert color.parameters[-1] == '7HDodge D'
+        assert [float(t) for t in color.parameters[1:4]] == [1, 2, 3]
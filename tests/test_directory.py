@@ -0,0 +1,48 @@
+import numpy as np
+
+from iges.directory import DirectoryTable, decode_int_fields, encode_int_fields
+
+
+def d_lines(entity_type, pointer, level, transform, status, color, count, form, label,
+            subscript, sequence):
+    return ['{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:8d}{:>8}D{:07d}'.format(
+                entity_type, pointer, 0, 0, level, 0, transform, 0, status, sequence),
+            '{:8d}{:8d}{:8d}{:8d}{:8d}{:8}{:8}{:>8}{:8d}D{:07d}'.format(
+                entity_type, 0, color, count, form, '', '', label, subscript, sequence + 1)]
+
+
+lines = (d_lines(314, 1, 0, 0, '00000000', 0, 1, 0, 'COLOR', 0, 1) +
+         d_lines(128, 2, -3, 1, '00010000', -1, 12, 0, 'SURF', 7, 3) +
+         d_lines(144, 14, 5, 0, '01010501', 2, 1, 0, 'A' * 8, 12345678, 5))
+
+
+def test_fields():
+    table = DirectoryTable.from_lines(lines)
+    assert table['entity_type_number'].tolist() == [314, 128, 144]
+    assert table['level'].tolist() == [0, -3, 5]
+    assert table['color_number'].tolist() == [0, -1, 2]
+    assert table['status_number'].tolist() == [0, 10000, 1010501]
+    assert table['param_line_count'].tolist() == [1, 12, 1]
+    assert table['sequence_number'].tolist() == [1, 3, 5]
+    # columns 57-64 and 65-72 of the second line
+    assert table['entity_label'].tolist() == [b'COLOR', b'SURF', b'AAAAAAAA']
+    assert table['entity_subs_num'].tolist() == [0, 7, 12345678]
+    assert table.row(1)['entity_label'] == 'SURF'
+
+
+def test_round_trip():
+    table = DirectoryTable.from_lines(lines)
+    records = table.to_records()
+    assert [bytes(r).decode() for r in records.reshape(-1, 80)] == lines
+    again = DirectoryTable.from_records(records)
+    for key in table.columns:
+        assert np.array_equal(table[key], again[key]), key
+
+
+def test_int_fields():
+    values = np.array([0, 7, -12, 1234567])
+    chars = encode_int_fields(values, 8)
+    assert bytes(chars.ravel()).decode() == '       0       7     -12 1234567'
+    assert decode_int_fields(chars).tolist() == values.tolist()
+    blank = np.full((1, 8), ord(' '), dtype=np.uint8)
+    assert decode_int_fields(blank).tolist() == [0]
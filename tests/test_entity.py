@@ -0,0 +1,22 @@
+import random
+
+import pytest
+
+from conftest import write_entities
+from generate_IGES import surface_tokens
+from iges.reader import read
+
+
+def test_failed_decode_is_raised_again(tmp_path):
+    path = str(tmp_path / 'bad.igs')
+    surface = [repr(t) for t in surface_tokens(random.Random(0), 3, 2, 0.0)]
+    surface[12] = 'x'    # a knot
+    write_entities(path, [(128, surface, {}), (128, surface[:12] + ['0.'] + surface[13:], {})])
+
+    with read(path, lazy=True) as model:
+        bad, good = model.entity_list
+        for i in range(2):
+            with pytest.raises(ValueError):
+                bad.control_points
+            assert not bad.decoded
+        assert good.M1 == 3 and good.decoded
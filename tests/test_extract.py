@@ -0,0 +1,120 @@
+import random
+
+import numpy as np
+import pytest
+
+from conftest import write_entities
+from generate_IGES import surface_tokens, trim_curve_tokens
+from iges.extract import closure, extract, select
+from iges.model import PointerError
+from iges.reader import read
+from iges.writer import write
+
+
+def test_closure_follows_color_and_transforms(colored_file, tmp_path):
+    out = str(tmp_path / 'out.igs')
+    assert extract(colored_file, {'entity_type_number': 128}, out) == 4
+    model = read(out)
+    surface = model.entity_list[3]
+    assert model.get(-surface.d['color_number']).parameters[-1] == '5HDodge'
+    assert np.allclose(model.transforms.matrix_of(surface)[:3, 3], [11, 2, 3])
+
+
+def test_extract_matches_writing_the_closure(generated_file, tmp_path):
+    model = read(generated_file)
+    trimmed = model.select(entity_type_number=144)[:2]
+    des = [e.sequence_number for e in trimmed]
+
+    out = str(tmp_path / 'out.igs')
+    n = extract(generated_file, des, out)
+    rows = closure(model, select(model, des))
+    assert n == len(rows)
+
+    expected = str(tmp_path / 'expected.igs')
+    write(model, expected, [model.entity_list[i] for i in rows])
+    assert open(out, 'rb').read() == open(expected, 'rb').read()
+
+    types = read(out).directory['entity_type_number'].tolist()
+    assert sorted(types) == sorted([128, 126, 126, 126, 126, 102, 142, 144] * 2)
+
+
+def test_select(generated_file, tmp_path):
+    model = read(generated_file)
+    assert select(model, {'entity_label': ['E0', b'E1'], 'entity_type_number': 128}).tolist() == [0]
+    types = model.directory['entity_type_number']
+    assert select(model, {'entity_type_number': [143, 144]}).tolist() == \
+        np.flatnonzero((types == 143) | (types == 144)).tolist()
+    with pytest.raises(PointerError):
+        select(model, [2])
+
+    out = str(tmp_path / 'empty.igs')
+    assert extract(generated_file, {'entity_label': 'none'}, out) == 0
+    assert len(read(out)) == 0
+
+
+def structure_file(path):
+    """A subfigure (308, DE 5) of a curve and a line, placed by a 408
+    (DE 7); a group (402, DE 11) of the curve and a surface; a point (116,
+    DE 13) without a class and a name property (406, DE 15)
+    """
+    rng = random.Random(0)
+    curve = [repr(t) for t in trim_curve_tokens(rng, (0, 0), (1, 1))]
+    surface = [repr(t) for t in surface_tokens(rng, 3, 2, 0.0)]
+    write_entities(path, [
+        (126, curve, {}),
+        (110, ['110', '0.', '0.', '0.', '1.', '1.', '0.'], {}),
+        (308, ['308', '0', '5HPART1', '2', '1', '3'], {}),
+        (408, ['408', '5', '1.', '2.', '3.', '2.'], {}),
+        (128, surface, {}),
+        (402, ['402', '2', '1', '9'], {'form_number': 7}),
+        (116, ['116', '1.', '2.', '3.', '0'], {}),
+        (406, ['406', '1', '4HNAME'], {'form_number': 15}),
+    ])
+
+
+def test_extract_subfigure_instance(tmp_path):
+    path = str(tmp_path / 'structure.igs')
+    structure_file(path)
+    out = str(tmp_path / 'out.igs')
+    assert extract(path, {'entity_type_number': 408}, out) == 4
+
+    model = read(out)
+    assert model.directory['entity_type_number'].tolist() == [126, 110, 308, 408]
+    instance = model.entity_list[3]
+    assert (instance.X, instance.Y, instance.Z, instance.S) == (1, 2, 3, 2)
+    subfigure = model.get(instance.DE)
+    assert subfigure.NAME == '5HPART1'
+    assert [model.get(de).entity_type_number for de in subfigure.DE] == [126, 110]
+
+    source = read(path)
+    assert np.array_equal(model.get(subfigure.DE[0]).control_points,
+                          source.entity_list[0].control_points)
+
+
+def test_extract_group(tmp_path):
+    path = str(tmp_path / 'structure.igs')
+    structure_file(path)
+    out = str(tmp_path / 'out.igs')
+    assert extract(path, [11], out) == 3
+    model = read(out)
+    group = model.entity_list[2]
+    assert [model.get(de).entity_type_number for de in group.DE] == [126, 128]
+
+    # properties without pointers are copied as they are
+    assert extract(path, [15], out) == 1
+    assert read(out).entity_list[0].to_parameters(int) == ['406', '1', '4HNAME']
+
+
+def test_unknown_pointers_not_renumbered(tmp_path):
+    path = str(tmp_path / 'structure.igs')
+    structure_file(path)
+    out = str(tmp_path / 'out.igs')
+    with pytest.raises(ValueError, match='DE 13'):
+        extract(path, [13], out)
+
+    # written where it was, it keeps its pointers
+    model = read(path)
+    write(model, out)
+    assert read(out).entity_list[6].to_parameters(int) == ['116', '1.', '2.', '3.', '0']
+    with pytest.raises(ValueError):
+        write(model, out, model.entity_list[::-1])
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from iges.graph import ReferenceGraph
+from iges.model import PointerError
+from iges.reader import read
+
+
+def test_children_include_directory_pointers(colored_file):
+    model = read(colored_file)
+    surface = model.entity_list[3]
+    assert sorted(e.sequence_number for e in model.children(surface)) == [1, 5]
+    assert model.graph.closure([3]).tolist() == [0, 1, 2, 3]
+    assert [e.sequence_number for e in model.parents(model.entity_list[0])] == [7]
+
+
+def test_index_of_matches_resolve(generated_file):
+    model = read(generated_file)
+    des = np.array([1, 2, 3, 0, -5, 2 * len(model) - 1, 2 * len(model) + 1], dtype=np.int64)
+    rows = ReferenceGraph.resolve(model, des)
+    assert rows.tolist() == [0, -1, 1, -1, -1, len(model) - 1, -1]
+    for pointer, row in zip(des.tolist(), rows.tolist()):
+        if row < 0:
+            with pytest.raises(PointerError):
+                model.index_of(pointer)
+        else:
+            assert model.index_of(pointer) == row
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from iges.parallel import ParallelReader
+from iges.reader import read
+
+
+def test_workers_match_serial(generated_file, colored_file):
+    for path in (generated_file, colored_file):
+        serial = read(path)
+        with read(path, workers=2) as model:
+            assert len(model) == len(serial)
+            for key in serial.directory.keys():
+                assert np.array_equal(model.directory[key], serial.directory[key]), key
+            for x, y in zip(model.entity_list, serial.entity_list):
+                assert type(x) is type(y)
+                assert x.to_parameters(int) == y.to_parameters(int), x.sequence_number
+
+
+def test_small_ranges(generated_file, monkeypatch):
+    # More ranges than entities
+    monkeypatch.setattr(ParallelReader, 'chunks_per_worker', 1000)
+    serial = read(generated_file)
+    with read(generated_file, workers=2) as model:
+        for x, y in zip(model.entity_list, serial.entity_list):
+            assert x.to_parameters(int) == y.to_parameters(int), x.sequence_number
+
+
+def test_file_object_rejected(generated_file):
+    with open(generated_file, 'rb') as f:
+        with pytest.raises(ValueError, match='file name'):
+            read(f, workers=2)
+        f.seek(0)
+        assert len(read(f)) == len(read(generated_file))
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from patchfile import PatchFile, encode_patch_file, write_patch_file
+
+
+def random_data(rng, n=5):
+    patches = rng.uniform(-1, 1, (n, 4, 4, 6))
+    curves = [(rng.uniform(0, 1, (3, 4, 2)), True),
+              (rng.uniform(0, 1, (1, 4, 2)), False),
+              (np.empty((0, 4, 2)), False),
+              (rng.uniform(0, 1, (2, 4, 2)), True)]
+    return patches, curves
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_round_trip(tmp_path, dtype):
+    patches, curves = random_data(np.random.default_rng(0))
+    path = str(tmp_path / 'trim_1.pat')
+    write_patch_file(path, patches, curves, dtype)
+
+    f = PatchFile(path)
+    assert len(f) == 5
+    assert f.points.dtype == dtype and f.uv.dtype == dtype
+    assert np.array_equal(f.points, patches[..., :4].astype(dtype))
+    assert np.array_equal(f.uv, patches[..., 4:].astype(dtype))
+    assert f.curve_starts.tolist() == [0, 3, 4, 4, 6]
+    for i, (segments, closed) in enumerate(curves):
+        s, c = f.curve(i)
+        assert np.array_equal(s, segments.astype(dtype))
+        assert c is closed
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / 'empty.pat')
+    write_patch_file(path, np.empty((0, 4, 4, 6)))
+    f = PatchFile(path)
+    assert len(f) == 0
+    assert f.segments.shape == (0, 4, 2)
+    assert f.curve_starts.tolist() == [0]
+
+
+def test_bad_files(tmp_path):
+    patches, curves = random_data(np.random.default_rng(1))
+    data = encode_patch_file(patches, curves)
+    path = str(tmp_path / 'bad.pat')
+    for bad in (data[:20], data[:-1], b'NOTPATCH' + data[8:]):
+        with open(path, 'wb') as f:
+            f.write(bad)
+        with pytest.raises(ValueError):
+            PatchFile(path)
+    with pytest.raises(ValueError):
+        encode_patch_file(patches, curves, np.float16)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from iges.reader import read
+
+engines = [{}, {'lazy': True}, {'mapped': True}, {'lazy': True, 'mapped': True}]
+
+
+def same_models(a, b):
+    assert len(a) == len(b)
+    for key in a.directory.keys():
+        assert np.array_equal(a.directory[key], b.directory[key]), key
+    assert [e.to_parameters(int) for e in a.entity_list] == \
+        [e.to_parameters(int) for e in b.entity_list]
+
+
+@pytest.mark.parametrize('options', engines)
+def test_records_without_line_ends(generated_file, tmp_path, options):
+    path = tmp_path / 'flat.igs'
+    path.write_bytes(open(generated_file, 'rb').read().replace(b'\n', b''))
+    with read(str(path), **options) as model:
+        same_models(read(generated_file), model)
+
+
+@pytest.mark.parametrize('options', engines)
+def test_not_iges(tmp_path, options):
+    path = tmp_path / 'text.igs'
+    path.write_bytes(b'some text\nthat is not IGES\n')
+    with pytest.raises(ValueError):
+        read(str(path), **options)
+
+
+def test_empty_model(tmp_path):
+    path = tmp_path / 'empty.igs'
+    path.write_text('{:<72}S0000001\n{:<72}G0000001\n{:<72}T0000001\n'.format(
+        '', '1H,,1H;;', 'S0000001G0000001D0000000P0000000'))
+    assert len(read(str(path))) == 0
@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+import pytest
+
+from spline import bezier_decompose, knot_insert
+
+
+def insert_knots(knots, coeffs, d):
+    """Bezier decomposition one knot insertion at a time"""
+    new_knots, new_coeffs = list(knots), list(coeffs)
+    for knot in sorted(set(knots)):
+        for i in range(d - list(knots).count(knot)):
+            new_knots, new_coeffs = knot_insert(new_knots, new_coeffs, d, knot)
+    return new_knots, new_coeffs
+
+
+def random_knots(rng, d):
+    """Clamped knots without the outermost two, interior knots repeated
+    up to d times
+    """
+    interior = sorted(rng.uniform(0, 1) for i in range(rng.randint(0, 5)))
+    knots = [0.0] * d
+    for knot in interior:
+        knots += [knot] * rng.randint(1, d)
+    return knots + [1.0] * d
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_bezier_decompose_matches_knot_insertion(seed):
+    rng = random.Random(seed)
+    d = rng.randint(1, 5)
+    knots = random_knots(rng, d)
+    coeffs = np.random.default_rng(seed).normal(size=(len(knots) - d + 1, 3))
+
+    expected_knots, expected = insert_knots(knots, list(coeffs), d)
+    new_knots, new_coeffs = bezier_decompose(knots, coeffs, d)
+    assert np.allclose(new_knots, expected_knots)
+    assert np.allclose(new_coeffs, np.array(expected))
+
+    # along another axis of a net, as for surfaces
+    net = np.stack([coeffs, 2 * coeffs], axis=1)
+    new_knots, new_net = bezier_decompose(knots, net, d, axis=0)
+    assert np.allclose(new_net[:, 1], 2 * np.array(expected))
+
+
+def test_bezier_decompose_rejects_multiplicity_above_degree():
+    knots = [0, 0, 0, 0.5, 0.5, 0.5, 0.5, 1, 1, 1]
+    with pytest.raises(ValueError):
+        bezier_decompose(knots, np.zeros((8, 3)), 3)
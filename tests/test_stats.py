@@ -0,0 +1,61 @@
+import json
+import time
+
+from iges.reader import read
+from iges.stats import Stats, timed, timer
+
+
+def test_timers():
+    stats = Stats()
+    with stats.timer('a'):
+        time.sleep(0.01)
+    with timer(stats, 'a'):
+        pass
+    with timer(None, 'b'):
+        pass
+    stats.add_time('c', 2.5)
+    assert set(stats.sections) == {'a', 'c'}
+    assert stats.sections['a'] >= 0.01 and stats.sections['c'] == 2.5
+
+    value, seconds = timed(sum, [1, 2, 3])
+    assert value == 6 and seconds >= 0
+
+
+def test_counts(generated_file):
+    stats = Stats()
+    with read(generated_file, lazy=True, stats=stats) as model:
+        counts = stats.as_dict()['types']
+        assert sorted(int(t) for t in counts) == \
+            sorted(set(model.directory['entity_type_number'].tolist()))
+        for t, c in counts.items():
+            lines = model.directory['param_line_count'][model.directory['entity_type_number'] == int(t)]
+            assert c['count'] == len(lines)
+            assert c['bytes'] == 80 * lines.sum()
+            assert c['decoded'] == 0
+
+        model.entities_of_type(128)[0].control_points
+        surfaces = stats.types[128]
+        assert surfaces.decoded == 1 and surfaces.decode_seconds > 0
+        assert stats.sections['parameters'] >= surfaces.decode_seconds
+
+
+def test_report(generated_file, tmp_path):
+    stats = Stats()
+    read(generated_file, stats=stats)
+    stats.add_export(7, 0.5)
+    stats.add_export(9, 1.5)
+
+    path = str(tmp_path / 'stats.json')
+    stats.write_json(path)
+    with open(path) as f:
+        report = json.load(f)
+    assert report['types']['128']['decoded'] == 12
+    assert report['exports']['count'] == 2 and report['exports']['seconds'] == 2.0
+    assert report['exports']['slowest'][0] == {'pointer': 9, 'seconds': 1.5}
+    assert [s['pointer'] for s in report['exports']['surfaces']] == [7, 9]
+    assert report['peak_memory']['self'] > 0
+
+    text = str(stats)
+    assert text.startswith('elapsed')
+    assert 'slowest DE 9' in text
+    assert any(line.split()[:2] == ['128', '12'] for line in text.splitlines())
@@ -0,0 +1,121 @@
+import asyncio
+import random
+
+import numpy as np
+import pytest
+
+from iges.reader import read
+from iges.stream import IncrementalParser, parse_stream
+
+
+def same_models(a, b):
+    assert a.start_string == b.start_string
+    assert a.global_string == b.global_string
+    for key in a.directory.keys():
+        assert np.array_equal(a.directory[key], b.directory[key]), key
+    assert [e.parameters for e in a.entity_list] == [e.parameters for e in b.entity_list]
+
+
+def chunks(data, sizes):
+    i = 0
+    for size in sizes:
+        if i >= len(data):
+            return
+        yield data[i:i + size]
+        i += size
+
+
+def feed_all(data, sizes):
+    parser = IncrementalParser()
+    entities = []
+    for chunk in chunks(data, sizes):
+        entities += parser.feed(chunk)
+    entities += parser.close()
+    return parser, entities
+
+
+def random_sizes(seed):
+    rng = random.Random(seed)
+    while True:
+        yield rng.randint(1, 300)
+
+
+@pytest.mark.parametrize('sizes', [random_sizes(0), random_sizes(1), iter(lambda: 4096, None)])
+def test_chunks_give_the_model_read_gives(generated_file, sizes):
+    data = open(generated_file, 'rb').read()
+    parser, entities = feed_all(data, sizes)
+    model = read(generated_file)
+    same_models(model, parser.model)
+    assert [e.index for e in entities] == list(range(len(model)))
+
+
+def test_single_bytes_and_crlf(colored_file):
+    data = open(colored_file, 'rb').read()
+    model = read(colored_file)
+    for text in (data, data.replace(b'\n', b'\r\n')):
+        parser, entities = feed_all(text, iter(lambda: 1, None))
+        same_models(model, parser.model)
+        assert len(entities) == len(model)
+
+
+def test_parse_stream(generated_file):
+    data = open(generated_file, 'rb').read()
+
+    async def parse():
+        reader = asyncio.StreamReader()
+
+        async def download():
+            for chunk in chunks(data, random_sizes(2)):
+                reader.feed_data(chunk)
+                await asyncio.sleep(0)
+            reader.feed_eof()
+
+        task = asyncio.ensure_future(download())
+        parser = IncrementalParser()
+        entities = [e async for e in parse_stream(reader, parser, chunk_size=1000)]
+        await task
+        return parser, entities
+
+    parser, entities = asyncio.run(parse())
+    same_models(read(generated_file), parser.model)
+    assert len(entities) == len(parser.model)
+
+
+def test_parse_stream_of_chunks(colored_file):
+    data = open(colored_file, 'rb').read()
+
+    async def body():
+        for chunk in chunks(data, random_sizes(3)):
+            yield chunk
+
+    async def parse():
+        return [e async for e in parse_stream(body())]
+
+    assert [e.sequence_number for e in asyncio.run(parse())] == [1, 3, 5, 7]
+
+
+def test_truncated_parameter_record(generated_file):
+    data = open(generated_file, 'rb').read()
+    parser = IncrementalParser()
+    # the first record, of a surface, runs over many lines
+    parser.feed(data[:data.index(b'P0000002\n') + 9])
+    with pytest.raises(ValueError):
+        parser.close()
+    with pytest.raises(ValueError):
+        parser.feed(b'')
+
+
+def test_records_without_line_ends(generated_file):
+    data = open(generated_file, 'rb').read()
+    flat = data.replace(b'\n', b'')
+    for sizes in (random_sizes(4), iter(lambda: 1, None)):
+        parser, entities = feed_all(flat, sizes)
+        same_models(read(generated_file), parser.model)
+        assert len(entities) == len(parser.model)
+
+
+def test_not_iges():
+    parser = IncrementalParser()
+    parser.feed(b'some text\nthat is not IGES\n' * 10)
+    with pytest.raises(ValueError):
+        parser.close()
@@ -0,0 +1,45 @@
+import random
+
+import numpy as np
+import pytest
+
+from conftest import translation, write_entities
+from generate_IGES import surface_tokens
+from iges.model import PointerError
+from iges.reader import read
+
+
+def test_chains(colored_file):
+    model = read(colored_file)
+    surface = model.entity_list[3]
+    matrix = model.transforms.matrix_of(surface)
+    assert np.allclose(matrix[:3, 3], [11, 2, 3])
+    assert model.transforms.matrix(0) is None
+    points = model.transforms.transform_points([surface], [surface.control_points])[0]
+    assert np.allclose(points[..., :3], surface.control_points[..., :3] + [11, 2, 3])
+    assert np.array_equal(points[..., 3], surface.control_points[..., 3])
+
+
+def test_missing_matrices_skipped(tmp_path):
+    path = str(tmp_path / 'dangling.igs')
+    surface = [repr(t) for t in surface_tokens(random.Random(0), 3, 2, 0.0)]
+    write_entities(path, [
+        (124, translation(1, 0, 0), {}),                      # DE 1
+        (124, translation(0, 1, 0), {'transform': 99}),       # DE 3, no matrix at DE 99
+        (124, translation(0, 0, 1), {'transform': 3}),        # DE 5, above DE 3
+        (124, translation(0, 0, 2), {'transform': 1}),        # DE 7
+        (128, surface, {'transform': 5}),                     # DE 9
+        (128, surface, {'transform': 7}),                     # DE 11
+    ])
+    model = read(path)
+    with pytest.warns(UserWarning, match='DE 3 refers to no matrix at DE 99'):
+        transforms = model.transforms
+    assert sorted(transforms.matrices) == [1, 7]
+    assert np.allclose(transforms.matrix(7)[:3, 3], [1, 0, 2])
+    with pytest.raises(PointerError):
+        transforms.matrix(5)
+
+    with pytest.warns(UserWarning, match='DE 9 is left out'):
+        ids = model.bvh.ids
+    assert [model.entity_list[i].sequence_number for i in ids] == [11]
+    assert model.bvh.lo[0][0] >= 1 - 1e-9
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from iges.reader import read
+from iges.tessellate import tessellate
+from iges.trim import TrimRegion, span_segments
+
+square = np.array([[0, 0], [4, 0], [4, 4], [0, 4]], dtype=float)
+hole = np.array([[1, 1], [2, 1], [2, 2], [1, 2]], dtype=float)
+
+
+def even_odd(loops, point):
+    """Whether `point` is inside `loops`, one edge at a time"""
+    inside = False
+    for loop in loops:
+        for a, b in zip(loop, np.roll(loop, -1, axis=0)):
+            if (a[1] > point[1]) != (b[1] > point[1]):
+                x = a[0] + (point[1] - a[1]) * (b[0] - a[0]) / (b[1] - a[1])
+                if point[0] < x:
+                    inside = not inside
+    return inside
+
+
+def test_known_points():
+    region = TrimRegion([square, hole])
+    points = [(0.5, 0.5), (3, 3), (1.5, 1.5), (5, 1), (-1, 2), (2, -0.5), (3.9, 0.1), (1.5, 2.5)]
+    assert region.contains(points).tolist() == [True, True, False, False, False, False, True, True]
+    assert region.area() == 15
+    lower, upper = region.bounds()
+    assert lower.tolist() == [0, 0] and upper.tolist() == [4, 4]
+    assert np.allclose(region.nearest([(1.5, 1.4), (5, 5)]), [(1.5, 1), (4, 4)])
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(0)
+    angles = np.sort(rng.uniform(0, 2 * np.pi, 200))
+    star = np.stack([np.cos(angles), np.sin(angles)], axis=1) * rng.uniform(0.3, 1, (200, 1))
+    loops = [star, hole / 10]
+    region = TrimRegion(loops)
+    points = rng.uniform(-1.1, 1.1, (2000, 2))
+    assert region.contains(points).tolist() == [even_odd(loops, p) for p in points]
+
+
+def test_span_segments():
+    rng = np.random.default_rng(1)
+    for degree in range(1, 5):
+        points = rng.normal(size=(degree + 4, 3, 3))
+        segments = span_segments(points, degree, 0.01, 0.3)
+        assert segments.shape == (4,)
+        # a finer tolerance takes at least as many segments
+        assert (span_segments(points, degree, 0.001, 0.1) >= segments).all()
+        # straight rows of evenly spaced points
+        line = np.arange(degree + 4)[:, None, None] * np.array([[1., 2., 3.], [1., 0., 0.]])
+        assert span_segments(line, degree, 0.01, 0.3).tolist() == [1] * 4
+
+
+def test_mesh_covers_trim_region(generated_file):
+    model = read(generated_file)
+    surfaces = [e for e in model.entity_list if e.entity_type_number in (143, 144)]
+    assert len(surfaces) == 12
+    for e in surfaces:
+        region = TrimRegion.from_entity(model, e, 1e-4)
+        assert region.contains([(0.5, 0.5)]).tolist() == [True]
+        assert region.contains([(0.02, 0.5), (0.5, 0.98), (1.5, 0.5)]).tolist() == [False] * 3
+
+        mesh = tessellate(model, e)
+        t = mesh.uv[mesh.triangles]
+        d1, d2 = t[:, 1] - t[:, 0], t[:, 2] - t[:, 0]
+        uv_area = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+        # counter-clockwise in (u, v), none flipped
+        assert (uv_area > 0).all()
+        assert uv_area.sum() / 2 == pytest.approx(region.area(), rel=1e-2)
+
+        # facing the side of the surface normals
+        p = mesh.vertices[mesh.triangles]
+        facets = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+        assert (np.einsum('nc,nc->n', facets, mesh.normals[mesh.triangles].sum(axis=1)) > 0).all()
+
+        # the vertices are on the surface
+        surface = model.get(e.PTS if e.entity_type_number == 144 else e.SPTR)
+        assert np.allclose(surface.evaluate(mesh.uv[:, 0], mesh.uv[:, 1])[:, 0, 0], mesh.vertices)
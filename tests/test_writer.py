@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from iges.model import PointerError
+from iges.reader import read
+from iges.writer import IGESWriter, write
+
+# Fields the writer sets from the records it writes
+written_fields = ('parameter_pointer', 'param_line_count')
+
+
+def same_models(a, b):
+    assert a.global_string.rstrip() == b.global_string.rstrip()
+    assert len(a) == len(b)
+    for key in a.directory.keys():
+        if key not in written_fields:
+            assert np.array_equal(a.directory[key], b.directory[key]), key
+    for x, y in zip(a.entity_list, b.entity_list):
+        assert x.to_parameters(int) == y.to_parameters(int), x.sequence_number
+
+
+def test_round_trip(generated_file, tmp_path):
+    out = str(tmp_path / 'out.igs')
+    model = read(generated_file)
+    write(model, out)
+    same_models(model, read(out))
+
+    # written again, a written file is unchanged
+    again = str(tmp_path / 'again.igs')
+    write(read(out), again)
+    assert open(out, 'rb').read() == open(again, 'rb').read()
+
+
+def test_lazy_model_copies_the_same_lines(generated_file, tmp_path):
+    eager = str(tmp_path / 'eager.igs')
+    lazy = str(tmp_path / 'lazy.igs')
+    write(read(generated_file), eager)
+    with read(generated_file, lazy=True, mapped=True) as model:
+        # decode one entity of each kind, the rest is copied undecoded
+        model.entity_list[0].load_parameters()
+        model.entity_list[1].load_parameters()
+        writer = IGESWriter(model)
+        assert [writer.copied(e) for e in model.entity_list[:3]] == [False, False, True]
+        write(model, lazy)
+    assert open(eager, 'rb').read() == open(lazy, 'rb').read()
+
+
+@pytest.mark.parametrize('options', [{}, {'workers': 2}, {'lazy': True, 'mapped': True}])
+def test_colors_transforms_and_strings(colored_file, tmp_path, options):
+    out = str(tmp_path / 'out.igs')
+    with read(colored_file, **options) as model:
+        write(model, out)
+    model = read(colored_file)
+    written = read(out)
+    same_models(model, written)
+
+    assert written.entity_list[0].parameters[-1] == '5HDodge'
+    surface = written.entity_list[3]
+    assert written.get(-surface.d['color_number']).d['entity_type_number'] == 314
+    assert np.allclose(written.transforms.matrix_of(surface)[:3, 3], [11, 2, 3])
+
+
+def test_subset_is_renumbered(colored_file, tmp_path):
+    out = str(tmp_path / 'out.igs')
+    model = read(colored_file)
+    write(model, out, model.entity_list[1:4][::-1] + [model.entity_list[0]])
+    written = read(out)
+    assert written.directory['entity_type_number'].tolist() == [128, 124, 124, 314]
+    assert written.directory['color_number'].tolist() == [-7, 0, 0, 0]
+    assert written.directory['transform'].tolist() == [3, 5, 0, 0]
+
+    with pytest.raises(PointerError):
+        write(model, out, model.entity_list[1:])